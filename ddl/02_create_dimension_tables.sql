@@ -16,7 +16,8 @@ CREATE TABLE IF NOT EXISTS dim_date (
     day INT NOT NULL,
     day_of_week INT NOT NULL,           -- 1=Monday, 7=Sunday
     is_weekend TINYINT(1) NOT NULL,   -- 1 for Sat/Sun, 0 otherwise
-    UNIQUE KEY uk_full_date (full_date)
+    UNIQUE KEY uk_full_date (full_date),
+    KEY idx_date_year (year, quarter, month)  -- WHERE d.year = ... finds the date_keys, then the fact index
 );
 
 /*
@@ -1,12 +1,27 @@
 /* Make sure you are using your database */
 USE Airlines;
 
+/*
+-- Physical design --
+Every fact table is RANGE-partitioned by date_key, one partition per year
+(p2015 holds 20150101-20151231), so a year can be rebuilt by exchanging its
+partition and old years can be dropped without a DELETE (see src/partitions.py).
+Years before the first partition go to p_history; the ETL splits pmax when a
+new year is loaded.
+
+MySQL requires the partitioning column in every unique key, so the primary keys
+are (id, date_key), and partitioned InnoDB tables can't have foreign keys: the
+ETL only inserts keys it looked up in the dimensions. The secondary indexes are
+covering indexes for the queries in analysis/: they filter or group on the date
+or the dimension key and only read the measures listed.
+*/
+
 /*
 -- FACT 1: Passenger Movements --
 Stores data from the CAA file.
 */
 CREATE TABLE IF NOT EXISTS fact_passenger_movements (
-    movement_id INT AUTO_INCREMENT PRIMARY KEY,
+    movement_id INT AUTO_INCREMENT,
     
     -- Foreign Keys to Dimensions
     date_key INT NOT NULL,
@@ -16,9 +31,26 @@ CREATE TABLE IF NOT EXISTS fact_passenger_movements (
     passengers BIGINT,
     aircraft_movements INT,
     
-    -- Foreign Key Constraints
-    FOREIGN KEY (date_key) REFERENCES dim_date(date_key),
-    FOREIGN KEY (airport_key) REFERENCES dim_airport(airport_key)
+    PRIMARY KEY (movement_id, date_key),
+    -- year / quarter / month queries (date_key ranges joined from dim_date)
+    KEY idx_fpm_date_airport (date_key, airport_key, passengers, aircraft_movements),
+    -- per-airport queries (iata_code -> airport_key)
+    KEY idx_fpm_airport_date (airport_key, date_key, passengers, aircraft_movements)
+)
+PARTITION BY RANGE (date_key) (
+    PARTITION p_history VALUES LESS THAN (20150101),
+    PARTITION p2015 VALUES LESS THAN (20160101),
+    PARTITION p2016 VALUES LESS THAN (20170101),
+    PARTITION p2017 VALUES LESS THAN (20180101),
+    PARTITION p2018 VALUES LESS THAN (20190101),
+    PARTITION p2019 VALUES LESS THAN (20200101),
+    PARTITION p2020 VALUES LESS THAN (20210101),
+    PARTITION p2021 VALUES LESS THAN (20220101),
+    PARTITION p2022 VALUES LESS THAN (20230101),
+    PARTITION p2023 VALUES LESS THAN (20240101),
+    PARTITION p2024 VALUES LESS THAN (20250101),
+    PARTITION p2025 VALUES LESS THAN (20260101),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
 );
 
 
@@ -27,7 +59,7 @@ CREATE TABLE IF NOT EXISTS fact_passenger_movements (
 Stores data from the SriLankan Annual Report file.
 */
 CREATE TABLE IF NOT EXISTS fact_airline_financials (
-    financial_id INT AUTO_INCREMENT PRIMARY KEY,
+    financial_id INT AUTO_INCREMENT,
     
     -- Foreign Keys to Dimensions
     date_key INT NOT NULL,       -- We will use YYYY0101
@@ -37,9 +69,25 @@ CREATE TABLE IF NOT EXISTS fact_airline_financials (
     value DECIMAL(20, 2),
     currency VARCHAR(10),
     
-    -- Foreign Key Constraints
-    FOREIGN KEY (date_key) REFERENCES dim_date(date_key),
-    FOREIGN KEY (metric_key) REFERENCES dim_metric(metric_key)
+    PRIMARY KEY (financial_id, date_key),
+    -- metric_name = '...' queries, per year
+    KEY idx_faf_metric_date (metric_key, date_key, value, currency),
+    KEY idx_faf_date_metric (date_key, metric_key, value)
+)
+PARTITION BY RANGE (date_key) (
+    PARTITION p_history VALUES LESS THAN (20150101),
+    PARTITION p2015 VALUES LESS THAN (20160101),
+    PARTITION p2016 VALUES LESS THAN (20170101),
+    PARTITION p2017 VALUES LESS THAN (20180101),
+    PARTITION p2018 VALUES LESS THAN (20190101),
+    PARTITION p2019 VALUES LESS THAN (20200101),
+    PARTITION p2020 VALUES LESS THAN (20210101),
+    PARTITION p2021 VALUES LESS THAN (20220101),
+    PARTITION p2022 VALUES LESS THAN (20230101),
+    PARTITION p2023 VALUES LESS THAN (20240101),
+    PARTITION p2024 VALUES LESS THAN (20250101),
+    PARTITION p2025 VALUES LESS THAN (20260101),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
 );
 
 
@@ -48,7 +96,7 @@ CREATE TABLE IF NOT EXISTS fact_airline_financials (
 Stores data from the World Bank file.
 */
 CREATE TABLE IF NOT EXISTS fact_world_transport_stats (
-    stat_id INT AUTO_INCREMENT PRIMARY KEY,
+    stat_id INT AUTO_INCREMENT,
     
     -- Foreign Keys to Dimensions
     date_key INT NOT NULL,      -- We will use YYYY0101
@@ -57,7 +105,24 @@ CREATE TABLE IF NOT EXISTS fact_world_transport_stats (
     -- Measures (the numbers)
     passengers BIGINT,
     
-    -- Foreign Key Constraints
-    FOREIGN KEY (date_key) REFERENCES dim_date(date_key),
-    FOREIGN KEY (country_key) REFERENCES dim_country(country_key)
-);
\ No newline at end of file
+    PRIMARY KEY (stat_id, date_key),
+    -- one year, all countries
+    KEY idx_fwt_date_country (date_key, country_key, passengers),
+    -- one country (or a few), all years
+    KEY idx_fwt_country_date (country_key, date_key, passengers)
+)
+PARTITION BY RANGE (date_key) (
+    PARTITION p_history VALUES LESS THAN (20150101),
+    PARTITION p2015 VALUES LESS THAN (20160101),
+    PARTITION p2016 VALUES LESS THAN (20170101),
+    PARTITION p2017 VALUES LESS THAN (20180101),
+    PARTITION p2018 VALUES LESS THAN (20190101),
+    PARTITION p2019 VALUES LESS THAN (20200101),
+    PARTITION p2020 VALUES LESS THAN (20210101),
+    PARTITION p2021 VALUES LESS THAN (20220101),
+    PARTITION p2022 VALUES LESS THAN (20230101),
+    PARTITION p2023 VALUES LESS THAN (20240101),
+    PARTITION p2024 VALUES LESS THAN (20250101),
+    PARTITION p2025 VALUES LESS THAN (20260101),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
@@ -0,0 +1,65 @@
+/* Make sure you are using your database */
+USE Airlines;
+
+/*
+-- AGGREGATE 1: Passengers by Airport and Month --
+Sums of fact_passenger_movements per month, airport and weekend flag.
+Refreshed by the ETL after the fact (see src/aggregates.py).
+*/
+CREATE TABLE IF NOT EXISTS agg_passengers_airport_month (
+    agg_id INT AUTO_INCREMENT PRIMARY KEY,
+
+    -- Grain
+    month_key INT NOT NULL,      -- YYYYMM
+    year INT NOT NULL,
+    quarter INT NOT NULL,
+    month INT NOT NULL,
+    month_name VARCHAR(20),
+    airport_key INT,
+    is_weekend BOOLEAN,
+
+    -- Measures
+    passengers BIGINT,
+    aircraft_movements BIGINT,
+    flown_passengers BIGINT,     -- only rows with aircraft_movements > 0
+    flown_movements BIGINT,
+    flown_rows INT NOT NULL,
+    fact_rows INT NOT NULL,
+
+    KEY idx_agg_month (month_key),
+    KEY idx_agg_airport_month (airport_key, month_key),
+    KEY idx_agg_year_quarter (year, quarter)
+);
+
+
+/*
+-- AGGREGATE 2: Passengers by Year and Quarter --
+Built from agg_passengers_airport_month.
+*/
+CREATE TABLE IF NOT EXISTS agg_passengers_year_quarter (
+    year INT NOT NULL,
+    quarter INT NOT NULL,
+
+    -- Measures
+    passengers BIGINT,
+    aircraft_movements BIGINT,
+    fact_rows INT NOT NULL,
+
+    PRIMARY KEY (year, quarter)
+);
+
+
+/*
+-- AGGREGATE 3: World Passengers by Country and Year --
+Sums of fact_world_transport_stats per country and year.
+*/
+CREATE TABLE IF NOT EXISTS agg_world_passengers_country_year (
+    year INT NOT NULL,
+    country_key INT NOT NULL,
+
+    -- Measures
+    passengers BIGINT,
+    fact_rows INT NOT NULL,
+
+    PRIMARY KEY (year, country_key)
+);
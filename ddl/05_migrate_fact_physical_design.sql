@@ -0,0 +1,115 @@
+/* Make sure you are using your database */
+USE Airlines;
+
+/*
+-- Migration: fact physical design --
+Only for warehouses created before the fact tables were partitioned (see
+03_create_fact_tables.sql); new installs already have this layout.
+The old foreign keys are looked up in information_schema and dropped whatever
+their names (none left is fine too). Rebuilding a large fact table copies it,
+so run this outside the ETL window.
+*/
+
+ALTER TABLE dim_date ADD KEY idx_date_year (year, quarter, month);
+
+
+SET @drop_fks = IFNULL((
+    SELECT CONCAT('ALTER TABLE fact_passenger_movements ',
+                  GROUP_CONCAT(CONCAT('DROP FOREIGN KEY `', CONSTRAINT_NAME, '`') SEPARATOR ', '))
+    FROM information_schema.TABLE_CONSTRAINTS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'fact_passenger_movements' AND CONSTRAINT_TYPE = 'FOREIGN KEY'
+), 'DO 0');  -- no foreign keys left: nothing to drop
+PREPARE drop_fks FROM @drop_fks;
+EXECUTE drop_fks;
+DEALLOCATE PREPARE drop_fks;
+
+ALTER TABLE fact_passenger_movements
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (movement_id, date_key),
+    ADD KEY idx_fpm_date_airport (date_key, airport_key, passengers, aircraft_movements),
+    ADD KEY idx_fpm_airport_date (airport_key, date_key, passengers, aircraft_movements);
+
+ALTER TABLE fact_passenger_movements
+PARTITION BY RANGE (date_key) (
+    PARTITION p_history VALUES LESS THAN (20150101),
+    PARTITION p2015 VALUES LESS THAN (20160101),
+    PARTITION p2016 VALUES LESS THAN (20170101),
+    PARTITION p2017 VALUES LESS THAN (20180101),
+    PARTITION p2018 VALUES LESS THAN (20190101),
+    PARTITION p2019 VALUES LESS THAN (20200101),
+    PARTITION p2020 VALUES LESS THAN (20210101),
+    PARTITION p2021 VALUES LESS THAN (20220101),
+    PARTITION p2022 VALUES LESS THAN (20230101),
+    PARTITION p2023 VALUES LESS THAN (20240101),
+    PARTITION p2024 VALUES LESS THAN (20250101),
+    PARTITION p2025 VALUES LESS THAN (20260101),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+
+SET @drop_fks = IFNULL((
+    SELECT CONCAT('ALTER TABLE fact_airline_financials ',
+                  GROUP_CONCAT(CONCAT('DROP FOREIGN KEY `', CONSTRAINT_NAME, '`') SEPARATOR ', '))
+    FROM information_schema.TABLE_CONSTRAINTS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'fact_airline_financials' AND CONSTRAINT_TYPE = 'FOREIGN KEY'
+), 'DO 0');  -- no foreign keys left: nothing to drop
+PREPARE drop_fks FROM @drop_fks;
+EXECUTE drop_fks;
+DEALLOCATE PREPARE drop_fks;
+
+ALTER TABLE fact_airline_financials
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (financial_id, date_key),
+    ADD KEY idx_faf_metric_date (metric_key, date_key, value, currency),
+    ADD KEY idx_faf_date_metric (date_key, metric_key, value);
+
+ALTER TABLE fact_airline_financials
+PARTITION BY RANGE (date_key) (
+    PARTITION p_history VALUES LESS THAN (20150101),
+    PARTITION p2015 VALUES LESS THAN (20160101),
+    PARTITION p2016 VALUES LESS THAN (20170101),
+    PARTITION p2017 VALUES LESS THAN (20180101),
+    PARTITION p2018 VALUES LESS THAN (20190101),
+    PARTITION p2019 VALUES LESS THAN (20200101),
+    PARTITION p2020 VALUES LESS THAN (20210101),
+    PARTITION p2021 VALUES LESS THAN (20220101),
+    PARTITION p2022 VALUES LESS THAN (20230101),
+    PARTITION p2023 VALUES LESS THAN (20240101),
+    PARTITION p2024 VALUES LESS THAN (20250101),
+    PARTITION p2025 VALUES LESS THAN (20260101),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+
+SET @drop_fks = IFNULL((
+    SELECT CONCAT('ALTER TABLE fact_world_transport_stats ',
+                  GROUP_CONCAT(CONCAT('DROP FOREIGN KEY `', CONSTRAINT_NAME, '`') SEPARATOR ', '))
+    FROM information_schema.TABLE_CONSTRAINTS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'fact_world_transport_stats' AND CONSTRAINT_TYPE = 'FOREIGN KEY'
+), 'DO 0');  -- no foreign keys left: nothing to drop
+PREPARE drop_fks FROM @drop_fks;
+EXECUTE drop_fks;
+DEALLOCATE PREPARE drop_fks;
+
+ALTER TABLE fact_world_transport_stats
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (stat_id, date_key),
+    ADD KEY idx_fwt_date_country (date_key, country_key, passengers),
+    ADD KEY idx_fwt_country_date (country_key, date_key, passengers);
+
+ALTER TABLE fact_world_transport_stats
+PARTITION BY RANGE (date_key) (
+    PARTITION p_history VALUES LESS THAN (20150101),
+    PARTITION p2015 VALUES LESS THAN (20160101),
+    PARTITION p2016 VALUES LESS THAN (20170101),
+    PARTITION p2017 VALUES LESS THAN (20180101),
+    PARTITION p2018 VALUES LESS THAN (20190101),
+    PARTITION p2019 VALUES LESS THAN (20200101),
+    PARTITION p2020 VALUES LESS THAN (20210101),
+    PARTITION p2021 VALUES LESS THAN (20220101),
+    PARTITION p2022 VALUES LESS THAN (20230101),
+    PARTITION p2023 VALUES LESS THAN (20240101),
+    PARTITION p2024 VALUES LESS THAN (20250101),
+    PARTITION p2025 VALUES LESS THAN (20260101),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
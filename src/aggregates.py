@@ -0,0 +1,715 @@
+"""
+Pre-aggregated summary tables for the business queries, and a query layer on top of them.
+
+The queries in analysis/*.sql scan fact_passenger_movements / fact_world_transport_stats and
+join dim_date (and dim_airport) just to group by month, quarter, year or airport. The
+aggregate tables (ddl/04_create_aggregate_tables.sql) hold those sums already:
+
+- agg_passengers_airport_month: per month, airport and weekend flag (so the weekday/weekend
+  queries can be answered too), with the passengers/movements of rows that had movements > 0
+  kept separately for the passengers-per-movement queries.
+- agg_passengers_year_quarter: per year and quarter, built from the monthly table.
+- agg_world_passengers_country_year: per country and year.
+
+They are refreshed after their fact tables in run_warehouse_transforms(). When the facts
+were merged, only the periods (months / years) containing the touched date_keys are rebuilt;
+after a full fact refresh (or while a table is still empty) the whole table is.
+
+BUSINESS_QUERIES answers the shipped passenger and World Bank queries from the aggregates;
+each keeps the original fact-table SQL, so verify() can check both give the same result:
+    python aggregates.py --list | --verify | [--facts] query_name ...
+The financial queries stay on fact_airline_financials (a few rows per year).
+"""
+import argparse
+from decimal import Decimal
+
+
+# --- Aggregate tables ---
+# period: the aggregate's refresh unit for a fact date_key; filter: how the source rows of a set
+# of periods are selected ('date_key' = fact date_key ranges, else a column IN (...)).
+AGGREGATES = {
+    'agg_passengers_airport_month': {
+        'depends_on': ['fact_passenger_movements'],
+        'fact': 'fact_passenger_movements',
+        'period': lambda date_key: date_key // 100,                         # YYYYMM
+        'period_dates': lambda month: (month * 100 + 1, month * 100 + 31),
+        'period_column': 'month_key',
+        'filter': 'date_key',
+        'insert': """
+            INSERT INTO agg_passengers_airport_month (
+                month_key, year, quarter, month, month_name, airport_key, is_weekend,
+                passengers, aircraft_movements, flown_passengers, flown_movements, flown_rows, fact_rows)
+            SELECT
+                d.year * 100 + d.month, d.year, d.quarter, d.month, d.month_name, f.airport_key, d.is_weekend,
+                SUM(f.passengers), SUM(f.aircraft_movements),
+                SUM(CASE WHEN f.aircraft_movements > 0 THEN f.passengers END),
+                SUM(CASE WHEN f.aircraft_movements > 0 THEN f.aircraft_movements END),
+                SUM(CASE WHEN f.aircraft_movements > 0 THEN 1 ELSE 0 END),
+                COUNT(*)
+            FROM fact_passenger_movements f
+            JOIN dim_date d ON f.date_key = d.date_key
+            WHERE {where}
+            GROUP BY d.year, d.quarter, d.month, d.month_name, f.airport_key, d.is_weekend
+        """,
+    },
+    'agg_passengers_year_quarter': {
+        'depends_on': ['agg_passengers_airport_month'],
+        'fact': 'fact_passenger_movements',
+        'period': lambda date_key: date_key // 10000,                       # year
+        'period_column': 'year',
+        'filter': 'g.year',
+        'insert': """
+            INSERT INTO agg_passengers_year_quarter (year, quarter, passengers, aircraft_movements, fact_rows)
+            SELECT g.year, g.quarter, SUM(g.passengers), SUM(g.aircraft_movements), SUM(g.fact_rows)
+            FROM agg_passengers_airport_month g
+            WHERE {where}
+            GROUP BY g.year, g.quarter
+        """,
+    },
+    'agg_world_passengers_country_year': {
+        'depends_on': ['fact_world_transport_stats'],
+        'fact': 'fact_world_transport_stats',
+        'period': lambda date_key: date_key // 10000,                       # year
+        'period_dates': lambda year: (year * 10000 + 101, year * 10000 + 1231),
+        'period_column': 'year',
+        'filter': 'date_key',
+        'insert': """
+            INSERT INTO agg_world_passengers_country_year (year, country_key, passengers, fact_rows)
+            SELECT d.year, f.country_key, SUM(f.passengers), COUNT(*)
+            FROM fact_world_transport_stats f
+            JOIN dim_date d ON f.date_key = d.date_key
+            WHERE {where}
+            GROUP BY d.year, f.country_key
+        """,
+    },
+}
+
+def _period_filter(spec, periods):
+    """SQL condition (and params) selecting the source rows of the given periods."""
+    if spec['filter'] == 'date_key':
+        ranges = [spec['period_dates'](p) for p in periods]
+        return ' OR '.join(['f.date_key BETWEEN %s AND %s'] * len(ranges)), [v for r in ranges for v in r]
+    return f"{spec['filter']} IN ({','.join(['%s'] * len(periods))})", list(periods)
+
+def refresh_aggregate(conn, cursor, table, spec, date_keys=None):
+    """
+    Rebuilds the periods of an aggregate table that contain the given fact date_keys
+    (date_keys=None: the whole table). Delete and insert are committed together, so readers
+    never see a period missing. Returns the number of aggregate rows written.
+    """
+    cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
+    if date_keys is not None and cursor.fetchone() is None:
+        date_keys = None  # nothing aggregated yet: build everything once
+    if date_keys is None:
+        print(f"   -> Refreshing {table} (full)...")
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(spec['insert'].format(where='1 = 1'))
+    else:
+        periods = sorted({spec['period'](int(k)) for k in date_keys})
+        print(f"   -> Refreshing {table} ({len(periods)} {spec['period_column']} period(s))...")
+        if not periods:
+            return 0
+        placeholders = ','.join(['%s'] * len(periods))
+        cursor.execute(f"DELETE FROM {table} WHERE {spec['period_column']} IN ({placeholders})", periods)
+        where, params = _period_filter(spec, periods)
+        cursor.execute(spec['insert'].format(where=where), params)
+    inserted = cursor.rowcount
+    conn.commit()
+    print(f"      ... {table}: {inserted} rows.")
+    return inserted
+
+
+# --- Query layer ---
+# name -> question, SQL on the aggregates, and the shipped SQL on the fact tables.
+# Top-N queries break ties on their grouping columns, so both versions return the same rows.
+BUSINESS_QUERIES = {
+    'passengers_by_airport': {
+        'question': "Total passengers and aircraft movements for each airport",
+        'aggregate': """
+            SELECT a.iata_code AS Airport, a.country AS Country,
+                   SUM(g.passengers) AS Total_Passengers, SUM(g.aircraft_movements) AS Total_Movements
+            FROM agg_passengers_airport_month g
+            JOIN dim_airport a ON g.airport_key = a.airport_key
+            GROUP BY a.iata_code, a.country
+            ORDER BY Total_Passengers DESC
+        """,
+        'facts': """
+            SELECT a.iata_code AS Airport, a.country AS Country,
+                   SUM(f.passengers) AS Total_Passengers, SUM(f.aircraft_movements) AS Total_Movements
+            FROM fact_passenger_movements f
+            JOIN dim_airport a ON f.airport_key = a.airport_key
+            GROUP BY a.iata_code, a.country
+            ORDER BY Total_Passengers DESC
+        """,
+    },
+    'passengers_by_quarter': {
+        'question': "Passengers recorded each year and quarter",
+        'aggregate': """
+            SELECT year AS Year, quarter AS Quarter, passengers AS Total_Passengers
+            FROM agg_passengers_year_quarter
+            ORDER BY year, quarter
+        """,
+        'facts': """
+            SELECT d.year AS Year, d.quarter AS Quarter, SUM(f.passengers) AS Total_Passengers
+            FROM fact_passenger_movements f
+            JOIN dim_date d ON f.date_key = d.date_key
+            GROUP BY d.year, d.quarter
+            ORDER BY d.year, d.quarter
+        """,
+    },
+    'busiest_quarter': {
+        'question': "Quarter with the highest passenger traffic (all airports)",
+        'aggregate': """
+            SELECT year, quarter, passengers AS Total_Passengers
+            FROM agg_passengers_year_quarter
+            ORDER BY Total_Passengers DESC, year, quarter
+            LIMIT 1
+        """,
+        'facts': """
+            SELECT d.year, d.quarter, SUM(f.passengers) AS Total_Passengers
+            FROM fact_passenger_movements f
+            JOIN dim_date d ON f.date_key = d.date_key
+            GROUP BY d.year, d.quarter
+            ORDER BY Total_Passengers DESC, d.year, d.quarter
+            LIMIT 1
+        """,
+    },
+    'passengers_by_year': {
+        'question': "Total passengers per year",
+        'aggregate': """
+            SELECT year, SUM(passengers) AS total_passengers
+            FROM agg_passengers_year_quarter
+            GROUP BY year
+            ORDER BY year
+        """,
+        'facts': """
+            SELECT d.year, SUM(f.passengers) AS total_passengers
+            FROM fact_passenger_movements f
+            JOIN dim_date d ON f.date_key = d.date_key
+            GROUP BY d.year
+            ORDER BY d.year
+        """,
+    },
+    'yoy_growth': {
+        'question': "Year-over-year passenger growth for all airports combined",
+        'aggregate': """
+            WITH yearly_traffic AS (
+                SELECT year, SUM(passengers) AS total_passengers
+                FROM agg_passengers_year_quarter
+                GROUP BY year
+            )
+            SELECT year, total_passengers,
+                LAG(total_passengers, 1, 0) OVER (ORDER BY year) AS previous_year_passengers,
+                ROUND(((total_passengers - LAG(total_passengers, 1, 0) OVER (ORDER BY year))
+                       / LAG(total_passengers, 1, 0) OVER (ORDER BY year)) * 100, 2) AS growth_percentage
+            FROM yearly_traffic
+            ORDER BY year
+        """,
+        'facts': """
+            WITH yearly_traffic AS (
+                SELECT d.year, SUM(f.passengers) AS total_passengers
+                FROM fact_passenger_movements f
+                JOIN dim_date d ON f.date_key = d.date_key
+                GROUP BY d.year
+            )
+            SELECT year, total_passengers,
+                LAG(total_passengers, 1, 0) OVER (ORDER BY year) AS previous_year_passengers,
+                ROUND(((total_passengers - LAG(total_passengers, 1, 0) OVER (ORDER BY year))
+                       / LAG(total_passengers, 1, 0) OVER (ORDER BY year)) * 100, 2) AS growth_percentage
+            FROM yearly_traffic
+            ORDER BY year
+        """,
+    },
+    'monthly_traffic': {
+        'question': "Monthly passenger traffic at an airport in a year (default: CMB, 2023)",
+        'params': ('CMB', 2023),
+        'aggregate': """
+            SELECT g.year AS Year, g.month AS Month_Number, g.month_name AS Month_Name,
+                   SUM(g.passengers) AS Total_Passengers
+            FROM agg_passengers_airport_month g
+            JOIN dim_airport a ON g.airport_key = a.airport_key
+            WHERE a.iata_code = %s AND g.year = %s
+            GROUP BY g.year, g.month, g.month_name
+            ORDER BY g.month
+        """,
+        'facts': """
+            SELECT d.year AS Year, d.month AS Month_Number, d.month_name AS Month_Name,
+                   SUM(f.passengers) AS Total_Passengers
+            FROM fact_passenger_movements f
+            JOIN dim_date d ON f.date_key = d.date_key
+            JOIN dim_airport a ON f.airport_key = a.airport_key
+            WHERE a.iata_code = %s AND d.year = %s
+            GROUP BY d.year, d.month, d.month_name
+            ORDER BY d.month
+        """,
+    },
+    'monthly_traffic_latest_year': {
+        'question': "Monthly passenger traffic at an airport in the latest year of dim_date (default: CMB)",
+        'params': ('CMB',),
+        'aggregate': """
+            SELECT g.month_name, SUM(g.passengers) AS monthly_passengers
+            FROM agg_passengers_airport_month g
+            JOIN dim_airport a ON g.airport_key = a.airport_key
+            WHERE a.iata_code = %s AND g.year = (SELECT MAX(year) FROM dim_date)
+            GROUP BY g.year, g.month, g.month_name
+            ORDER BY g.month
+        """,
+        'facts': """
+            SELECT d.month_name, SUM(f.passengers) AS monthly_passengers
+            FROM fact_passenger_movements f
+            JOIN dim_date d ON f.date_key = d.date_key
+            JOIN dim_airport a ON f.airport_key = a.airport_key
+            WHERE a.iata_code = %s AND d.year = (SELECT MAX(year) FROM dim_date)
+            GROUP BY d.year, d.month, d.month_name
+            ORDER BY d.month
+        """,
+    },
+    'busiest_months': {
+        'question': "Top 3 busiest months on record for an airport (default: CMB)",
+        'params': ('CMB',),
+        'aggregate': """
+            SELECT g.year, g.month_name, SUM(g.passengers) AS Total_Passengers
+            FROM agg_passengers_airport_month g
+            JOIN dim_airport a ON g.airport_key = a.airport_key
+            WHERE a.iata_code = %s
+            GROUP BY g.year, g.month_name
+            ORDER BY Total_Passengers DESC, g.year, g.month_name
+            LIMIT 3
+        """,
+        'facts': """
+            SELECT d.year, d.month_name, SUM(f.passengers) AS Total_Passengers
+            FROM fact_passenger_movements f
+            JOIN dim_date d ON f.date_key = d.date_key
+            JOIN dim_airport a ON f.airport_key = a.airport_key
+            WHERE a.iata_code = %s
+            GROUP BY d.year, d.month_name
+            ORDER BY Total_Passengers DESC, d.year, d.month_name
+            LIMIT 3
+        """,
+    },
+    'airport_market_share': {
+        'question': "Share of all CAA passengers handled by each airport",
+        'aggregate': """
+            SELECT a.iata_code AS Airport, SUM(g.passengers) AS Total_Passengers,
+                   (SUM(g.passengers) * 100.0 / SUM(SUM(g.passengers)) OVER ()) AS Percentage_of_Total
+            FROM agg_passengers_airport_month g
+            JOIN dim_airport a ON g.airport_key = a.airport_key
+            GROUP BY a.iata_code
+            ORDER BY Percentage_of_Total DESC
+        """,
+        'facts': """
+            SELECT a.iata_code AS Airport, SUM(f.passengers) AS Total_Passengers,
+                   (SUM(f.passengers) * 100.0 / SUM(SUM(f.passengers)) OVER ()) AS Percentage_of_Total
+            FROM fact_passenger_movements f
+            JOIN dim_airport a ON f.airport_key = a.airport_key
+            GROUP BY a.iata_code
+            ORDER BY Percentage_of_Total DESC
+        """,
+    },
+    'passengers_per_movement': {
+        'question': "Average passengers per aircraft movement at each airport",
+        'aggregate': """
+            SELECT a.iata_code AS Airport,
+                   SUM(g.flown_passengers) / SUM(g.flown_movements) AS Avg_Passengers_Per_Movement
+            FROM agg_passengers_airport_month g
+            JOIN dim_airport a ON g.airport_key = a.airport_key
+            GROUP BY a.iata_code
+            HAVING SUM(g.flown_rows) > 0
+            ORDER BY Avg_Passengers_Per_Movement DESC
+        """,
+        'facts': """
+            SELECT a.iata_code AS Airport,
+                   SUM(f.passengers) / SUM(f.aircraft_movements) AS Avg_Passengers_Per_Movement
+            FROM fact_passenger_movements f
+            JOIN dim_airport a ON f.airport_key = a.airport_key
+            WHERE f.aircraft_movements > 0
+            GROUP BY a.iata_code
+            ORDER BY Avg_Passengers_Per_Movement DESC
+        """,
+    },
+    'passengers_per_flight_by_name': {
+        'question': "Rounded average passengers per flight by airport name",
+        'aggregate': """
+            SELECT a.airport_name, ROUND(SUM(g.flown_passengers) / SUM(g.flown_movements)) AS avg_passengers_per_flight
+            FROM agg_passengers_airport_month g
+            JOIN dim_airport a ON g.airport_key = a.airport_key
+            GROUP BY a.airport_name
+            HAVING SUM(g.flown_rows) > 0
+            ORDER BY avg_passengers_per_flight DESC
+        """,
+        'facts': """
+            SELECT a.airport_name, ROUND(SUM(f.passengers) / SUM(f.aircraft_movements)) AS avg_passengers_per_flight
+            FROM fact_passenger_movements f
+            JOIN dim_airport a ON f.airport_key = a.airport_key
+            WHERE f.aircraft_movements > 0
+            GROUP BY a.airport_name
+            ORDER BY avg_passengers_per_flight DESC
+        """,
+    },
+    'busiest_airport_by_name': {
+        'question': "Airports by total passenger volume (by name)",
+        'aggregate': """
+            SELECT a.airport_name, SUM(g.passengers) AS total_passengers
+            FROM agg_passengers_airport_month g
+            JOIN dim_airport a ON g.airport_key = a.airport_key
+            GROUP BY a.airport_name
+            ORDER BY total_passengers DESC
+        """,
+        'facts': """
+            SELECT a.airport_name, SUM(f.passengers) AS total_passengers
+            FROM fact_passenger_movements f
+            JOIN dim_airport a ON f.airport_key = a.airport_key
+            GROUP BY a.airport_name
+            ORDER BY total_passengers DESC
+        """,
+    },
+    'airport_yoy_growth': {
+        'question': "Year-over-year passenger growth at an airport (default: CMB)",
+        'params': ('CMB',),
+        'aggregate': """
+            WITH YearlyTraffic AS (
+                SELECT g.year, SUM(g.passengers) AS Total_Passengers,
+                       LAG(SUM(g.passengers), 1, 0) OVER (ORDER BY g.year) AS Previous_Year_Passengers
+                FROM agg_passengers_airport_month g
+                JOIN dim_airport a ON g.airport_key = a.airport_key
+                WHERE a.iata_code = %s
+                GROUP BY g.year
+            )
+            SELECT year, Total_Passengers, Previous_Year_Passengers,
+                   (Total_Passengers - Previous_Year_Passengers) * 100.0 / Previous_Year_Passengers AS YoY_Growth_Percentage
+            FROM YearlyTraffic
+            WHERE Previous_Year_Passengers > 0
+        """,
+        'facts': """
+            WITH YearlyTraffic AS (
+                SELECT d.year, SUM(f.passengers) AS Total_Passengers,
+                       LAG(SUM(f.passengers), 1, 0) OVER (ORDER BY d.year) AS Previous_Year_Passengers
+                FROM fact_passenger_movements f
+                JOIN dim_date d ON f.date_key = d.date_key
+                JOIN dim_airport a ON f.airport_key = a.airport_key
+                WHERE a.iata_code = %s
+                GROUP BY d.year
+            )
+            SELECT year, Total_Passengers, Previous_Year_Passengers,
+                   (Total_Passengers - Previous_Year_Passengers) * 100.0 / Previous_Year_Passengers AS YoY_Growth_Percentage
+            FROM YearlyTraffic
+            WHERE Previous_Year_Passengers > 0
+        """,
+    },
+    'low_traffic_airports': {
+        'question': "Airports with fewer than N aircraft movements in a quarter (default: 2023 Q1, 1000)",
+        'params': (2023, 1, 1000),
+        'aggregate': """
+            SELECT a.iata_code AS Airport, SUM(g.aircraft_movements) AS Q1_Movements
+            FROM agg_passengers_airport_month g
+            JOIN dim_airport a ON g.airport_key = a.airport_key
+            WHERE g.year = %s AND g.quarter = %s
+            GROUP BY a.iata_code
+            HAVING SUM(g.aircraft_movements) < %s
+        """,
+        'facts': """
+            SELECT a.iata_code AS Airport, SUM(f.aircraft_movements) AS Q1_Movements
+            FROM fact_passenger_movements f
+            JOIN dim_date d ON f.date_key = d.date_key
+            JOIN dim_airport a ON f.airport_key = a.airport_key
+            WHERE d.year = %s AND d.quarter = %s
+            GROUP BY a.iata_code
+            HAVING SUM(f.aircraft_movements) < %s
+        """,
+    },
+    'weekend_vs_weekday': {
+        'question': "Weekend vs. weekday passenger traffic",
+        'aggregate': """
+            SELECT CASE WHEN is_weekend = 1 THEN 'Weekend' ELSE 'Weekday' END AS Day_Type,
+                   SUM(passengers) AS Total_Passengers
+            FROM agg_passengers_airport_month
+            GROUP BY Day_Type
+        """,
+        'facts': """
+            SELECT CASE WHEN d.is_weekend = 1 THEN 'Weekend' ELSE 'Weekday' END AS Day_Type,
+                   SUM(f.passengers) AS Total_Passengers
+            FROM fact_passenger_movements f
+            JOIN dim_date d ON f.date_key = d.date_key
+            GROUP BY Day_Type
+        """,
+    },
+    'weekend_vs_weekday_by_airport': {
+        'question': "Weekend vs. weekday passengers and movements by airport",
+        'aggregate': """
+            SELECT a.iata_code AS Airport, CASE WHEN g.is_weekend = 1 THEN 'Weekend' ELSE 'Weekday' END AS Day_Type,
+                   SUM(g.passengers) AS Total_Passengers, SUM(g.aircraft_movements) AS Total_Movements
+            FROM agg_passengers_airport_month g
+            JOIN dim_airport a ON g.airport_key = a.airport_key
+            GROUP BY a.iata_code, Day_Type
+            ORDER BY Airport, Total_Passengers DESC
+        """,
+        'facts': """
+            SELECT a.iata_code AS Airport, CASE WHEN d.is_weekend = 1 THEN 'Weekend' ELSE 'Weekday' END AS Day_Type,
+                   SUM(f.passengers) AS Total_Passengers, SUM(f.aircraft_movements) AS Total_Movements
+            FROM fact_passenger_movements f
+            JOIN dim_date d ON f.date_key = d.date_key
+            JOIN dim_airport a ON f.airport_key = a.airport_key
+            GROUP BY a.iata_code, Day_Type
+            ORDER BY Airport, Total_Passengers DESC
+        """,
+    },
+    'airport_share_by_year': {
+        'question': "Share of each year's passengers that went through an airport (default: CMB)",
+        'params': ('CMB',),
+        'aggregate': """
+            WITH yearly AS (
+              SELECT g.year, SUM(g.passengers) AS total,
+                     SUM(CASE WHEN a.iata_code = %s THEN g.passengers ELSE 0 END) AS cmb
+              FROM agg_passengers_airport_month g JOIN dim_airport a ON g.airport_key = a.airport_key
+              GROUP BY g.year
+            )
+            SELECT year, total, cmb, ROUND((cmb/total)*100,2) AS CMB_Percentage FROM yearly ORDER BY year
+        """,
+        'facts': """
+            WITH yearly AS (
+              SELECT d.year, SUM(f.passengers) AS total,
+                     SUM(CASE WHEN a.iata_code = %s THEN f.passengers ELSE 0 END) AS cmb
+              FROM fact_passenger_movements f JOIN dim_date d ON f.date_key=d.date_key
+              JOIN dim_airport a ON f.airport_key=a.airport_key
+              GROUP BY d.year
+            )
+            SELECT year, total, cmb, ROUND((cmb/total)*100,2) AS CMB_Percentage FROM yearly ORDER BY year
+        """,
+    },
+    'revenue_vs_traffic': {
+        'question': "Airline revenue next to total CAA passengers, per year",
+        'aggregate': """
+            SELECT fin.year, fin.total_revenue, traffic.total_passengers
+            FROM (
+              SELECT d.year, SUM(f.value) AS total_revenue
+              FROM fact_airline_financials f JOIN dim_metric m ON f.metric_key = m.metric_key
+              JOIN dim_date d ON f.date_key = d.date_key
+              WHERE m.metric_name = 'Revenue' GROUP BY d.year
+            ) fin
+            JOIN (
+              SELECT year, SUM(passengers) AS total_passengers FROM agg_passengers_year_quarter GROUP BY year
+            ) traffic ON fin.year = traffic.year
+            ORDER BY fin.year
+        """,
+        'facts': """
+            SELECT fin.year, fin.total_revenue, traffic.total_passengers
+            FROM (
+              SELECT d.year, SUM(f.value) AS total_revenue
+              FROM fact_airline_financials f JOIN dim_metric m ON f.metric_key = m.metric_key
+              JOIN dim_date d ON f.date_key = d.date_key
+              WHERE m.metric_name = 'Revenue' GROUP BY d.year
+            ) fin
+            JOIN (
+              SELECT d.year, SUM(f.passengers) AS total_passengers
+              FROM fact_passenger_movements f JOIN dim_date d ON f.date_key = d.date_key
+              GROUP BY d.year
+            ) traffic ON fin.year = traffic.year
+            ORDER BY fin.year
+        """,
+    },
+    'airline_share_of_caa': {
+        'question': "SriLankan Airlines passengers as a share of CAA passengers in a year (default: 2022)",
+        'params': (2022, 2022),
+        'aggregate': """
+            SELECT
+                IFNULL((SELECT SUM(f.value) FROM fact_airline_financials f
+                        JOIN dim_metric m ON f.metric_key = m.metric_key
+                        JOIN dim_date d ON f.date_key = d.date_key
+                        WHERE m.metric_name = 'Passengers' AND d.year = %s), 0) /
+                IFNULL((SELECT SUM(passengers) FROM agg_passengers_year_quarter WHERE year = %s), 1) * 100
+                AS SL_Passenger_Share
+        """,
+        'facts': """
+            SELECT
+                IFNULL((SELECT SUM(f.value) FROM fact_airline_financials f
+                        JOIN dim_metric m ON f.metric_key = m.metric_key
+                        JOIN dim_date d ON f.date_key = d.date_key
+                        WHERE m.metric_name = 'Passengers' AND d.year = %s), 0) /
+                IFNULL((SELECT SUM(f.passengers) FROM fact_passenger_movements f
+                        JOIN dim_date d ON f.date_key = d.date_key WHERE d.year = %s), 1) * 100
+                AS SL_Passenger_Share
+        """,
+    },
+    'world_neighbours': {
+        'question': "World Bank passengers for Sri Lanka and its neighbours, per year",
+        'aggregate': """
+            SELECT g.year AS Year, c.country_name AS Country, g.passengers AS Total_Passengers
+            FROM agg_world_passengers_country_year g
+            JOIN dim_country c ON g.country_key = c.country_key
+            WHERE c.country_name IN ('Sri Lanka', 'India', 'Maldives', 'Bangladesh')
+            ORDER BY c.country_name, g.year
+        """,
+        'facts': """
+            SELECT d.year AS Year, c.country_name AS Country, f.passengers AS Total_Passengers
+            FROM fact_world_transport_stats f
+            JOIN dim_country c ON f.country_key = c.country_key
+            JOIN dim_date d ON f.date_key = d.date_key
+            WHERE c.country_name IN ('Sri Lanka', 'India', 'Maldives', 'Bangladesh')
+            ORDER BY c.country_name, d.year
+        """,
+    },
+    'world_top_countries_latest_year': {
+        'question': "Top 10 countries by passengers in the latest year of dim_date",
+        'aggregate': """
+            SELECT c.country_name, g.passengers
+            FROM agg_world_passengers_country_year g
+            JOIN dim_country c ON g.country_key = c.country_key
+            WHERE g.year = (SELECT MAX(year) FROM dim_date)
+            ORDER BY g.passengers DESC, c.country_name
+            LIMIT 10
+        """,
+        'facts': """
+            SELECT c.country_name, f.passengers
+            FROM fact_world_transport_stats f
+            JOIN dim_country c ON f.country_key = c.country_key
+            JOIN dim_date d ON f.date_key = d.date_key
+            WHERE d.year = (SELECT MAX(year) FROM dim_date)
+            ORDER BY f.passengers DESC, c.country_name
+            LIMIT 10
+        """,
+    },
+    'world_fastest_growing': {
+        'question': "Countries with the highest passenger growth into a year (default: 2022)",
+        'params': (2022,),
+        'aggregate': """
+            WITH YearlyData AS (
+                SELECT c.country_name, g.year, g.passengers,
+                       LAG(g.passengers, 1, 0) OVER (PARTITION BY c.country_name ORDER BY g.year) AS prev_year_passengers
+                FROM agg_world_passengers_country_year g
+                JOIN dim_country c ON g.country_key = c.country_key
+            )
+            SELECT country_name, passengers AS passengers_2022, prev_year_passengers AS passengers_2021,
+                   (passengers - prev_year_passengers) * 100.0 / prev_year_passengers AS Growth_Percentage
+            FROM YearlyData
+            WHERE year = %s AND prev_year_passengers > 0
+            ORDER BY Growth_Percentage DESC, country_name
+            LIMIT 10
+        """,
+        'facts': """
+            WITH YearlyData AS (
+                SELECT c.country_name, d.year, f.passengers,
+                       LAG(f.passengers, 1, 0) OVER (PARTITION BY c.country_name ORDER BY d.year) AS prev_year_passengers
+                FROM fact_world_transport_stats f
+                JOIN dim_date d ON f.date_key = d.date_key
+                JOIN dim_country c ON f.country_key = c.country_key
+            )
+            SELECT country_name, passengers AS passengers_2022, prev_year_passengers AS passengers_2021,
+                   (passengers - prev_year_passengers) * 100.0 / prev_year_passengers AS Growth_Percentage
+            FROM YearlyData
+            WHERE year = %s AND prev_year_passengers > 0
+            ORDER BY Growth_Percentage DESC, country_name
+            LIMIT 10
+        """,
+    },
+    'world_regional_share': {
+        'question': "Sri Lanka's share of Sri Lanka + India + Maldives passengers in a year (default: 2022)",
+        'params': (2022,),
+        'aggregate': """
+            WITH RegionalTraffic AS (
+                SELECT c.country_name, g.passengers
+                FROM agg_world_passengers_country_year g
+                JOIN dim_country c ON g.country_key = c.country_key
+                WHERE g.year = %s AND c.country_name IN ('Sri Lanka', 'India', 'Maldives')
+            )
+            SELECT (SELECT passengers FROM RegionalTraffic WHERE country_name = 'Sri Lanka') * 100.0 / SUM(passengers)
+                   AS SriLanka_Percentage
+            FROM RegionalTraffic
+        """,
+        'facts': """
+            WITH RegionalTraffic AS (
+                SELECT c.country_name, f.passengers
+                FROM fact_world_transport_stats f
+                JOIN dim_date d ON f.date_key = d.date_key
+                JOIN dim_country c ON f.country_key = c.country_key
+                WHERE d.year = %s AND c.country_name IN ('Sri Lanka', 'India', 'Maldives')
+            )
+            SELECT (SELECT passengers FROM RegionalTraffic WHERE country_name = 'Sri Lanka') * 100.0 / SUM(passengers)
+                   AS SriLanka_Percentage
+            FROM RegionalTraffic
+        """,
+    },
+    'world_missing_next_year': {
+        'question': "Countries with passenger data for a year but not the next (default: 2018, 2019)",
+        'params': (2018, 2019),
+        'aggregate': """
+            SELECT c.country_name
+            FROM agg_world_passengers_country_year g
+            JOIN dim_country c ON g.country_key = c.country_key
+            WHERE g.year = %s
+            AND c.country_key NOT IN (SELECT g2.country_key FROM agg_world_passengers_country_year g2 WHERE g2.year = %s)
+        """,
+        'facts': """
+            SELECT c.country_name
+            FROM fact_world_transport_stats f
+            JOIN dim_date d ON f.date_key = d.date_key
+            JOIN dim_country c ON f.country_key = c.country_key
+            WHERE d.year = %s
+            AND c.country_key NOT IN (
+                SELECT f2.country_key
+                FROM fact_world_transport_stats f2
+                JOIN dim_date d2 ON f2.date_key = d2.date_key
+                WHERE d2.year = %s
+            )
+        """,
+    },
+}
+
+def run_query(cursor, name, params=None, source='aggregate'):
+    """Runs a business query on the aggregates (source='facts': the original SQL); returns (columns, rows)."""
+    query = BUSINESS_QUERIES[name]
+    cursor.execute(query[source], params if params is not None else query.get('params', ()))
+    return [col[0] for col in cursor.description], cursor.fetchall()
+
+def _comparable(rows):
+    """Rows with numbers rounded (aggregates can sum in a different order) and sorted, for comparison."""
+    def value(v):
+        if isinstance(v, (float, Decimal)):
+            return round(float(v), 6)
+        return v
+    return sorted((tuple(value(v) for v in row) for row in rows), key=repr)
+
+def verify(cursor, names=None):
+    """Runs each query on the aggregates and on the fact tables; returns {name: True if the results match}."""
+    results = {}
+    for name in names or BUSINESS_QUERIES:
+        _, from_aggregates = run_query(cursor, name)
+        _, from_facts = run_query(cursor, name, source='facts')
+        results[name] = _comparable(from_aggregates) == _comparable(from_facts)
+    return results
+
+
+def main():
+    import etl  # only for DB_CONFIG and the connection helper
+    parser = argparse.ArgumentParser(description="Business queries answered from the aggregate tables")
+    parser.add_argument('queries', nargs='*', help="query names (default: all)")
+    parser.add_argument('--list', action='store_true', help="list the queries and exit")
+    parser.add_argument('--facts', action='store_true', help="run the original SQL on the fact tables instead")
+    parser.add_argument('--verify', action='store_true', help="check every query gives the same result both ways")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, query in BUSINESS_QUERIES.items():
+            print(f"{name:<32} {query['question']}")
+        return
+    conn = etl.mysql.connector.connect(**etl.DB_CONFIG)
+    try:
+        cursor = conn.cursor()
+        if args.verify:
+            results = verify(cursor, args.queries)
+            for name, ok in results.items():
+                print(f"{'✅' if ok else '❌'} {name}")
+            if not all(results.values()):
+                raise SystemExit(1)
+            return
+        for name in args.queries or BUSINESS_QUERIES:
+            columns, rows = run_query(cursor, name, source='facts' if args.facts else 'aggregate')
+            print(f"\n{name}: {BUSINESS_QUERIES[name]['question']}")
+            print('   ' + ' | '.join(columns))
+            for row in rows:
+                print('   ' + ' | '.join(str(v) for v in row))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
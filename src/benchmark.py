@@ -0,0 +1,363 @@
+"""
+Benchmarks for the ETL transform helpers, DB row conversion and staging loaders.
+
+Run from the src folder:
+    python benchmark.py [--rows 10000,1000000] [--only transforms,clean,loaders,compact,financial,bulk]
+                        [--repeat N] [--mysql] [--save-baseline] [--baseline PATH] [--tolerance 0.25]
+
+Inputs are synthetic dirty sources from datagen.py, at every size given with --rows.
+Loaders run against an in-memory SQLite stand-in. The staging loaders always do (they write
+to the real staging tables); the 'bulk' comparison uses etl.DB_CONFIG with --mysql.
+
+Every timing is kept as (seconds, rows); the staging loaders also keep rows_in and rows_out,
+as the business-key dedup can write fewer rows than it was given, and their rows/s are per
+row written. --save-baseline stores them; later runs compare against the stored baseline and
+flag any timing more than `tolerance` slower as a regression (the script then exits with
+status 1). Timings whose row counts differ from the baseline's are listed but not compared.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+import numpy as np
+import pandas as pd
+
+import etl
+import bulk_load
+import compact
+import datagen
+from datagen import make_financial_values
+
+DEFAULT_ROWS = [1_000_000]
+BASELINE_FILE = '../data/benchmarks/baseline.json'
+DEFAULT_TOLERANCE = 0.25
+
+
+# --- Synthetic data ---
+
+def make_clean_caa(n, seed=42):
+    """Builds n already-cleaned CAA rows, shaped like _transform_caa_movements output."""
+    rng = np.random.default_rng(seed)
+    passengers = pd.array(rng.integers(0, 500_000, size=n), dtype='Int64')
+    passengers[rng.random(n) < 0.02] = pd.NA
+    return pd.DataFrame({
+        'date_key': pd.array(20000101 + rng.integers(0, 24, size=n) * 100, dtype='Int64'),
+        'airport_iata': rng.choice(['CMB', 'MRIA', 'JAF', 'BTC', 'TRR'], size=n),
+        'passengers': passengers,
+        'aircraft_movements': pd.array(rng.integers(0, 5_000, size=n), dtype='Int64'),
+        'country': rng.choice(['Sri Lanka', 'SRI LANKA', ''], size=n),
+    })
+
+TRANSFORMS = {
+    'caa_movements': etl._transform_caa_movements,
+    'srilankan_financials': etl._transform_srilankan_financials,
+    'worldbank_transport': etl._transform_worldbank_transport,
+    'aircraft_details': etl._transform_aircraft_details,
+    'flight_routes': etl._transform_flight_routes,
+    'airport_reference': etl._transform_airport_reference,
+}
+
+LOADERS = {
+    'caa_movements': etl._load_stg_caa_movements,
+    'srilankan_financials': etl._load_stg_srilankan_financials,
+    'worldbank_transport': etl._load_stg_worldbank_transport,
+    'aircraft_details': etl._load_stg_aircraft_details,
+    'flight_routes': etl._load_stg_flight_routes,
+    'airport_reference': etl._load_stg_airport_reference,
+}
+
+_clean_cache = {}
+
+def clean_sources(n):
+    """Cleaned frames of every source at size n (generated and transformed once per size)."""
+    if n not in _clean_cache:
+        with _quiet():
+            _clean_cache[n] = {name: TRANSFORMS[name](df) for name, df in datagen.make_raw_sources(n).items()}
+    return _clean_cache[n]
+
+
+# --- Helpers ---
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def _best_of(repeat, func, setup=lambda: ()):
+    """Shortest of `repeat` runs of func(*setup()); setup isn't timed."""
+    return min(_timed(func, *setup())[1] for _ in range(repeat))
+
+@contextlib.contextmanager
+def _quiet():
+    """Silences the ETL's progress prints (and pandas warnings) while timing."""
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        yield
+
+def _report(label, secs, rows):
+    print(f"   -> {label:<32} {secs:8.3f}s  ({rows / secs:,.0f} rows/s)")
+
+
+class _SQLiteCursor:
+    """Lets the MySQL-style (%s) loaders run against sqlite3."""
+    def __init__(self, cursor):
+        self._cursor = cursor
+    @staticmethod
+    def _translate(sql):
+        sql = sql.replace('%s', '?').replace('<=>', 'IS').replace('NOW()', "datetime('now')")
+        return sql.replace('TRUNCATE TABLE', 'DELETE FROM')
+    def execute(self, sql, params=()):
+        return self._cursor.execute(self._translate(sql), params)
+    def executemany(self, sql, rows):
+        return self._cursor.executemany(self._translate(sql), rows)
+    def fetchone(self):
+        return self._cursor.fetchone()
+    def fetchall(self):
+        return self._cursor.fetchall()
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+    def close(self):
+        self._cursor.close()
+
+# SQLite versions of the staging tables (ddl/01_create_staging_tables..sql)
+STAGING_DDL = """
+CREATE TABLE stg_caa_movements (date_key INT, airport_iata VARCHAR(10), passengers BIGINT, aircraft_movements INT,
+    country VARCHAR(100), load_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE stg_srilankan_financials (year INT, metric VARCHAR(255), value DECIMAL(20, 2), currency VARCHAR(10),
+    notes TEXT, load_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE stg_worldbank_transport (year INT, country_name VARCHAR(255), country_code VARCHAR(10), passengers BIGINT,
+    load_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE stg_aircraft_details (aircraft_model VARCHAR(100), manufacturer VARCHAR(100), seat_capacity INT,
+    engine_type VARCHAR(100));
+CREATE TABLE stg_flight_routes (route_id VARCHAR(20), origin_iata VARCHAR(10), destination_iata VARCHAR(10),
+    distance_km INT);
+CREATE TABLE stg_airport_reference (iata_code VARCHAR(10), airport_name VARCHAR(255), city VARCHAR(100));
+"""
+
+CAA_COLUMNS = ['date_key', 'airport_iata', 'passengers', 'aircraft_movements', 'country']
+
+def _stand_in_db(use_mysql):
+    """Returns (conn, cursor, strategies) for a scratch copy of stg_caa_movements."""
+    ddl = ("CREATE TABLE bench_stg_caa (date_key INT, airport_iata VARCHAR(10), passengers BIGINT, "
+           "aircraft_movements INT, country VARCHAR(100))")
+    if use_mysql:
+        conn = etl.mysql.connector.connect(**etl.DB_CONFIG)
+        cursor = conn.cursor()
+        cursor.execute("DROP TABLE IF EXISTS bench_stg_caa")
+        cursor.execute(ddl)
+        return conn, cursor, list(bulk_load.BULK_STRATEGIES)
+    conn = sqlite3.connect(':memory:')
+    conn.execute(ddl)
+    # SQLite has no LOAD DATA INFILE
+    return conn, _SQLiteCursor(conn.cursor()), [s for s in bulk_load.BULK_STRATEGIES if s != 'infile']
+
+
+# --- Benchmarks ---
+# Each benchmark prints its timings and returns [(label, seconds, rows)].
+
+def bench_compact(n, repeat=1):
+    """
+    Every transform helper in default and compact mode (TRANSFORM_OPTIONS['compact']): time,
+    tracemalloc peak while it runs and deep memory of its output. Outputs must hold the same values.
+    """
+    print(f"\n🔄 Compact transform mode ({n:,} rows per source)")
+    raw = datagen.make_raw_sources(n)
+    results = []
+    for name, func in TRANSFORMS.items():
+        measured = {}
+        for mode in (False, True):
+            etl.TRANSFORM_OPTIONS['compact'] = mode
+            try:
+                with _quiet():
+                    secs = _best_of(repeat, func, lambda: (raw[name].copy(),))
+                    df = raw[name].copy()
+                    tracemalloc.start()
+                    out = func(df)
+                    peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+                    tracemalloc.stop()
+            finally:
+                etl.TRANSFORM_OPTIONS['compact'] = False
+            measured[mode] = (secs, peak, out)
+        (old_secs, old_peak, old), (new_secs, new_peak, new) = measured[False], measured[True]
+        pd.testing.assert_frame_equal(old.astype(object).where(old.notna(), None),
+                                      new.astype(object).where(new.notna(), None), check_dtype=False)
+        print(f"   -> {name:<22} time {old_secs:6.2f}s -> {new_secs:6.2f}s   "
+              f"peak {old_peak:8.1f} -> {new_peak:8.1f} MB   "
+              f"output {compact.memory_mb(old):8.1f} -> {compact.memory_mb(new):8.1f} MB")
+        results += [(f"{name} default", old_secs, n), (f"{name} compact", new_secs, n)]
+    return results
+
+def bench_financial_values(n, repeat=1):
+    """Row-wise apply vs vectorized financial value parsing, with a parity check."""
+    print(f"\n🔄 Financial value parsing ({n:,} rows)")
+    values = make_financial_values(n)
+
+    def rowwise(s):
+        return s.apply(lambda v: pd.Series(etl._clean_financial_value(v)))
+
+    old, old_secs = _timed(rowwise, values)
+    (new_val, new_cur), new_secs = _timed(etl._parse_financial_values, values)
+    new_secs = min([new_secs] + [_timed(etl._parse_financial_values, values)[1] for _ in range(repeat - 1)])
+
+    old_val = old[0].astype('Float64')
+    keep = old_val.notna()
+    pd.testing.assert_series_equal(old_val[keep], new_val.astype('Float64')[keep], check_names=False)
+    pd.testing.assert_series_equal(old[1][keep].astype(object), new_cur[keep].astype(object), check_names=False)
+    assert keep.equals(new_val.notna()), "rows dropped differ between implementations"
+
+    print(f"   -> row-wise apply: {old_secs:8.2f}s")
+    print(f"   -> vectorized:     {new_secs:8.2f}s  ({old_secs / new_secs:.1f}x faster, output identical)")
+    return [('row-wise apply', old_secs, n), ('vectorized', new_secs, n)]
+
+def bench_transforms(n, repeat=1):
+    """Times every _transform_* helper on synthetic dirty input."""
+    print(f"\n🔄 Transform helpers ({n:,} rows per source)")
+    raw = datagen.make_raw_sources(n)
+    results = []
+    for name, func in TRANSFORMS.items():
+        with _quiet():
+            secs = _best_of(repeat, func, lambda: (raw[name].copy(),))
+        _report(name, secs, n)
+        results.append((name, secs, n))
+    return results
+
+def bench_clean_df_for_db(n, repeat=1):
+    """Times the DataFrame -> DB tuple conversion on every cleaned source."""
+    print(f"\n🔄 _clean_df_for_db ({n:,} rows per source)")
+    results = []
+    for name, df in clean_sources(n).items():
+        secs = _best_of(repeat, etl._clean_df_for_db, lambda: (df,))
+        _report(name, secs, len(df))
+        results.append((name, secs, len(df)))
+    return results
+
+def bench_loaders(n, repeat=1):
+    """
+    Times every _load_stg_* loader (full reload, current BULK_LOAD_OPTIONS) on the SQLite stand-in.
+    Throughput is per row written to staging (rows_out), not per row passed in.
+    """
+    print(f"\n🔄 Staging loaders ({n:,} rows per source, SQLite stand-in, {etl.BULK_LOAD_OPTIONS['strategy']})")
+    conn = sqlite3.connect(':memory:')
+    conn.executescript(STAGING_DDL)
+    cursor = _SQLiteCursor(conn.cursor())
+    state_folder, etl.STATE_FOLDER = etl.STATE_FOLDER, tempfile.mkdtemp(prefix='bench_state_')
+    results = []
+    try:
+        for name, df in clean_sources(n).items():
+            with _quiet():
+                secs = _best_of(repeat, LOADERS[name], lambda: (conn, cursor, df))
+            rows_out = conn.execute(f"SELECT COUNT(*) FROM stg_{name}").fetchone()[0]
+            _report(name, secs, rows_out)
+            results.append((name, secs, rows_out, {'rows_in': len(df), 'rows_out': rows_out}))
+    finally:
+        etl.STATE_FOLDER = state_folder
+        conn.close()
+    return results
+
+def bench_bulk_load(n, use_mysql=False, batch_size=bulk_load.DEFAULT_BATCH_SIZE):
+    """Times the legacy full-list executemany against each bulk load strategy."""
+    target = 'MySQL' if use_mysql else 'SQLite stand-in'
+    print(f"\n🔄 Staging bulk load ({n:,} rows, {target}, batch size {batch_size})")
+    df = make_clean_caa(n)
+    conn, cursor, strategies = _stand_in_db(use_mysql)
+    sql = f"INSERT INTO bench_stg_caa ({', '.join(CAA_COLUMNS)}) VALUES ({','.join(['%s'] * len(CAA_COLUMNS))})"
+
+    def legacy():
+        cursor.executemany(sql, etl._clean_df_for_db(df))
+
+    runs = [('legacy executemany', legacy)]
+    runs += [(name, lambda name=name: bulk_load.bulk_insert(cursor, 'bench_stg_caa', CAA_COLUMNS, df, name, batch_size))
+             for name in strategies]
+    results = []
+    try:
+        for label, func in runs:
+            cursor.execute("DELETE FROM bench_stg_caa")
+            _, secs = _timed(func)
+            conn.commit()
+            _report(label, secs, n)
+            results.append((f"{label} ({target})", secs, n))
+    finally:
+        if use_mysql:
+            cursor.execute("DROP TABLE IF EXISTS bench_stg_caa")
+        conn.close()
+    return results
+
+
+BENCHMARKS = {
+    'transforms': lambda n, args: bench_transforms(n, args.repeat),
+    'clean': lambda n, args: bench_clean_df_for_db(n, args.repeat),
+    'loaders': lambda n, args: bench_loaders(n, args.repeat),
+    'compact': lambda n, args: bench_compact(n, args.repeat),
+    'financial': lambda n, args: bench_financial_values(n, args.repeat),
+    'bulk': lambda n, args: bench_bulk_load(n, args.mysql),
+}
+
+
+# --- Baseline ---
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Prints current vs baseline for every shared timing; returns the keys that regressed."""
+    shared = [key for key in results if key in baseline]
+    if not shared:
+        print("\n(No timings in common with the baseline.)")
+        return []
+    print(f"\n📏 Compared with baseline (regression = more than {tolerance:.0%} slower)")
+    regressions = []
+    for key in shared:
+        counts = [(field, baseline[key].get(field), results[key].get(field)) for field in ('rows', 'rows_in', 'rows_out')]
+        differ = ', '.join(f"{field} {old} -> {new}" for field, old, new in counts if old != new)
+        if differ:
+            print(f"   -> {key:<52} not compared, the row counts differ ({differ})")
+            continue
+        old, new = baseline[key]['seconds'], results[key]['seconds']
+        change = new / old - 1 if old > 0 else 0.0
+        flag = ''
+        if change > tolerance:
+            flag = '  ❌ REGRESSION'
+            regressions.append(key)
+        print(f"   -> {key:<52} {old:8.3f}s -> {new:8.3f}s  ({change:+.0%}){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="ETL benchmarks")
+    parser.add_argument('--rows', default=','.join(map(str, DEFAULT_ROWS)),
+                        help="comma-separated input sizes, e.g. 10000,100000,1000000 (default: %(default)s)")
+    parser.add_argument('--only', default=','.join(BENCHMARKS),
+                        help=f"comma-separated benchmarks to run (default: {','.join(BENCHMARKS)})")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per timing, the fastest is kept (default: 1)")
+    parser.add_argument('--mysql', action='store_true', help="run the 'bulk' comparison against etl.DB_CONFIG")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline file (default: %(default)s)")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run's timings as the baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="slowdown vs baseline that counts as a regression (default: %(default)s)")
+    args = parser.parse_args()
+
+    results = {}
+    for n in (int(r) for r in args.rows.split(',')):
+        for name in args.only.split(','):
+            for label, secs, rows, *counts in BENCHMARKS[name](n, args):
+                results[f"{name}/{label}@{n}"] = {'seconds': round(secs, 6), 'rows': rows, **(counts[0] if counts else {})}
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare_with_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against the baseline.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
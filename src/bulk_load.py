@@ -0,0 +1,93 @@
+"""
+Bulk loading strategies for the staging tables.
+
+Every strategy takes (cursor, table, columns, df, batch_size) and returns the number of rows
+sent to the database. Pick one by name through bulk_insert(); new strategies can be added to
+BULK_STRATEGIES.
+"""
+import csv
+import os
+import tempfile
+import pandas as pd
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def _uncategorize(df):
+    """Categorical columns (compact mode) as plain object columns, so they get the same NULL mapping."""
+    categorical = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+    return df.astype({col: object for col in categorical}) if categorical else df
+
+def rows_for_db(df):
+    """Converts a DataFrame into a list of tuples, turning NA/NaT/''/'nan' into None (SQL NULL)."""
+    df = _uncategorize(df)
+    df_clean = df.replace({pd.NaT: None, pd.NA: None, '': None, 'nan': None})
+    return [tuple(x) for x in df_clean.to_numpy()]
+
+def iter_row_batches(df, batch_size=DEFAULT_BATCH_SIZE):
+    """Yields lists of at most batch_size DB-ready tuples, never building the full list at once."""
+    for start in range(0, len(df), batch_size):
+        yield rows_for_db(df.iloc[start:start + batch_size])
+
+
+# --- Strategies ---
+
+def insert_executemany(cursor, table, columns, df, batch_size=DEFAULT_BATCH_SIZE):
+    """cursor.executemany() fed one batch at a time by the batch generator."""
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({','.join(['%s'] * len(columns))})"
+    total = 0
+    for batch in iter_row_batches(df, batch_size):
+        cursor.executemany(sql, batch)
+        total += len(batch)
+    return total
+
+def insert_multirow(cursor, table, columns, df, batch_size=DEFAULT_BATCH_SIZE):
+    """One INSERT ... VALUES (...),(...) statement per batch: a single round trip per batch_size rows."""
+    row_placeholder = f"({','.join(['%s'] * len(columns))})"
+    prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+    total = 0
+    for batch in iter_row_batches(df, batch_size):
+        sql = prefix + ','.join([row_placeholder] * len(batch))
+        cursor.execute(sql, [value for row in batch for value in row])
+        total += len(batch)
+    return total
+
+def load_data_infile(cursor, table, columns, df, batch_size=None):
+    """
+    Writes the DataFrame to a temporary CSV and loads it with LOAD DATA LOCAL INFILE.
+    Needs local_infile enabled on both the client connection and the MySQL server.
+    """
+    out = _uncategorize(df).copy()
+    for col in out.columns:
+        if out[col].dtype == object:
+            out[col] = out[col].replace({'': None, 'nan': None})
+            out[col] = out[col].where(out[col].isna(), out[col].astype(str).str.replace('\\', '\\\\', regex=False))
+
+    fd, path = tempfile.mkstemp(suffix='.csv', prefix=f'{table}_')
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+            out.to_csv(f, header=False, index=False, na_rep='\\N', quoting=csv.QUOTE_MINIMAL, lineterminator='\n')
+        sql = (
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '\\\\' "
+            f"LINES TERMINATED BY '\\n' ({', '.join(columns)})"
+        )
+        cursor.execute(sql, (path,))
+    finally:
+        os.remove(path)
+    return len(out)
+
+
+BULK_STRATEGIES = {
+    'multirow': insert_multirow,
+    'executemany': insert_executemany,
+    'infile': load_data_infile,
+}
+
+def bulk_insert(cursor, table, columns, df, strategy='multirow', batch_size=DEFAULT_BATCH_SIZE):
+    """Loads df (columns in the given order) into table with the named strategy."""
+    if strategy not in BULK_STRATEGIES:
+        raise ValueError(f"Unknown bulk load strategy '{strategy}'. Choose from: {', '.join(BULK_STRATEGIES)}")
+    if len(df) == 0:
+        return 0
+    return BULK_STRATEGIES[strategy](cursor, table, columns, df[list(columns)], batch_size)
@@ -0,0 +1,85 @@
+"""
+Compact column cleaning for the transform helpers (TRANSFORM_OPTIONS['compact']).
+
+Sources are read as strings, and most of their columns repeat a handful of values (airport
+codes, countries, metrics, years, ...). Here every column is factorized first, so the
+cleaning (strip, upper-case, regex removal, numeric parsing) runs once per distinct value and
+the result is spread back to the rows through the integer codes, without building a cleaned
+copy of every string. Low-cardinality text comes back as a categorical, numbers as the
+smallest nullable dtype that holds them.
+"""
+import numpy as np
+import pandas as pd
+
+# Text columns with at most this share of distinct values (of all rows) become categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+INTEGER_DTYPES = ['Int8', 'Int16', 'Int32', 'Int64']
+
+
+def _factorize(values):
+    """(codes, distinct values as a str Series); missing values get code -1."""
+    codes, uniques = pd.factorize(values)
+    return codes, pd.Series(np.asarray(uniques, dtype=object), dtype=object).astype(str)
+
+def _spread(unique_result, codes, index):
+    """Maps per-distinct-value results back to the rows (code -1 -> <NA>)."""
+    return pd.Series(pd.array(unique_result).take(codes, allow_fill=True), index=index)
+
+def map_unique(values, func):
+    """
+    func(distinct values as a str Series) -> Series (or tuple of Series) applied once per
+    distinct value, spread back to the rows.
+    """
+    codes, uniques = _factorize(values)
+    result = func(uniques)
+    if isinstance(result, tuple):
+        return tuple(_spread(part, codes, values.index) for part in result)
+    return _spread(result, codes, values.index)
+
+def clean_text(values, upper=False, max_ratio=CATEGORY_MAX_RATIO):
+    """Stripped (optionally upper-cased) text; a categorical when there are few distinct values."""
+    codes, uniques = _factorize(values)
+    cleaned = uniques.str.strip()
+    if upper:
+        cleaned = cleaned.str.upper()
+    if len(uniques) > max_ratio * max(len(values), 1):
+        return pd.Series(cleaned.to_numpy().take(codes), index=values.index, name=values.name, dtype=object).where(codes >= 0)
+    cleaned_codes, categories = pd.factorize(cleaned)
+    codes = np.where(codes >= 0, cleaned_codes[codes] if len(cleaned_codes) else -1, -1)
+    return pd.Series(pd.Categorical.from_codes(codes, categories), index=values.index, name=values.name)
+
+def clean_numbers(values, remove=None, kind='integer'):
+    """
+    Parses numbers once per distinct value, after removing the `remove` regex and whitespace.
+    Unparseable values become <NA>; the result is downcast (see downcast()).
+    """
+    def parse(uniques):
+        if remove:
+            uniques = uniques.str.replace(remove, '', regex=True)
+        numbers = pd.to_numeric(uniques.str.strip(), errors='coerce')
+        return numbers.astype('Int64' if kind == 'integer' else 'Float64')
+    return downcast(map_unique(values, parse).rename(values.name))
+
+def downcast(values):
+    """
+    Nullable numbers as the smallest Int8..Int64 that holds their range, or Float32 when every
+    value survives the round trip exactly (Float64 otherwise).
+    """
+    if pd.api.types.is_integer_dtype(values.dtype):
+        present = values.dropna()
+        low, high = (int(present.min()), int(present.max())) if len(present) else (0, 0)
+        for dtype in INTEGER_DTYPES:
+            info = np.iinfo(dtype.lower())
+            if info.min <= low and high <= info.max:
+                return values.astype(dtype)
+    if pd.api.types.is_float_dtype(values.dtype):
+        present = values.dropna().to_numpy(dtype='float64')
+        if np.array_equal(present.astype('float32').astype('float64'), present):
+            return values.astype('Float32')
+        return values.astype('Float64')
+    return values
+
+def memory_mb(df):
+    """Deep memory use of a DataFrame in MB (object strings included)."""
+    return round(df.memory_usage(deep=True).sum() / 1024 ** 2, 1)
@@ -0,0 +1,114 @@
+"""
+Small dependency-aware scheduler for the warehouse SQL steps.
+
+Steps are declared as a dict: name -> {'depends_on': [names], 'run': func(conn, cursor)}.
+A step starts as soon as all of its dependencies have finished, so independent steps run
+concurrently on worker threads. Each step borrows a connection from a db_pool.ConnectionPool
+through pool.run(), so it is retried on transient errors (deadlocks, dropped connections) and
+rolled back if it raises. A step must therefore be a single transaction that commits its own
+work.
+
+When a step fails, nothing new is started: its dependents are marked 'skipped', steps that
+had not started yet are marked 'cancelled', and only the steps already running are waited for
+(a statement in flight cannot be interrupted safely).
+"""
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def validate_steps(steps):
+    """Raises ValueError for unknown dependencies or dependency cycles."""
+    for name, step in steps.items():
+        unknown = [dep for dep in step.get('depends_on', ()) if dep not in steps]
+        if unknown:
+            raise ValueError(f"Step '{name}' depends on unknown step(s): {', '.join(unknown)}")
+
+    visiting, done = set(), set()
+    def visit(name, path):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+        visiting.add(name)
+        for dep in steps[name].get('depends_on', ()):
+            visit(dep, path + [name])
+        visiting.discard(name)
+        done.add(name)
+    for name in steps:
+        visit(name, [])
+
+def _dependents(steps, failed):
+    """All steps that depend, directly or transitively, on the failed step."""
+    found, frontier = set(), {failed}
+    while frontier:
+        frontier = {name for name, step in steps.items()
+                    if name not in found and frontier & set(step.get('depends_on', ()))}
+        found |= frontier
+    return found
+
+
+def run_dag(steps, pool, workers=4):
+    """
+    Runs the steps with up to `workers` in parallel, on connections borrowed from pool.
+
+    Returns a dict: name -> {'status': 'done' | 'failed' | 'skipped' | 'cancelled',
+    'seconds': wall time (for steps that ran), 'error': message (for failed steps)}.
+    """
+    validate_steps(steps)
+    results = {name: {'status': 'pending'} for name in steps}
+
+    def execute(name):
+        def work(conn):
+            cursor = conn.cursor()
+            try:
+                steps[name]['run'](conn, cursor)
+            finally:
+                cursor.close()
+        start = time.perf_counter()
+        pool.run(work)
+        return time.perf_counter() - start
+
+    workers = max(1, workers)
+    remaining = dict(steps)
+    running = {}
+    failed = False
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dag') as executor:
+        while remaining or running:
+            if not failed:
+                # Only hand out as many steps as there are idle workers, so a failure
+                # never finds other steps already queued inside the executor
+                finished = {n for n, r in results.items() if r['status'] == 'done'}
+                ready = [n for n, s in remaining.items() if set(s.get('depends_on', ())) <= finished]
+                for name in ready[:workers - len(running)]:
+                    running[executor.submit(execute, name)] = name
+                    results[name]['status'] = 'running'
+                    del remaining[name]
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = {'status': 'done', 'seconds': future.result()}
+                except Exception as e:
+                    print(f"❌ Step '{name}' failed: {e}")
+                    traceback.print_exc()
+                    results[name] = {'status': 'failed', 'error': str(e)}
+                    failed = True
+                    for dependent in _dependents(steps, name):
+                        if results[dependent]['status'] == 'pending':
+                            results[dependent]['status'] = 'skipped'
+                            remaining.pop(dependent, None)
+
+        for name in remaining:
+            results[name]['status'] = 'cancelled'
+    return results
+
+def print_step_timings(results):
+    """Prints one line per step with its status and wall time."""
+    print("   Step timings:")
+    for name, result in results.items():
+        seconds = f"{result['seconds']:7.2f}s" if 'seconds' in result else ' ' * 8
+        print(f"      {name:<30} {seconds}  {result['status']}")
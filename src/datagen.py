@@ -0,0 +1,225 @@
+"""
+Synthetic dirty source data for benchmarks and scale tests.
+
+Generates the three Excel sources (CAA movements, annual report, World Bank) at any size,
+with the same kinds of dirt the transforms clean up: thousands separators, em-dashes, 'N/A',
+'x'/'a' year suffixes, currency prefixes/suffixes, parenthesised negatives, mixed period
+formats, stray whitespace, inconsistent capitalisation and duplicate rows. Frames come back
+as strings, exactly like read_excel(na_filter=False, dtype=str) returns them.
+
+Apart from those exact duplicate rows, every row has its own business key (period and
+airport, year and metric, year and country, aircraft model): the airports, metrics and
+countries grow with the row count, so the staging dedup keeps ~98% of the rows at any size.
+
+Write workbooks into a folder the ETL can read with:
+    python datagen.py --rows 1000000 --out ../data/synthetic
+Excel caps a sheet at 1,048,576 rows, so bigger sources are split into numbered files
+(e.g. caa_passenger_movements_unclean_002.xlsx) that a SOURCE_FILES glob picks up.
+"""
+import argparse
+import functools
+import os
+import numpy as np
+import pandas as pd
+
+EXCEL_MAX_ROWS = 1_048_575   # one row is the header
+MONTHS = np.array(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
+LETTERS = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+COUNTRIES = np.array([('Sri Lanka', 'LK'), ('India', 'IN'), ('Maldives', 'MV'), ('Bangladesh', 'BD'),
+                      ('Pakistan', 'PK'), ('Nepal', 'NP'), ('Singapore', 'SG'), ('Thailand', 'TH')])
+METRICS = np.array(['Revenue', 'Operating Loss', 'Cargo Revenue', 'Passengers', 'Aircraft Fleet',
+                    'Employee Count', 'Passenger Load Factor'])
+NOTES = np.array(['includes code-share', 'high fuel costs', 'converted?', '', 'duplicate',
+                  'post-covid recovery', 'Target Met', 'trailing space '])
+
+
+def _pick(rng, values, n):
+    return values[rng.integers(0, len(values), size=n)]
+
+def _dirty_counts(rng, n, high, na_share=0.02):
+    """Integer counts as text: plain, with thousands separators, em-dashes or 'N/A'."""
+    numbers = pd.Series(rng.integers(0, high, size=n))
+    out = numbers.astype(str)
+    commas = rng.random(n) < 0.3
+    out[commas] = numbers[commas].map('{:,}'.format)
+    missing = rng.random(n) < na_share
+    out[missing] = _pick(rng, np.array(['—', 'N/A', '']), int(missing.sum()))
+    return out
+
+def _dirty_years(rng, years, suffix):
+    """Years as text, some with a stray suffix letter ('2021x')."""
+    years = pd.Series(years).astype(str)
+    suffixed = rng.random(len(years)) < 0.1
+    years[suffixed] = years[suffixed] + suffix
+    return years
+
+def _padded(rng, values, share=0.1):
+    """Text with stray leading or trailing spaces on a share of the values."""
+    values = pd.Series(values)
+    padded = rng.random(len(values)) < share
+    leading = rng.random(len(values)) < 0.5
+    values[padded & leading] = ' ' + values[padded & leading]
+    values[padded & ~leading] = values[padded & ~leading] + ' '
+    return values
+
+def _distinct_keys(rng, n, periods):
+    """
+    n distinct (period, member) index pairs. There are as many members (airports, metrics,
+    countries) as it takes for periods x members to be about twice n, so no key repeats.
+    """
+    members = max(1, -(-2 * n // periods))
+    flat = rng.choice(periods * members, size=n, replace=False)
+    return flat // members, flat % members
+
+def _codes(indices, width):
+    """Letter codes for member indices ('AAA', 'AAB', ...), longer than width when needed."""
+    indices = np.asarray(indices)
+    while len(indices) and 26 ** width <= indices.max():
+        width += 1
+    return functools.reduce(np.char.add, [LETTERS[indices // 26 ** p % 26] for p in reversed(range(width))])
+
+def make_financial_values(n, seed=42):
+    """Builds n messy financial value strings like the ones in the annual report."""
+    rng = np.random.default_rng(seed)
+    amounts = rng.integers(1, 10_000_000_000, size=n)
+    formatted = pd.Series(amounts).map('{:,}'.format)
+    templates = np.array([
+        '{}', 'USD {}', 'Rs. {}', '{} LKR', '(USD {})', '({})', ' {} ', '—', 'N/A', '0.{}',
+    ])
+    picks = rng.integers(0, len(templates), size=n)
+    return pd.Series([templates[p].format(v) for p, v in zip(picks, formatted)])
+
+def make_caa_movements(n, seed=42):
+    """Raw CAA passenger movements: mixed period formats, dirty counts, ~2% duplicate rows."""
+    rng = np.random.default_rng(seed)
+    periods, airports = _distinct_keys(rng, n, 12 * 35)  # months of 1990-2024
+    years = pd.Series(1990 + periods // 12).astype(str)
+    months = periods % 12
+    month_numbers = pd.Series(np.char.zfill(np.arange(1, 13).astype(str), 2)[months])
+    style = rng.integers(0, 3, size=n)
+    periods = (years + '-' + month_numbers + '-01 00:00:00').where(style == 0, years + '-' + month_numbers)
+    periods = periods.where(style != 1, years + '-' + pd.Series(MONTHS[months]))
+    df = pd.DataFrame({
+        'airport_iata': _padded(rng, _codes(airports, 3)),
+        'period': periods,
+        'passengers': _dirty_counts(rng, n, 500_000),
+        'aircraft_movements': _dirty_counts(rng, n, 10_000),
+        'country': _pick(rng, np.array(['Sri Lanka', 'SRI LANKA', 'Sri Lanka ', 'sri lanka']), n),
+    })
+    return _with_duplicates(rng, df)
+
+def make_annual_report(n, seed=42):
+    """Raw annual report metrics: 'x' year suffixes, currency/parenthesised values, padded metrics."""
+    rng = np.random.default_rng(seed)
+    years, metrics = _distinct_keys(rng, n, 25)  # 2000-2024
+    names = pd.Series(METRICS[metrics % len(METRICS)])
+    numbered = metrics >= len(METRICS)
+    names[numbered] = names[numbered] + ' ' + pd.Series(metrics // len(METRICS)).astype(str)[numbered]
+    df = pd.DataFrame({
+        'year': _dirty_years(rng, 2000 + years, 'x'),
+        'metric': _padded(rng, names),
+        'value': make_financial_values(n, seed),
+        'notes': _pick(rng, NOTES, n),
+    })
+    return _with_duplicates(rng, df)
+
+def make_worldbank_transport(n, seed=42):
+    """Raw World Bank air transport rows: 'a' year suffixes, dirty passenger counts."""
+    rng = np.random.default_rng(seed)
+    years, countries = _distinct_keys(rng, n, 35)  # 1990-2024
+    known = countries < len(COUNTRIES)
+    codes = pd.Series(_codes(np.maximum(countries - len(COUNTRIES), 0), 3))
+    codes[known] = COUNTRIES[countries[known], 1]
+    names = 'Country ' + codes
+    names[known] = COUNTRIES[countries[known], 0]
+    df = pd.DataFrame({
+        'country_name': names,
+        'country_code': codes.where(rng.random(n) > 0.05, codes + ' '),
+        'year': _dirty_years(rng, 1990 + years, 'a'),
+        'passengers': _dirty_counts(rng, n, 200_000_000),
+    })
+    return _with_duplicates(rng, df)
+
+def _with_duplicates(rng, df, share=0.02):
+    """Overwrites a share of the rows with copies of other rows (exact duplicates, like the samples)."""
+    n = len(df)
+    dupes = rng.random(n) < share
+    if n and dupes.any():
+        df.loc[dupes] = df.iloc[rng.integers(0, n, size=int(dupes.sum()))].to_numpy()
+    return df
+
+def make_aircraft_details(n, seed=42):
+    """Raw aircraft details (JSON source): padded text, seat counts with stray text."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'model': pd.Series([f'A{m} ' for m in 300 + rng.choice(max(100, 2 * n), size=n, replace=False)]),
+        'manufacturer': _pick(rng, np.array(['Airbus', ' Airbus', 'Boeing', 'ATR ']), n),
+        'seats': _pick(rng, np.array(['150', '180', '289', 'N/A', '']), n),
+        'engine': _pick(rng, np.array(['Turbofan', 'turboprop ', 'Turbofan ']), n),
+    })
+
+def make_airport_reference(n, seed=42):
+    """Raw airport reference rows (JSON source), ~2% repeated IATA codes."""
+    rng = np.random.default_rng(seed)
+    codes = pd.Series(rng.choice(max(1, 2 * n), size=n, replace=False)).map(lambda i: f'A{i:05d}')
+    df = pd.DataFrame({'iata': codes, 'name': codes + ' International Airport ', 'city': ' City ' + codes})
+    return _with_duplicates(rng, df)
+
+def make_flight_routes(n, seed=42):
+    """Raw legacy flight routes: lower-case padded airport codes, text distances."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'route_id': pd.Series(np.arange(n)).map('R{}'.format),
+        'origin_iata': _pick(rng, np.array(['cmb', ' CMB', 'mria', 'JAF ']), n),
+        'destination_iata': _pick(rng, np.array(['dxb', 'SIN', ' bkk', 'MLE ']), n),
+        'distance_km': _dirty_counts(rng, n, 12_000),
+    })
+
+GENERATORS = {
+    'caa_movements': ('caa_passenger_movements_unclean', make_caa_movements),
+    'srilankan_financials': ('srilankan_annual_report_unclean', make_annual_report),
+    'worldbank_transport': ('worldbank_air_transport_unclean', make_worldbank_transport),
+}
+
+# The other three sources (JSON files and the legacy DB), as in-memory frames only
+FRAME_GENERATORS = {
+    'aircraft_details': make_aircraft_details,
+    'airport_reference': make_airport_reference,
+    'flight_routes': make_flight_routes,
+}
+
+def make_raw_sources(rows, seed=42):
+    """All six raw sources as extract() would return them."""
+    sources = {name: make(rows, seed) for name, (_, make) in GENERATORS.items()}
+    sources.update({name: make(rows, seed) for name, make in FRAME_GENERATORS.items()})
+    return sources
+
+def write_workbooks(folder, rows, seed=42, sources=GENERATORS):
+    """Writes each source as one or more .xlsx files; returns {source: [paths]}."""
+    os.makedirs(folder, exist_ok=True)
+    written = {}
+    for name in sources:
+        stem, make = GENERATORS[name]
+        df = make(rows, seed)
+        parts = max(1, -(-len(df) // EXCEL_MAX_ROWS))
+        written[name] = []
+        for part in range(parts):
+            chunk = df.iloc[part * EXCEL_MAX_ROWS:(part + 1) * EXCEL_MAX_ROWS]
+            path = os.path.join(folder, f'{stem}.xlsx' if parts == 1 else f'{stem}_{part + 1:03d}.xlsx')
+            chunk.to_excel(path, index=False)
+            written[name].append(path)
+            print(f"✅ Wrote {len(chunk):,} rows to {path}")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic dirty source workbooks")
+    parser.add_argument('--rows', type=int, default=100_000, help="rows per source (default: 100000)")
+    parser.add_argument('--out', default='../data/synthetic', help="output folder (default: ../data/synthetic)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    write_workbooks(args.out, args.rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Small thread-safe MySQL connection pool shared by every ETL phase.
+
+Connections are opened lazily (at most `size` at a time) and handed back to the pool instead
+of being closed, so later phases skip the reconnect. A connection that has been idle for
+longer than `ping_after` seconds is health-checked with ping() before it is reused; broken
+ones are replaced. Opening a connection, and work run through ConnectionPool.run(), is
+retried with exponential backoff on transient errors (server gone away, lost connection,
+deadlock, lock wait timeout).
+
+Session settings (autocommit, unique_checks, foreign_key_checks, ...) can be requested per
+checkout, e.g. relaxed checks for bulk staging loads. They are put back to the pool's base
+settings when the connection is released, so the next borrower gets a clean session.
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+import pymysql
+
+# MySQL error codes worth retrying
+TRANSIENT_ERROR_CODES = {
+    1205,  # lock wait timeout
+    1213,  # deadlock
+    2003,  # can't connect to server
+    2006,  # server has gone away
+    2013,  # lost connection during query
+}
+# Of those, the ones after which the connection itself can't be trusted any more
+CONNECTION_ERROR_CODES = {2003, 2006, 2013}
+
+BASE_SESSION = {'autocommit': False, 'unique_checks': 1, 'foreign_key_checks': 1}
+
+
+def is_transient(exc):
+    return (isinstance(exc, (pymysql.err.OperationalError, pymysql.err.InterfaceError))
+            and bool(exc.args) and exc.args[0] in TRANSIENT_ERROR_CODES)
+
+def _is_connection_error(exc):
+    return bool(getattr(exc, 'args', None)) and exc.args[0] in CONNECTION_ERROR_CODES
+
+
+class ConnectionPool:
+    """
+    Pool of up to `size` connections made with connect(**config).
+    acquire() blocks while all connections are checked out.
+    """
+
+    def __init__(self, connect, config, size=4, retries=3, backoff=0.5, ping_after=30, session=None):
+        self.connect = connect
+        self.config = config
+        self.size = size
+        self.retries = retries
+        self.backoff = backoff
+        self.ping_after = ping_after
+        self.base_session = dict(BASE_SESSION, **(session or {}))
+        self._idle = queue.LifoQueue()   # (conn, last_used); most recently used first
+        self._slots = threading.BoundedSemaphore(size)
+        self._sessions = {}               # id(conn) -> settings currently applied
+        self._lock = threading.Lock()
+        self._closed = False
+
+    # --- Connections ---
+
+    def _open(self):
+        for attempt in range(self.retries + 1):
+            try:
+                conn = self.connect(**self.config)
+                break
+            except Exception as e:
+                if not is_transient(e) or attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                print(f"   (Connection attempt {attempt + 1} failed: {e}; retrying in {delay:.1f}s)")
+                time.sleep(delay)
+        with self._lock:
+            self._sessions[id(conn)] = {}
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._sessions.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass  # already broken
+
+    def _healthy(self, conn, last_used):
+        if time.monotonic() - last_used < self.ping_after:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _apply_session(self, conn, settings):
+        current = self._sessions[id(conn)]
+        changes = {k: v for k, v in settings.items() if current.get(k) != v}
+        if 'autocommit' in changes:
+            conn.autocommit(changes.pop('autocommit'))
+        if changes:
+            with conn.cursor() as cursor:
+                cursor.execute("SET SESSION " + ', '.join(f"{name} = %s" for name in changes),
+                               list(changes.values()))
+        current.update(settings)
+
+    def acquire(self, session=None):
+        """Checks out a connection with the base session settings plus `session` overrides."""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        self._slots.acquire()
+        try:
+            conn = None
+            while conn is None:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self._open()
+                    break
+                if not self._healthy(conn, last_used):
+                    self._discard(conn)
+                    conn = None
+            self._apply_session(conn, dict(self.base_session, **(session or {})))
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard=False):
+        """Returns a connection to the pool (rolling back anything uncommitted) or closes it."""
+        try:
+            if not discard and not self._closed:
+                try:
+                    conn.rollback()
+                    self._apply_session(conn, self.base_session)
+                    self._idle.put((conn, time.monotonic()))
+                    return
+                except Exception:
+                    pass  # couldn't reset it: don't hand it to anyone else
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, session=None):
+        """with pool.connection() as conn: ... (discards the connection if it broke)."""
+        conn = self.acquire(session)
+        broken = False
+        try:
+            yield conn
+        except Exception as e:
+            broken = _is_connection_error(e)
+            raise
+        finally:
+            self.release(conn, discard=broken)
+
+    def run(self, work, session=None):
+        """
+        Calls work(conn) on a pooled connection and returns its result, retrying the whole call
+        on transient errors. work must be a single transaction (it is rolled back before a retry).
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                with self.connection(session) as conn:
+                    return work(conn)
+            except Exception as e:
+                if not is_transient(e) or attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                print(f"   (Transient database error: {e}; retrying in {delay:.1f}s)")
+                time.sleep(delay)
+
+    def close(self):
+        """Closes every idle connection; connections still checked out are closed on release."""
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
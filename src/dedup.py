@@ -0,0 +1,132 @@
+"""
+Business-key deduplication of staging batches, with a key index kept between runs.
+
+Only the business key columns of a batch are hashed, into one 64-bit value per row (the same
+key hashes as staging_state.row_key_hashes()). Rows repeating a key are dropped, whether the
+repeat is within the batch or the key already came in an earlier batch of the same load
+(another chunk, or an overlapping file). Rows with a missing key part can't be matched on
+their key; among those only exact copies are dropped.
+
+Exact copies of a row are dropped silently. Rows of a key with other values are a conflict,
+settled by the on_conflict rule:
+  'fail' - raise a ValueError listing the conflicting keys, whatever the order of the rows
+  'last' - the last row of the key wins: a later row of the batch, or this batch over an
+           earlier one (the caller deletes the rows the earlier batch loaded)
+
+The index stores, per distinct key, the run that last loaded it and the content hash of the
+row kept (8 + 4 + 8 bytes a key, whatever the width of the rows). A batch's keys that were
+loaded in an earlier run are counted separately and kept: staging is either rebuilt or
+upserted by key on every run, so those rows replace the earlier ones rather than duplicating
+them.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+from staging_state import row_content_hashes, row_key_hashes
+
+CONFLICT_RULES = ('fail', 'last')
+
+
+class DedupIndex:
+    """Sorted key hashes with the run that last loaded each and its row's content hash, persisted as .npz."""
+
+    def __init__(self, path):
+        self.path = path
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.runs = np.empty(0, dtype=np.uint32)
+        self.rows = np.empty(0, dtype=np.uint64)
+        self.run = 0
+        if os.path.exists(path):
+            with np.load(path) as data:
+                self.keys, self.runs, self.run = data['keys'], data['runs'], int(data['run'])
+                self.rows = data['rows'] if 'rows' in data else np.zeros(len(self.keys), dtype=np.uint64)
+
+    def begin_run(self):
+        """Starts a new load (the first batch of a table in a run)."""
+        self.run += 1
+
+    def lookup(self, keys):
+        """(run that last loaded each key (0 = never), content hash of the row it kept)."""
+        if not len(self.keys):
+            return np.zeros(len(keys), dtype=np.uint32), np.zeros(len(keys), dtype=np.uint64)
+        pos = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        found = self.keys[pos] == keys
+        return (np.where(found, self.runs[pos], 0).astype(np.uint32),
+                np.where(found, self.rows[pos], 0).astype(np.uint64))
+
+    def add(self, keys, rows):
+        """Records keys (distinct) and the content hashes of their rows as loaded in the current run."""
+        merged = np.concatenate([self.keys, keys])
+        runs = np.concatenate([self.runs, np.full(len(keys), self.run, dtype=np.uint32)])
+        hashes = np.concatenate([self.rows, rows])
+        merged, last = np.unique(merged[::-1], return_index=True)  # keep the newest run of a key
+        self.keys, self.runs, self.rows = merged, runs[::-1][last], hashes[::-1][last]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp.npz'
+        np.savez(tmp_path, keys=self.keys, runs=self.runs, rows=self.rows, run=self.run)
+        os.replace(tmp_path, self.path)
+
+def deduplicate(df, key_columns, index=None, on_conflict='fail'):
+    """
+    Drops the rows of df whose business key repeats, within df or from an earlier batch of the
+    current run, and records the remaining keys in the index (index=None: only within df).
+    Conflicting rows of a key are settled by on_conflict (see the module docstring).
+    Returns (rows kept, report, conflicts, replaced):
+    report counts the 'within_batch' and 'earlier_batches' duplicates (dropped), the
+    'conflicting' rows that lost to another row of their key, the kept rows that 'replaced' an
+    earlier batch's row, and 'earlier_runs_kept', rows whose key an earlier run loaded (kept,
+    they replace it);
+    conflicts are the kept rows of the keys that had conflicting rows, replaced the kept rows
+    whose key an earlier batch loaded with other values.
+    """
+    if on_conflict not in CONFLICT_RULES:
+        raise ValueError(f"on_conflict must be one of {CONFLICT_RULES}, not {on_conflict!r}")
+    keys = row_key_hashes(df, key_columns)
+    content = row_content_hashes(df)
+    key_parts = df[key_columns].astype(object)
+    has_key = (key_parts.notna() & (key_parts != '')).all(axis=1).to_numpy()
+
+    within = np.zeros(len(df), dtype=bool)
+    conflicting = np.zeros(len(df), dtype=bool)  # rows of a key whose values differ from another row of it
+    lost = np.zeros(len(df), dtype=bool)         # dropped for a later row of their key with other values
+    if has_key.any():
+        keyed = pd.DataFrame({'key': keys[has_key], 'content': content[has_key]})
+        by_key = keyed.groupby('key')['content']
+        within[has_key] = keyed['key'].duplicated(keep='last').to_numpy()
+        conflicting[has_key] = (by_key.transform('nunique') > 1).to_numpy()
+        lost[has_key] = within[has_key] & (keyed['content'] != by_key.transform('last')).to_numpy()
+    if not has_key.all():
+        within[~has_key] = pd.Series(content[~has_key]).duplicated().to_numpy()
+
+    last = has_key & ~within
+    earlier_batches = earlier_runs = replaced = np.zeros(len(df), dtype=bool)
+    if index is not None:
+        seen, seen_content = index.lookup(keys)
+        earlier_runs = last & (seen > 0) & (seen < index.run)
+        loaded = last & (seen > 0) & (seen == index.run)
+        replaced = loaded & (content != seen_content)
+        earlier_batches = loaded & ~replaced
+        if replaced.any():
+            conflicting |= np.isin(keys, keys[replaced]) & has_key
+    if on_conflict == 'fail' and conflicting.any():
+        raise ValueError(_conflict_message(df[conflicting], key_columns))
+    if index is not None:
+        added = last & ~earlier_batches
+        index.add(keys[added], content[added])
+
+    keep = ~(within | earlier_batches)
+    report = {'within_batch': int(within.sum()), 'earlier_batches': int(earlier_batches.sum()),
+              'conflicting': int(lost.sum() + replaced.sum()), 'replaced': int(replaced.sum()),
+              'earlier_runs_kept': int(earlier_runs.sum())}
+    return df[keep], report, df[conflicting & keep], df[replaced]
+
+def _conflict_message(rows, key_columns, limit=5):
+    """Names the conflicting keys, sorted so the message doesn't depend on the order of the rows."""
+    conflict_keys = rows[key_columns].astype(str).drop_duplicates().sort_values(key_columns)
+    names = [', '.join(f"{col}={row[col]}" for col in key_columns) for _, row in conflict_keys.head(limit).iterrows()]
+    more = f" and {len(conflict_keys) - limit} more" if len(conflict_keys) > limit else ''
+    return (f"{len(conflict_keys)} business key(s) have rows with conflicting values: "
+            f"{'; '.join(names)}{more}")
@@ -0,0 +1,87 @@
+"""
+In-memory natural -> surrogate key lookups for the dimension tables.
+
+Each dimension's (natural key, surrogate key) pairs are read once per run into a pandas Index
+plus a NumPy array of surrogate keys, so a whole fact column is resolved with a single
+vectorized get_indexer() call instead of a LEFT JOIN on the server. Members that aren't in
+the dimension yet are inserted in one batch and then added to the cache.
+
+Natural keys are compared trimmed and upper-cased, like the server's case-insensitive
+collation does in the old JOINs. Blank, 'nan' and missing keys never resolve.
+"""
+import threading
+import numpy as np
+import pandas as pd
+from bulk_load import DEFAULT_BATCH_SIZE, bulk_insert
+
+
+def normalize_keys(values):
+    """Natural keys as trimmed upper-case strings; blanks/'nan'/missing become <NA>."""
+    keys = pd.Series(values, dtype=object).astype('string').str.strip().str.upper()
+    return keys.mask(keys.isin(['', 'NAN', 'NONE', '<NA>']))
+
+
+class DimensionKeyCache:
+    """
+    dimensions: {table: (natural_key_column, surrogate_key_column)}.
+    Safe to share between threads (e.g. the warehouse DAG steps).
+    """
+
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+        self._index = {}   # table -> (pd.Index of normalized natural keys, np.ndarray of surrogate keys)
+        self._lock = threading.Lock()
+
+    def _store(self, table, naturals, surrogates):
+        keys = normalize_keys(naturals)
+        new = pd.Series(np.asarray(surrogates, dtype=np.int64), index=pd.Index(keys)).loc[keys.notna().to_numpy()]
+        with self._lock:
+            if table in self._index:
+                old_index, old_values = self._index[table]
+                new = pd.concat([pd.Series(old_values, index=old_index), new])
+            new = new[~new.index.duplicated(keep='first')]
+            self._index[table] = (new.index, new.to_numpy(dtype=np.int64))
+
+    def load(self, cursor, table):
+        """(Re)reads all members of a dimension table."""
+        natural, surrogate = self.dimensions[table]
+        cursor.execute(f"SELECT {natural}, {surrogate} FROM {table}")
+        rows = cursor.fetchall()
+        with self._lock:
+            self._index.pop(table, None)
+        self._store(table, [r[0] for r in rows], [r[1] for r in rows])
+        return len(rows)
+
+    def missing(self, table, values):
+        """Distinct normalized natural keys among values that aren't in the cache."""
+        keys = normalize_keys(values).dropna().unique()
+        index, _ = self._index.get(table, (pd.Index([]), None))
+        return pd.Index(keys)[~pd.Index(keys).isin(index)]
+
+    def ensure_members(self, cursor, table, members, strategy='multirow', batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Inserts the rows of `members` (a DataFrame of the dimension's columns, natural key
+        included) whose natural key isn't cached yet, in one batch, then caches their new
+        surrogate keys. Returns the number of members inserted.
+        """
+        natural, surrogate = self.dimensions[table]
+        keys = normalize_keys(members[natural])
+        unseen = members[keys.isin(self.missing(table, members[natural])).to_numpy()]
+        unseen = unseen.loc[~normalize_keys(unseen[natural]).duplicated().to_numpy()]
+        if unseen.empty:
+            return 0
+        bulk_insert(cursor, table, list(unseen.columns), unseen, strategy, max(batch_size, len(unseen)))
+        placeholders = ','.join(['%s'] * len(unseen))
+        cursor.execute(f"SELECT {natural}, {surrogate} FROM {table} WHERE {natural} IN ({placeholders})",
+                       list(unseen[natural]))
+        rows = cursor.fetchall()
+        self._store(table, [r[0] for r in rows], [r[1] for r in rows])
+        return len(unseen)
+
+    def lookup(self, table, values):
+        """Surrogate keys for a column of natural keys (nullable Int64, <NA> where unresolved)."""
+        index, surrogates = self._index[table]
+        positions = index.get_indexer(normalize_keys(values))
+        result = pd.array(np.where(positions >= 0, surrogates[positions] if len(surrogates) else 0, 0), dtype='Int64')
+        result[positions < 0] = pd.NA
+        return pd.Series(result, index=getattr(values, 'index', None))
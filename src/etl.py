@@ -1,11 +1,36 @@
 import os
+import argparse
+import glob
+import numpy as np
 import pandas as pd
 import traceback
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import re
+import openpyxl
 import pymysql
 import mysql.connector
 from mysql.connector import errorcode
 
+from aggregates import AGGREGATES, refresh_aggregate
+from calendar_dim import DIM_DATE_COLUMNS, date_key_to_timestamp, missing_calendar_rows, parse_date_keys
+from dag import print_step_timings, run_dag
+from dedup import CONFLICT_RULES, DedupIndex, deduplicate
+from dim_keys import DimensionKeyCache
+import compact
+import instrumentation
+from instrumentation import measure_call
+from legacy_extract import stream_table
+from partitions import (add_year_partitions, drop_years_before, swap_partition, truncate_partition,
+                        year_partitions, year_start)
+from pipeline import print_pipeline_results, run_pipeline
+from db_pool import ConnectionPool
+from snapshot_export import export_star_schema
+from source_cache import SourceCache
+from bulk_load import BULK_STRATEGIES, DEFAULT_BATCH_SIZE, bulk_insert, rows_for_db
+from staging_state import (compute_fingerprints, diff_fingerprints, load_state, merge_fingerprints, read_state,
+                           row_key_hashes, save_state, write_state)
+
 # --- Setup ---
 try:
     # Use PyMySQL as the connector
@@ -23,7 +48,8 @@ DB_CONFIG = {
     'user': 'root',      # <-- !!! UPDATE THIS !!!
     'password': '1234', # <-- !!! UPDATE THIS !!!
     'database': 'Airlines',
-    'connect_timeout': 20
+    'connect_timeout': 20,
+    'local_infile': True          # Only used by the 'infile' bulk load strategy
 }
 
 # --- NEW: Configuration for a source database ---
@@ -40,186 +66,528 @@ DB_CONFIG_LEGACY = {
 # Define a folder for all your data source files
 DATA_SOURCE_FOLDER = '../data/raw'
 
+# Source name -> file (or glob, e.g. "caa_passenger_movements_*.xlsx") inside DATA_SOURCE_FOLDER
+SOURCE_FILES = {
+    "caa_movements": "caa_passenger_movements_unclean.xlsx",
+    "srilankan_financials": "srilankan_annual_report_unclean.xlsx",
+    "worldbank_transport": "worldbank_air_transport_unclean.xlsx",
+    "aircraft_details": "aircraft_details.json",
+    "airport_reference": "airport_reference.json" # <-- NEW Reference source
+}
+
+# Connection pools shared by all phases (see db_pool.py). size caps the connections open per
+# database; idle connections are pinged before reuse after ping_after seconds.
+POOL_OPTIONS = {
+    'size': 4,
+    'retries': 3,           # attempts after a transient error (gone away, deadlock, ...)
+    'backoff': 0.5,         # seconds, doubled on every retry
+    'ping_after': 30
+}
+
+# Session settings used while bulk loading staging (restored when the connection goes back
+# to the pool). Staging tables have no foreign keys and are loaded from de-duplicated frames.
+LOAD_SESSION = {
+    'unique_checks': 0,
+    'foreign_key_checks': 0
+}
+
+# Rows per chunk when streaming large workbooks straight into staging
+EXCEL_CHUNK_SIZE = 50000
+
+# Reading the legacy flight_routes table (see legacy_extract.py): rows per keyset chunk on
+# route_id, and how many route_id ranges are read in parallel (each on its own legacy connection)
+LEGACY_EXTRACT_OPTIONS = {
+    'chunk_size': 50000,
+    'partitions': 1
+}
+
+# How the staging tables are bulk loaded (see bulk_load.py):
+# 'multirow' = batched INSERT ... VALUES (...),(...), 'executemany' = batched executemany,
+# 'infile' = LOAD DATA LOCAL INFILE from a temporary CSV (server needs local_infile=ON)
+# incremental=True only writes new/changed rows instead of truncating and reloading.
+# key_conflicts: rows sharing a business key with other values 'fail' the load (listing the
+# keys) or the 'last' row / file wins (see dedup.py); exact copies are always just dropped.
+BULK_LOAD_OPTIONS = {
+    'strategy': 'multirow',
+    'batch_size': DEFAULT_BATCH_SIZE,
+    'incremental': False,
+    'key_conflicts': 'fail'
+}
+
+# On-disk cache of parsed sources (see source_cache.py). Entries are invalidated automatically
+# when a file's content or the ETL code changes; the least recently used are evicted past max_bytes.
+SOURCE_CACHE_OPTIONS = {
+    'enabled': True,
+    'transformed': True,          # also cache the cleaned DataFrames
+    'folder': '../data/cache',
+    'max_bytes': 2 * 1024 ** 3
+}
+
+# Modules whose code shapes the cleaned DataFrames; a change to any of them invalidates the
+# cached cleaned frames.
+CLEANING_MODULES = ['etl.py', 'calendar_dim.py', 'compact.py']
+
+# Columnar snapshot of the star schema after the warehouse step (see snapshot_export.py):
+# Parquet files per table (facts split by year), only changed partitions are rewritten
+EXPORT_OPTIONS = {
+    'enabled': False,
+    'folder': '../data/export',
+    'chunk_size': 100_000,
+    'compression': 'snappy'
+}
+
+# Where run state (staging fingerprints and watermarks, ...) is kept between runs
+STATE_FOLDER = '../data/state'
+WAREHOUSE_STATE_FILE = 'warehouse_state.json'
+
+# fact_refresh: 'full' rebuilds every fact table, 'merge' only the date_key slices whose
+# staging rows were loaded since the last successful run (one transaction per table, or per
+# year with partition_swap)
+# workers: how many warehouse SQL steps (and connections) may run at the same time
+# fact_source: 'staging' builds facts from the staging tables with SQL, 'direct' loads them
+# straight from the transformed DataFrames (unresolved_keys: 'skip' or 'fail' such rows)
+# aggregates: refresh the summary tables of aggregates.py after their facts
+# partition_swap: facts partitioned by year (partitions.py) are refreshed a year at a time by
+# exchanging partitions instead of DELETE + INSERT; each year commits on its own, so a full
+# refresh is not atomic across years
+WAREHOUSE_OPTIONS = {
+    'fact_refresh': 'full',
+    'workers': 4,
+    'fact_source': 'staging',
+    'unresolved_keys': 'skip',
+    'aggregates': True,
+    'partition_swap': True
+}
+
+# Formats tried, in order, for the CAA 'period' column (anything pd.to_datetime's format=
+# accepts; 'mixed' parses what is left element by element). Each distinct period is parsed once.
+PERIOD_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%Y-%m', '%Y-%b', '%Y-%B', '%b %Y', '%B %Y', 'mixed']
+
+# compact=True makes the transforms clean each distinct value once and keep text columns with
+# at most category_max_ratio distinct values (of all rows) as categoricals, numbers as the
+# smallest nullable dtype that holds them (see compact.py). Cuts memory on large extracts.
+TRANSFORM_OPTIONS = {
+    'compact': False,
+    'category_max_ratio': compact.CATEGORY_MAX_RATIO
+}
+
+# Where the JSON run reports (per-stage timings, rows, memory) are written
+REPORT_FOLDER = '../data/reports'
+
+# Processes used to parse source files in parallel during extract (1 = read serially)
+EXTRACT_WORKERS = min(4, os.cpu_count() or 1)
+
+# Pipelined mode (--pipeline, see pipeline.py): every source goes through extract -> transform
+# -> load on its own. Threads per stage (extract uses one per extract worker, plus one for the
+# legacy DB), and how many sources may wait between two stages before upstream blocks.
+PIPELINE_OPTIONS = {
+    'transform_workers': 2,
+    'load_workers': 2,
+    'queue_size': 1
+}
+
 
 # --- Transform Helper Functions ---
 
-def _transform_caa_movements(df):
-    """Cleans the CAA passenger movements data."""
-    print("  -> Transforming CAA data...")
-    df = df.drop_duplicates()
-    
-    # Clean text fields
-    df['airport_iata'] = df['airport_iata'].astype(str).str.strip()
-    df['country'] = df['country'].astype(str).str.strip()
+# Characters stripped from financial values before numeric conversion.
+FINANCIAL_STRIP_PATTERN = r'[USD,Rs.,LKR\s]'
 
-    # Clean numeric fields (remove commas, dashes, 'N/A')
-    df['passengers'] = df['passengers'].astype(str).str.replace(r'[,—N/A]', '', regex=True).str.strip()
-    df['passengers'] = pd.to_numeric(df['passengers'], errors='coerce').astype('Int64')
-    
-    df['aircraft_movements'] = df['aircraft_movements'].astype(str).str.replace(r'[,—]', '', regex=True).str.strip()
-    df['aircraft_movements'] = pd.to_numeric(df['aircraft_movements'], errors='coerce').astype('Int64')
+def _clean_financial_value(val):
+    """Parses a single messy currency value into (value, currency). Row-wise reference version."""
+    val_str = str(val).strip()
+    currency = 'LKR'  # Default
+    if 'USD' in val_str: currency = 'USD'
+    if 'Rs.' in val_str: currency = 'LKR'
+
+    is_negative = False
+    if val_str.startswith('(') and val_str.endswith(')'):
+        is_negative = True
+        val_str = val_str.strip('()')
+
+    val_str = re.sub(FINANCIAL_STRIP_PATTERN, '', val_str, flags=re.IGNORECASE)
+    val_str = val_str.replace('—', '').replace('N/A', '')
+
+    try:
+        num_val = float(val_str)
+        if is_negative:
+            num_val = -num_val
+        return num_val, currency
+    except (ValueError, TypeError):
+        return pd.NA, pd.NA
+
+def _parse_financial_values(values):
+    """
+    Vectorized version of _clean_financial_value for a whole column.
+    Returns a (value, currency) pair of Series aligned to the input index.
+    """
+    val_str = values.astype(str).str.strip()
+
+    # Currency: 'Rs.' wins over 'USD', everything else defaults to LKR
+    is_usd = val_str.str.contains('USD', regex=False) & ~val_str.str.contains('Rs.', regex=False)
+    currency = pd.Series('LKR', index=val_str.index, dtype=object).mask(is_usd, 'USD')
+
+    # Parenthesised values are negative
+    is_negative = val_str.str.startswith('(') & val_str.str.endswith(')')
+    val_str = val_str.mask(is_negative, val_str.str.strip('()'))
+
+    val_str = val_str.str.replace(FINANCIAL_STRIP_PATTERN, '', regex=True, flags=re.IGNORECASE)
+    val_str = val_str.str.replace('—', '', regex=False).str.replace('N/A', '', regex=False)
+
+    num_val = pd.to_numeric(val_str, errors='coerce')
+
+    # Anything pandas could not parse but float() can (e.g. '1_000', or 'nan', which float()
+    # accepts as a value) goes through the scalar parser, once per distinct string.
+    unparsed = num_val.isna().to_numpy()
+    leftover = unparsed & (val_str != '').to_numpy()
+    if leftover.any():
+        fallback, invalid = {}, set()
+        for s in val_str[leftover].unique():
+            try:
+                fallback[s] = float(s)
+            except (ValueError, TypeError):
+                fallback[s] = float('nan')
+                invalid.add(s)
+        num_val = num_val.astype('float64')
+        num_val[leftover] = val_str[leftover].map(fallback)
+        unparsed[leftover] = val_str[leftover].isin(invalid).to_numpy()
+
+    num_val = num_val.astype('float64')
+    num_val = num_val.mask(is_negative, -num_val)
+    currency = currency.mask(unparsed, pd.NA)
+    return num_val, currency
+
+# Column cleaners shared by the transform helpers. With TRANSFORM_OPTIONS['compact'] they clean
+# each distinct value once and return categoricals / downcast numbers (see compact.py).
+
+def _clean_text(values, upper=False):
+    """Stripped (optionally upper-cased) text column."""
+    if TRANSFORM_OPTIONS['compact']:
+        return compact.clean_text(values, upper, TRANSFORM_OPTIONS['category_max_ratio'])
+    values = values.astype(str).str.strip()
+    return values.str.upper() if upper else values
+
+def _clean_integers(values, remove=None):
+    """Integer column after removing the `remove` regex; anything unparseable becomes <NA>."""
+    if TRANSFORM_OPTIONS['compact']:
+        return compact.clean_numbers(values, remove)
+    if remove:
+        values = values.astype(str).str.replace(remove, '', regex=True).str.strip()
+    return pd.to_numeric(values, errors='coerce').astype('Int64')
+
+def _clean_financial_values(values):
+    """(value, currency) columns of the annual report."""
+    if TRANSFORM_OPTIONS['compact']:
+        value, currency = compact.map_unique(values, _parse_financial_values)
+        return compact.downcast(value.astype('Float64')), currency.astype('category')
+    value, currency = _parse_financial_values(values)
+    return value.astype('Float64'), currency
+
+def _transform_caa_movements(df, period_formats=None):
+    """
+    Cleans the CAA passenger movements data.
+    period_formats overrides PERIOD_FORMATS, the formats tried (in order) for each period.
+    """
+    print("  -> Transforming CAA data...")
 
     # Standardize date period to date_key
-    df['period_dt'] = pd.to_datetime(df['period'], errors='coerce', infer_datetime_format=True)
-    df['date_key'] = df['period_dt'].dt.strftime('%Y%m%d').astype('Int64')
-    
-    # Select and filter final columns
-    final_df = df[['date_key', 'airport_iata', 'passengers', 'aircraft_movements', 'country']]
-    final_df = final_df.dropna(subset=['date_key'])
-    return final_df
+    date_key = parse_date_keys(df['period'], period_formats or PERIOD_FORMATS)
+    if TRANSFORM_OPTIONS['compact']:
+        date_key = compact.downcast(date_key)
+
+    final_df = pd.DataFrame({
+        'date_key': date_key,
+        'airport_iata': _clean_text(df['airport_iata']),
+        # Clean numeric fields (remove commas, dashes, 'N/A')
+        'passengers': _clean_integers(df['passengers'], r'[,—N/A]'),
+        'aircraft_movements': _clean_integers(df['aircraft_movements'], r'[,—]'),
+        'country': _clean_text(df['country']),
+    })
+    return final_df.dropna(subset=['date_key'])
 
 def _transform_srilankan_financials(df):
     """Cleans the SriLankan annual report data."""
     print("  -> Transforming SriLankan financials data...")
-    df = df.drop_duplicates()
 
     # Clean year (remove 'x', convert to number)
-    df['year'] = df['year'].astype(str).str.replace('x', '', regex=False).str.strip()
-    df['year'] = pd.to_numeric(df['year'], errors='coerce').astype('Int64')
-    df = df.dropna(subset=['year'])
-
-    # Clean text fields
-    df['metric'] = df['metric'].astype(str).str.strip()
-    df['notes'] = df['notes'].astype(str).str.strip()
-
-    def clean_financial_value(val):
-        """Helper to parse messy currency values."""
-        val_str = str(val).strip()
-        currency = 'LKR'  # Default
-        if 'USD' in val_str: currency = 'USD'
-        if 'Rs.' in val_str: currency = 'LKR'
-        
-        is_negative = False
-        if val_str.startswith('(') and val_str.endswith(')'):
-            is_negative = True
-            val_str = val_str.strip('()')
-            
-        val_str = re.sub(r'[USD,Rs.,LKR\s]', '', val_str, flags=re.IGNORECASE)
-        val_str = val_str.replace('—', '').replace('N/A', '')
-        
-        try:
-            num_val = float(val_str)
-            if is_negative:
-                num_val = -num_val
-            return pd.Series([num_val, currency])
-        except (ValueError, TypeError):
-            return pd.Series([pd.NA, pd.NA])
-
-    df[['value', 'currency']] = df['value'].apply(clean_financial_value)
-    
-    # Select and filter final columns
-    final_df = df[['year', 'metric', 'value', 'currency', 'notes']]
-    final_df = final_df.dropna(subset=['value'])
-    final_df['value'] = final_df['value'].astype('Float64')
-    return final_df
+    year = _clean_integers(df['year'], 'x')
+    df = df[year.notna()]
+
+    value, currency = _clean_financial_values(df['value'])
+    final_df = pd.DataFrame({
+        'year': year[year.notna()],
+        'metric': _clean_text(df['metric']),
+        'value': value,
+        'currency': currency,
+        'notes': _clean_text(df['notes']),
+    })
+    return final_df.dropna(subset=['value'])
 
 def _transform_worldbank_transport(df):
     """Cleans the World Bank air transport data."""
     print("  -> Transforming World Bank data...")
-    df = df.drop_duplicates()
 
     # Clean year (remove 'a', convert to number)
-    df['year'] = df['year'].astype(str).str.replace('a', '', regex=False).str.strip()
-    df['year'] = pd.to_numeric(df['year'], errors='coerce').astype('Int64')
-    df = df.dropna(subset=['year'])
-
-    # Clean numeric fields
-    df['passengers'] = df['passengers'].astype(str).str.replace(r'[,—]', '', regex=True).str.strip()
-    df['passengers'] = pd.to_numeric(df['passengers'], errors='coerce').astype('Int64')
-    
-    # Clean text fields
-    df['country_name'] = df['country_name'].astype(str).str.strip()
-    df['country_code'] = df['country_code'].astype(str).str.strip()
+    year = _clean_integers(df['year'], 'a')
+    df = df[year.notna()]
 
-    # Select and filter final columns
-    final_df = df[['year', 'country_name', 'country_code', 'passengers']]
-    return final_df
+    return pd.DataFrame({
+        'year': year[year.notna()],
+        'country_name': _clean_text(df['country_name']),
+        'country_code': _clean_text(df['country_code']),
+        'passengers': _clean_integers(df['passengers'], r'[,—]'),
+    })
 
 # --- NEW: Transform helper for JSON data ---
 def _transform_aircraft_details(df):
     """Cleans the aircraft details data from JSON."""
     print("  -> Transforming Aircraft Details (JSON) data...")
-    df = df.drop_duplicates()
 
     # Rename columns for consistency
-    df = df.rename(columns={'model': 'aircraft_model', 'seats': 'seat_capacity', 'engine': 'engine_type'})
-
-    # Clean text fields
-    df['aircraft_model'] = df['aircraft_model'].astype(str).str.strip()
-    df['manufacturer'] = df['manufacturer'].astype(str).str.strip()
-    df['engine_type'] = df['engine_type'].astype(str).str.strip()
-    df['seat_capacity'] = pd.to_numeric(df['seat_capacity'], errors='coerce').astype('Int64')
-
-    return df[['aircraft_model', 'manufacturer', 'seat_capacity', 'engine_type']]
+    return pd.DataFrame({
+        'aircraft_model': _clean_text(df['model']),
+        'manufacturer': _clean_text(df['manufacturer']),
+        'seat_capacity': _clean_integers(df['seats']),
+        'engine_type': _clean_text(df['engine']),
+    })
 
 # --- NEW: Transform helper for Database source data ---
 def _transform_flight_routes(df):
     """Cleans the flight routes data from the legacy database."""
     print("  -> Transforming Flight Routes (DB) data...")
-    df['origin_iata'] = df['origin_iata'].astype(str).str.strip().str.upper()
-    df['destination_iata'] = df['destination_iata'].astype(str).str.strip().str.upper()
-    df['distance_km'] = pd.to_numeric(df['distance_km'], errors='coerce').astype('Int64')
+    df['origin_iata'] = _clean_text(df['origin_iata'], upper=True)
+    df['destination_iata'] = _clean_text(df['destination_iata'], upper=True)
+    df['distance_km'] = _clean_integers(df['distance_km'])
     return df
 # -- transformed_flight_routes
 # --- NEW: Transform helper for airport reference data ---
 def _transform_airport_reference(df):
     """Cleans the airport reference data from JSON."""
     print("  -> Transforming Airport Reference (JSON) data...")
-    df = df.drop_duplicates(subset=['iata'])
 
     # Rename columns for consistency
-    df = df.rename(columns={'iata': 'iata_code', 'name': 'airport_name'})
+    return pd.DataFrame({
+        'iata_code': _clean_text(df['iata']),
+        'airport_name': _clean_text(df['name']),
+        'city': _clean_text(df['city']),
+    })
 
-    # Clean text fields
-    for col in ['iata_code', 'airport_name', 'city']:
-        df[col] = df[col].astype(str).str.strip()
-    return df[['iata_code', 'airport_name', 'city']]
 
 # --- ETL Pipeline ---
 
-def extract():
-    """Extract Phase: Reads data from all source Excel files in the data_sources folder."""
+def _convert_excel_cell(cell):
+    """Converts an openpyxl cell the same way pd.read_excel(na_filter=False, dtype=str) does."""
+    if cell.value is None:
+        return ''
+    if cell.data_type == 'e':
+        return 'nan'
+    if cell.data_type == 'n' and int(cell.value) == cell.value:
+        return str(int(cell.value))
+    return str(cell.value)
+
+def _iter_excel_chunks(path, chunk_size=EXCEL_CHUNK_SIZE):
+    """
+    Streams the first sheet of a workbook as DataFrames of at most chunk_size rows,
+    using openpyxl's read-only row iterator so memory stays flat for any sheet size.
+    """
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows()
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [_convert_excel_cell(c) or f"Unnamed: {i}" for i, c in enumerate(header)]
+        width = len(columns)
+
+        buffer = []
+        for row in rows:
+            values = [_convert_excel_cell(c) for c in row[:width]]
+            if not any(values):
+                continue  # blank lines are skipped, like read_excel
+            buffer.append(values + [''] * (width - len(values)))
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=columns, dtype=str)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns, dtype=str)
+    finally:
+        wb.close()
+
+def _resolve_source_paths(name):
+    """Expands a SOURCE_FILES entry (a file name or a glob like 'caa_*.xlsx') into sorted paths."""
+    return sorted(glob.glob(os.path.join(DATA_SOURCE_FOLDER, SOURCE_FILES[name])))
+
+def _read_source_file(path):
+    """Reads one Excel or JSON source file. Runs inside the extract process pool."""
+    if path.endswith('.xlsx'):
+        return pd.read_excel(path, na_filter=False, dtype=str)
+    elif path.endswith('.json'):
+        return pd.read_json(path, dtype=str)
+    raise ValueError(f"Unsupported source file type: {path}")
+
+FLIGHT_ROUTE_COLUMNS = ['route_id', 'origin_iata', 'destination_iata', 'distance_km']
+
+def _iter_flight_routes():
+    """Yields the legacy flight_routes table in keyset chunks on route_id (see legacy_extract.py)."""
+    return stream_table(_get_pool('legacy'), 'flight_routes', FLIGHT_ROUTE_COLUMNS, 'route_id',
+                        LEGACY_EXTRACT_OPTIONS['chunk_size'], LEGACY_EXTRACT_OPTIONS['partitions'])
+
+def _read_flight_routes():
+    """Reads the flight_routes table from the legacy database source."""
+    chunks = list(_iter_flight_routes())
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=FLIGHT_ROUTE_COLUMNS)
+
+def _extract_error(e):
+    """Message recorded for a source that failed to extract; a missing reader library gets an install hint."""
+    if isinstance(e, ImportError):
+        return f"{e} (Did you remember to 'pip install openpyxl' ?)"
+    return str(e)
+
+def _collect_source_results(file_futures, errors):
+    """Waits for every file future; returns {source: [frames]} for sources whose files all succeeded."""
+    results = {}
+    for name, futures in file_futures.items():
+        try:
+            results[name] = [f.result() for f in futures]
+        except Exception as e:
+            errors[name] = _extract_error(e)
+    return results
+
+def _read_files(pending, workers, errors):
+    """
+    Parses {source: [paths]} in a process pool (or serially for workers=1); returns {source: [frames]}.
+    Each file's read is measured in the process that parsed it and added to the run report.
+    """
+    read = partial(measure_call, _read_source_file)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            file_futures = {name: [pool.submit(read, p) for p in paths]
+                            for name, paths in pending.items()}
+            results = _collect_source_results(file_futures, errors)
+    else:
+        results = {}
+        for name, paths in pending.items():
+            try:
+                results[name] = [read(p) for p in paths]
+            except Exception as e:
+                errors[name] = _extract_error(e)
+
+    for name, measured in results.items():
+        for path, (df, metrics) in zip(pending[name], measured):
+            instrumentation.record('extract', os.path.basename(path), source=name, rows_out=len(df), **metrics)
+    return {name: [df for df, _ in measured] for name, measured in results.items()}
+
+def extract(skip_sources=(), workers=EXTRACT_WORKERS, cache=None):
+    """
+    Extract Phase: Reads data from all source files in the data_sources folder and the legacy DB.
+    Spreadsheets/JSON files are parsed in a process pool of `workers` processes (1 = serially)
+    while the legacy database is read on a separate thread. Sources listed in skip_sources are
+    left out (e.g. because they are streamed instead).
+    With a SourceCache, unchanged files are loaded from the cache instead of being parsed, and
+    a source whose cleaned result is cached is returned directly as '<source>_clean'.
+    Every source is attempted; failures are reported per source and None is returned if any failed.
+    """
     print("\n--- 1. EXTRACT ---")
-    print(f"Reading data from source folder: '{DATA_SOURCE_FOLDER}'")
+    print(f"Reading data from source folder: '{DATA_SOURCE_FOLDER}' ({workers} worker(s))")
     dataframes = {}
-    
-    source_files = {
-        "caa_movements": "caa_passenger_movements_unclean.xlsx",
-        "srilankan_financials": "srilankan_annual_report_unclean.xlsx",
-        "worldbank_transport": "worldbank_air_transport_unclean.xlsx",
-        "aircraft_details": "aircraft_details.json",
-        "airport_reference": "airport_reference.json" # <-- NEW Reference source
-    }
-    
-    try:
-        # --- Part 1: Read from files (Excel, JSON) ---
-        for name, filename in source_files.items():
-            path = os.path.join(DATA_SOURCE_FOLDER, filename) 
-            if not os.path.exists(path):
-                print(f"❌ ERROR: File not found: {path}"); return None
-            
-            # --- MODIFIED: Handle different file types ---
-            if filename.endswith('.xlsx'):
-                dataframes[name] = pd.read_excel(path, na_filter=False, dtype=str)
-            elif filename.endswith('.json'):
-                dataframes[name] = pd.read_json(path, dtype=str)
-
-            print(f"✅ Read {len(dataframes[name])} rows from {filename}")
-
-        # --- Part 2: Read from a database source ---
-        print("\nReading data from legacy database source...")
-        # This now connects to the source DB and reads from a pre-existing table.
-        # The data creation logic has been removed to simulate a real-world scenario.
-        with mysql.connector.connect(**DB_CONFIG_LEGACY) as conn:
-            sql_query = "SELECT route_id, origin_iata, destination_iata, distance_km FROM flight_routes"
-            dataframes['flight_routes'] = pd.read_sql(sql_query, conn)
-            print(f"✅ Read {len(dataframes['flight_routes'])} rows from database '{DB_CONFIG_LEGACY['database']}', table 'flight_routes'")
-            
-        return dataframes
-    except Exception as e:
-        print(f"❌ EXTRACT ERROR: Could not read Excel files. Details: {e}");
-        print("   (Did you remember to 'pip install openpyxl' ?)")
+    errors = {}
+
+    # --- Part 1: Work out which files belong to which source ---
+    source_paths = {}
+    for name, pattern in SOURCE_FILES.items():
+        if name in skip_sources:
+            print(f"⏭️  Skipping {pattern} (streamed into staging)")
+            continue
+        paths = _resolve_source_paths(name)
+        if not paths:
+            errors[name] = f"File not found: {os.path.join(DATA_SOURCE_FOLDER, pattern)}"
+        else:
+            source_paths[name] = paths
+
+    # --- Part 2: Reuse cached results for unchanged files ---
+    frames = {name: [None] * len(paths) for name, paths in source_paths.items()}
+    if cache:
+        for name, paths in list(source_paths.items()):
+            if SOURCE_CACHE_OPTIONS['transformed']:
+                clean_df = cache.get_transformed(_cache_name(name), paths)
+                if clean_df is not None:
+                    dataframes[f'{name}_clean'] = clean_df
+                    del source_paths[name], frames[name]
+                    print(f"⚡ Loaded cleaned {name} from cache ({len(clean_df)} rows)")
+                    continue
+            frames[name] = [cache.get_raw(p) for p in paths]
+    pending = {name: [p for p, df in zip(paths, frames[name]) if df is None]
+               for name, paths in source_paths.items()}
+    pending = {name: paths for name, paths in pending.items() if paths}
+
+    # --- Part 3: Read files (Excel, JSON) in parallel, and the database source on a thread ---
+    with ThreadPoolExecutor(max_workers=1) as db_executor:
+        read_legacy = 'flight_routes' not in skip_sources
+        db_future = db_executor.submit(measure_call, _read_flight_routes) if read_legacy else None
+
+        file_results = _read_files(pending, workers, errors)
+        for name, new_frames in file_results.items():
+            new_frames = iter(new_frames)
+            for idx, path in enumerate(source_paths[name]):
+                if frames[name][idx] is None:
+                    frames[name][idx] = next(new_frames)
+                    if cache:
+                        cache.put_raw(path, frames[name][idx])
+
+        for name, paths in source_paths.items():
+            if name in errors:
+                continue
+            cached = len(paths) - len(pending.get(name, []))
+            dataframes[name] = frames[name][0] if len(paths) == 1 else pd.concat(frames[name], ignore_index=True)
+            files = ', '.join(os.path.basename(p) for p in paths)
+            note = f" ({cached} from cache)" if cached else ""
+            print(f"✅ Read {len(dataframes[name])} rows from {files}{note}")
+
+        if db_future:
+            print("\nReading data from legacy database source...")
+            try:
+                dataframes['flight_routes'], metrics = db_future.result()
+                instrumentation.record('extract', 'flight_routes', source='flight_routes',
+                                       rows_out=len(dataframes['flight_routes']), **metrics)
+                print(f"✅ Read {len(dataframes['flight_routes'])} rows from database '{DB_CONFIG_LEGACY['database']}', table 'flight_routes'")
+            except Exception as e:
+                errors['flight_routes'] = _extract_error(e)
+        else:
+            print("\n⏭️  Skipping legacy table flight_routes (streamed into staging)")
+
+    if errors:
+        for name, message in errors.items():
+            print(f"❌ EXTRACT ERROR [{name}]: {message}")
         return None
+    return dataframes
+
+def _open_source_cache(clear=False):
+    """Opens the parsed-source cache configured in SOURCE_CACHE_OPTIONS (optionally emptying it first)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    cache = SourceCache(SOURCE_CACHE_OPTIONS['folder'], SOURCE_CACHE_OPTIONS['max_bytes'],
+                        code_paths=[os.path.join(here, module) for module in CLEANING_MODULES])
+    if clear:
+        cache.clear()
+        print("🧹 Source cache cleared.")
+    return cache
+
+def _cache_name(name):
+    """Cleaned frames are cached separately per transform mode."""
+    return f'{name}:compact' if TRANSFORM_OPTIONS['compact'] else name
+
+def _cache_transformed(cache, transformed_data):
+    """Stores the cleaned frames of sources that were parsed and transformed in this run."""
+    if SOURCE_CACHE_OPTIONS['transformed']:
+        for name in SOURCE_FILES:
+            if name in transformed_data and f'{name}_clean' in transformed_data:
+                cache.put_transformed(_cache_name(name), transformed_data[f'{name}_clean'])
+    cache.save()
+
+def _measured_transform(name, func, df):
+    """Runs one transform helper as a run report stage."""
+    with instrumentation.stage('transform', name, rows_in=len(df)) as stage:
+        clean_df = func(df)
+        stage.update(rows_out=len(clean_df), output_mb=compact.memory_mb(clean_df))
+    return clean_df
 
 def transform(raw_data):
     """Transform Phase: Cleans and prepares the data for staging."""
@@ -229,26 +597,26 @@ def transform(raw_data):
     try:
         # Transform external data sources
         if 'caa_movements' in raw_data:
-            raw_data['caa_movements_clean'] = _transform_caa_movements(raw_data['caa_movements'])
+            raw_data['caa_movements_clean'] = _measured_transform('caa_movements', _transform_caa_movements, raw_data['caa_movements'])
             print("✅ Transformed CAA movements.")
 
         if 'srilankan_financials' in raw_data:
-            raw_data['srilankan_financials_clean'] = _transform_srilankan_financials(raw_data['srilankan_financials'])
+            raw_data['srilankan_financials_clean'] = _measured_transform('srilankan_financials', _transform_srilankan_financials, raw_data['srilankan_financials'])
             print("✅ Transformed SriLankan financials.")
 
         if 'worldbank_transport' in raw_data:
-            raw_data['worldbank_transport_clean'] = _transform_worldbank_transport(raw_data['worldbank_transport'])
+            raw_data['worldbank_transport_clean'] = _measured_transform('worldbank_transport', _transform_worldbank_transport, raw_data['worldbank_transport'])
             print("✅ Transformed World Bank transport.")
 
         # --- NEW: Transform new data sources ---
         if 'aircraft_details' in raw_data:
-            raw_data['aircraft_details_clean'] = _transform_aircraft_details(raw_data['aircraft_details'])
+            raw_data['aircraft_details_clean'] = _measured_transform('aircraft_details', _transform_aircraft_details, raw_data['aircraft_details'])
             print("✅ Transformed Aircraft Details (from JSON).")
         if 'flight_routes' in raw_data:
-            raw_data['flight_routes_clean'] = _transform_flight_routes(raw_data['flight_routes'])
+            raw_data['flight_routes_clean'] = _measured_transform('flight_routes', _transform_flight_routes, raw_data['flight_routes'])
             print("✅ Transformed Flight Routes (from DB).")
         if 'airport_reference' in raw_data:
-            raw_data['airport_reference_clean'] = _transform_airport_reference(raw_data['airport_reference'])
+            raw_data['airport_reference_clean'] = _measured_transform('airport_reference', _transform_airport_reference, raw_data['airport_reference'])
             print("✅ Transformed Airport Reference (from JSON).")
 
         print("✅ All transformations complete.")
@@ -268,7 +636,7 @@ def load(transformed_data):
     conn = None
     cursor = None
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = _get_pool().acquire(session=LOAD_SESSION)
         cursor = conn.cursor()
         print("✅ Database connection successful. Starting data load...")
 
@@ -298,47 +666,373 @@ def load(transformed_data):
     finally:
         if cursor: cursor.close()
         if conn:
-            conn.close()
-            print("\n🔌 Database connection closed.")
+            _get_pool().release(conn)
+            print("\n🔌 Database connection returned to the pool.")
+
+# --- Fact refresh ---
+# Every fact is rebuilt from staging one date_key slice at a time: the slice is deleted and
+# re-inserted inside a single transaction, so readers keep seeing the old rows until commit
+# (never an empty table) and re-running a refresh is idempotent.
+FACT_REFRESHES = {
+    'fact_passenger_movements': {
+        'staging': 'stg_caa_movements',
+        'depends_on': ['dim_date', 'dim_airport'],
+        'date_key_expr': 's.date_key',
+        'insert': """
+            INSERT INTO fact_passenger_movements (date_key, airport_key, passengers, aircraft_movements)
+            SELECT
+                s.date_key, a.airport_key, s.passengers, s.aircraft_movements
+            FROM stg_caa_movements s
+            LEFT JOIN dim_airport a ON s.airport_iata = a.iata_code
+            WHERE s.date_key IS NOT NULL
+        """,
+    },
+    'fact_airline_financials': {
+        'staging': 'stg_srilankan_financials',
+        'depends_on': ['dim_date', 'dim_metric'],
+        'date_key_expr': 's.year * 10000 + 101',
+        'insert': """
+            INSERT INTO fact_airline_financials (date_key, metric_key, value, currency)
+            SELECT
+                s.year * 10000 + 101 AS date_key, m.metric_key, s.value, s.currency
+            FROM stg_srilankan_financials s
+            LEFT JOIN dim_metric m ON s.metric = m.metric_name
+            WHERE s.year IS NOT NULL
+        """,
+    },
+    'fact_world_transport_stats': {
+        'staging': 'stg_worldbank_transport',
+        'depends_on': ['dim_date', 'dim_country'],
+        'date_key_expr': 's.year * 10000 + 101',
+        'insert': """
+            INSERT INTO fact_world_transport_stats (date_key, country_key, passengers)
+            SELECT
+                s.year * 10000 + 101 AS date_key, c.country_key, s.passengers
+            FROM stg_worldbank_transport s
+            LEFT JOIN dim_country c ON s.country_code = c.country_code
+            WHERE s.year IS NOT NULL
+        """,
+    },
+}
+
+def _affected_date_keys(cursor, fact_table, spec, watermark):
+    """
+    date_keys to refresh in merge mode: slices with staging rows loaded since the watermark,
+    plus slices still in the fact table that no longer exist in staging.
+    """
+    cursor.execute(f"""
+        SELECT DISTINCT {spec['date_key_expr']} FROM {spec['staging']} s
+        WHERE s.load_timestamp >= %s AND {spec['date_key_expr']} IS NOT NULL
+    """, (watermark,))
+    changed = {row[0] for row in cursor.fetchall()}
+    cursor.execute(f"""
+        SELECT DISTINCT f.date_key FROM {fact_table} f
+        WHERE f.date_key NOT IN (
+            SELECT {spec['date_key_expr']} FROM {spec['staging']} s WHERE {spec['date_key_expr']} IS NOT NULL
+        )
+    """)
+    removed = {row[0] for row in cursor.fetchall()}
+    return sorted(changed | removed)
+
+def _refresh_fact(conn, cursor, fact_table, spec, mode, watermark, touched=None):
+    """
+    Replaces all (mode='full') or only the affected (mode='merge') date_key slices of a fact table.
+    touched[fact_table] is set to the refreshed date_keys (None: all of them) for the aggregates.
+    """
+    if touched is not None:
+        touched[fact_table] = None
+    if WAREHOUSE_OPTIONS['partition_swap'] and year_partitions(cursor, fact_table):
+        return _swap_fact_years(conn, cursor, fact_table, spec, mode, watermark, touched)
+    if mode == 'full':
+        print(f"   -> Refreshing {fact_table} (full)...")
+        cursor.execute(f"DELETE FROM {fact_table}")
+        deleted = cursor.rowcount
+        cursor.execute(spec['insert'])
+    else:
+        date_keys = _affected_date_keys(cursor, fact_table, spec, watermark)
+        print(f"   -> Refreshing {fact_table} (merge, {len(date_keys)} date_key slice(s))...")
+        if touched is not None:
+            touched[fact_table] = date_keys
+        if not date_keys:
+            return 0
+        placeholders = ','.join(['%s'] * len(date_keys))
+        cursor.execute(f"DELETE FROM {fact_table} WHERE date_key IN ({placeholders})", date_keys)
+        deleted = cursor.rowcount
+        cursor.execute(f"{spec['insert']} AND {spec['date_key_expr']} IN ({placeholders})", date_keys)
+    inserted = cursor.rowcount
+    conn.commit()
+    print(f"      ... {fact_table}: {deleted} rows replaced by {inserted} rows.")
+    return inserted
+
+def _swap_fact_years(conn, cursor, fact_table, spec, mode, watermark, touched=None):
+    """
+    _refresh_fact() for facts partitioned by year: every year to refresh (all of them, or those
+    holding an affected date_key) is rebuilt from staging and swapped in whole; years with no
+    staging rows left are truncated. Years without a partition of their own are deleted and
+    re-inserted by date_key range instead.
+    """
+    year_expr = f"({spec['date_key_expr']}) DIV 10000"
+    cursor.execute(f"SELECT DISTINCT {year_expr} FROM {spec['staging']} s WHERE {spec['date_key_expr']} IS NOT NULL")
+    staged_years = {int(row[0]) for row in cursor.fetchall()}
+    if mode == 'full':
+        cursor.execute(f"SELECT DISTINCT date_key DIV 10000 FROM {fact_table}")
+        years = sorted(staged_years | {int(row[0]) for row in cursor.fetchall()})
+    else:
+        date_keys = _affected_date_keys(cursor, fact_table, spec, watermark)
+        if touched is not None:
+            touched[fact_table] = date_keys
+        years = sorted({int(k) // 10000 for k in date_keys})
+    print(f"   -> Refreshing {fact_table} ({mode}, {len(years)} year(s) by partition)...")
+    added = add_year_partitions(cursor, fact_table, staged_years.intersection(years))
+    if added:
+        print(f"      ... {fact_table}: partitions added for {added[0]}-{added[-1]}.")
+    partitions = year_partitions(cursor, fact_table)
+
+    inserted = 0
+    for year in years:
+        in_year = f"{spec['date_key_expr']} BETWEEN {year_start(year)} AND {year_start(year + 1) - 1}"
+        def fill(cur, target):
+            cur.execute(f"{spec['insert'].replace(f'INSERT INTO {fact_table} (', f'INSERT INTO {target} (', 1)} AND {in_year}")
+            return cur.rowcount
+        if year not in partitions:
+            cursor.execute(f"DELETE FROM {fact_table} WHERE date_key BETWEEN %s AND %s",
+                           (year_start(year), year_start(year + 1) - 1))
+            inserted += fill(cursor, fact_table)
+            conn.commit()
+        elif year in staged_years:
+            inserted += swap_partition(conn, cursor, fact_table, partitions[year], fill)
+        else:
+            truncate_partition(cursor, fact_table, partitions[year])
+    print(f"      ... {fact_table}: {len(years)} year(s) replaced by {inserted} rows.")
+    return inserted
+
+def _measured_step(name, run):
+    """Wraps a DAG step so it becomes a run report stage (steps return the rows they wrote)."""
+    def measured(conn, cursor):
+        with instrumentation.stage('warehouse', name) as stage:
+            stage['rows_out'] = run(conn, cursor)
+    return measured
+
+def _dimension_step(table, sql):
+    """Wraps one dimension INSERT as a DAG step."""
+    def run(conn, cursor):
+        print(f"   -> Populating {table}...")
+        cursor.execute(sql)
+        conn.commit()
+        print(f"      ... {table}: {cursor.rowcount} rows affected.")
+        return cursor.rowcount
+    return run
+
+# --- Direct fact loading ---
+# Facts built straight from the transform() output: natural keys are resolved to surrogate
+# keys in memory (dim_keys.py) and the rows are bulk-loaded, skipping the staging round trip.
+# The whole table is replaced in one transaction. Rows whose dimension key can't be resolved
+# (e.g. a blank airport code) are reported and left out ('skip') or abort the step ('fail').
+METRIC_CATEGORIES = {
+    'Financial': ['Revenue', 'Operating Loss', 'Cargo Revenue'],
+    'Operational': ['Passengers', 'Aircraft Fleet', 'Employee Count', 'Passenger Load Factor'],
+}
+
+def _metric_category_sql(column):
+    """SQL CASE expression giving the METRIC_CATEGORIES category of a metric ('Other' if unlisted)."""
+    whens = ' '.join(f"WHEN {column} IN ({', '.join(repr(m) for m in metrics)}) THEN '{category}'"
+                     for category, metrics in METRIC_CATEGORIES.items())
+    return f"CASE {whens} ELSE 'Other' END"
+
+def _metric_category(metrics):
+    categories = pd.Series('Other', index=metrics.index)
+    for category, names in METRIC_CATEGORIES.items():
+        categories[metrics.isin(names)] = category
+    return categories
+
+def _airport_members(data):
+    caa = data['caa_movements_clean']
+    members = caa[['airport_iata', 'country']].drop_duplicates('airport_iata').rename(columns={'airport_iata': 'iata_code'})
+    reference = data.get('airport_reference_clean', pd.DataFrame(columns=['iata_code', 'airport_name', 'city']))
+    members = members.merge(reference.drop_duplicates('iata_code'), on='iata_code', how='left')
+    return members[['iata_code', 'airport_name', 'city', 'country']]
+
+def _metric_members(data):
+    metrics = data['srilankan_financials_clean']['metric'].drop_duplicates()
+    return pd.DataFrame({'metric_name': metrics, 'metric_category': _metric_category(metrics)})
+
+def _country_members(data):
+    wb = data['worldbank_transport_clean']
+    return wb[['country_code', 'country_name']].drop_duplicates('country_code')
+
+DIRECT_FACTS = {
+    'fact_passenger_movements': {
+        'source': 'caa_movements_clean', 'business_key': ['date_key', 'airport_iata'],
+        'dimension': 'dim_airport', 'keys': ('iata_code', 'airport_key'), 'natural': 'airport_iata',
+        'members': _airport_members,
+        'date_key': lambda df: df['date_key'],
+        'columns': ['date_key', 'airport_key', 'passengers', 'aircraft_movements'],
+    },
+    'fact_airline_financials': {
+        'source': 'srilankan_financials_clean', 'business_key': ['year', 'metric'],
+        'dimension': 'dim_metric', 'keys': ('metric_name', 'metric_key'), 'natural': 'metric',
+        'members': _metric_members,
+        'date_key': lambda df: df['year'].astype('Int64') * 10000 + 101,
+        'columns': ['date_key', 'metric_key', 'value', 'currency'],
+    },
+    'fact_world_transport_stats': {
+        'source': 'worldbank_transport_clean', 'business_key': ['year', 'country_code'],
+        'dimension': 'dim_country', 'keys': ('country_code', 'country_key'), 'natural': 'country_code',
+        'members': _country_members,
+        'date_key': lambda df: df['year'].astype('Int64') * 10000 + 101,
+        'columns': ['date_key', 'country_key', 'passengers'],
+    },
+}
+
+def _load_fact_direct(conn, cursor, fact_table, spec, data, key_cache):
+    """DAG step: replaces a fact table with rows built from transform() output."""
+    print(f"   -> Loading {fact_table} (direct)...")
+    dimension = spec['dimension']
+    surrogate = spec['keys'][1]
+    key_cache.load(cursor, dimension)
+    added = key_cache.ensure_members(cursor, dimension, spec['members'](data),
+                                     BULK_LOAD_OPTIONS['strategy'], BULK_LOAD_OPTIONS['batch_size'])
+    if added:
+        print(f"      ... {dimension}: {added} new member(s) added.")
+
+    facts, duplicates, conflicts, _ = deduplicate(data[spec['source']], spec['business_key'],
+                                                  on_conflict=BULK_LOAD_OPTIONS['key_conflicts'])
+    if duplicates['within_batch']:
+        print(f"      ... {fact_table}: {duplicates['within_batch']} row(s) repeating a business key dropped.")
+    _warn_conflicting_duplicates(fact_table, conflicts, spec['business_key'])
+    facts = facts.copy()
+    facts['date_key'] = spec['date_key'](facts)
+    facts = facts[facts['date_key'].notna()]
+    facts[surrogate] = key_cache.lookup(dimension, facts[spec['natural']])
+
+    unresolved = facts[surrogate].isna()
+    if unresolved.any():
+        counts = facts.loc[unresolved, spec['natural']].astype(str).value_counts()
+        sample = ', '.join(f"'{value}' x{count}" for value, count in counts.head(5).items())
+        message = f"{fact_table}: {int(unresolved.sum())} row(s) with unresolved {surrogate} ({sample})"
+        if WAREHOUSE_OPTIONS['unresolved_keys'] == 'fail':
+            raise ValueError(message)
+        print(f"   ⚠️  {message} were not loaded.")
+        facts = facts[~unresolved]
+
+    cursor.execute(f"DELETE FROM {fact_table}")
+    deleted = cursor.rowcount
+    inserted = bulk_insert(cursor, fact_table, spec['columns'], facts,
+                           BULK_LOAD_OPTIONS['strategy'], BULK_LOAD_OPTIONS['batch_size'])
+    conn.commit()
+    print(f"      ... {fact_table}: {deleted} rows replaced by {inserted} rows.")
+    return inserted
+
+# --- dim_date ---
+# Only the first and last staged date_key are read from the server; the calendar in between
+# is built with pandas (calendar_dim.py) and only the days missing from dim_date are inserted.
+STAGED_DATE_RANGE_SQL = """
+    SELECT MIN(k), MAX(k) FROM (
+        SELECT date_key AS k FROM stg_caa_movements WHERE date_key IS NOT NULL
+        UNION ALL
+        SELECT year * 10000 + 101 FROM stg_srilankan_financials WHERE year IS NOT NULL
+        UNION ALL
+        SELECT year * 10000 + 101 FROM stg_worldbank_transport WHERE year IS NOT NULL
+    ) staged_keys
+"""
+
+def _insert_calendar(conn, cursor, start, end):
+    """Bulk-inserts every day from start to end that dim_date doesn't have yet; returns the row count."""
+    cursor.execute("SELECT date_key FROM dim_date WHERE date_key BETWEEN %s AND %s",
+                   (int(start.strftime('%Y%m%d')), int(end.strftime('%Y%m%d'))))
+    rows = missing_calendar_rows(start, end, (row[0] for row in cursor.fetchall()))
+    inserted = bulk_insert(cursor, 'dim_date', DIM_DATE_COLUMNS, rows,
+                           BULK_LOAD_OPTIONS['strategy'], BULK_LOAD_OPTIONS['batch_size'])
+    conn.commit()
+    return inserted
+
+def _populate_dim_date(conn, cursor):
+    """DAG step: makes dim_date cover every day between the first and last staged date_key."""
+    print("   -> Populating dim_date...")
+    cursor.execute(STAGED_DATE_RANGE_SQL)
+    first, last = cursor.fetchone()
+    if first is None:
+        print("      ... dim_date: no staged dates.")
+        return 0
+    start, end = date_key_to_timestamp([first, last])
+    if pd.isna(start) or pd.isna(end):
+        raise ValueError(f"Staged date_key range {first}..{last} is not a valid date range")
+    inserted = _insert_calendar(conn, cursor, start, end)
+    print(f"      ... dim_date: {inserted} rows added ({first}..{last}).")
+    return inserted
+
+def seed_dim_date(start_year, end_year):
+    """Pre-seeds dim_date with every day from 1 Jan start_year to 31 Dec end_year."""
+    print(f"\n--- Seeding dim_date ({start_year}-{end_year}) ---")
+    start, end = pd.Timestamp(year=start_year, month=1, day=1), pd.Timestamp(year=end_year, month=12, day=31)
+    try:
+        inserted = _get_pool().run(lambda conn: _insert_calendar(conn, conn.cursor(), start, end))
+        print(f"✅ dim_date seeded: {inserted} new rows.")
+        return True
+    except Exception as e:
+        print(f"❌ Could not seed dim_date: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        close_pools()
+
+def load_version():
+    """Warehouse load version: bumped by every successful warehouse run (keys query_service.py's cache)."""
+    return read_state(STATE_FOLDER, WAREHOUSE_STATE_FILE).get('load_version', 0)
+
+def drop_fact_years_before(year):
+    """
+    Drops every fact row dated before `year` partition by partition (see partitions.py), then
+    refreshes the aggregates of the removed dates. Years still in staging come back with the
+    next full fact refresh.
+    """
+    print(f"\n--- Dropping fact years before {year} ---")
+    def drop(conn):
+        cursor = conn.cursor()
+        removed = {}
+        for fact_table in FACT_REFRESHES:
+            if not year_partitions(cursor, fact_table):
+                print(f"   ⚠️  {fact_table} is not partitioned by year, skipped.")
+                continue
+            removed[fact_table] = drop_years_before(cursor, fact_table, year)
+            print(f"   -> {fact_table}: {len(removed[fact_table])} date_key(s) dropped.")
+        if WAREHOUSE_OPTIONS['aggregates']:
+            for table, spec in AGGREGATES.items():
+                if spec['fact'] in removed:
+                    refresh_aggregate(conn, cursor, table, spec, removed[spec['fact']])
+        conn.commit()
+    try:
+        _get_pool().run(drop)
+        write_state(STATE_FOLDER, WAREHOUSE_STATE_FILE, load_version=load_version() + 1)
+        print("✅ Old fact years dropped.")
+        return True
+    except Exception as e:
+        print(f"❌ Could not drop fact years: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        close_pools()
 
 # <-- NEW FUNCTION -->
-def run_warehouse_transforms():
+def run_warehouse_transforms(transformed_data=None):
     """
     Transform Phase 2: Runs SQL queries to transform data from Staging tables
     into the final Data Warehouse (Star Schema) tables.
+    The dimension and fact steps run as a DAG (see dag.py): independent steps run
+    concurrently on up to WAREHOUSE_OPTIONS['workers'] connections.
+    With WAREHOUSE_OPTIONS['fact_source'] == 'direct' the facts are loaded straight from
+    transformed_data (the transform() output) instead of from staging, see DIRECT_FACTS.
+    The aggregate tables (aggregates.py) are refreshed after their facts, only for the
+    periods the fact refresh touched.
     """
     print("\n--- 4. TRANSFORM (to Data Warehouse) ---")
     print(f"Connecting to database: {DB_CONFIG['host']}/{DB_CONFIG['database']}...")
 
-    conn = None
-    cursor = None
-    
-    # All the SQL commands to run, in order
-    #populating dimension and fact tables
+    #populating dimension tables, keyed by table (the dimensions are independent of each other;
+    #each fact is refreshed once its own dimensions are done, see FACT_REFRESHES).
+    #dim_date is generated in Python, see _populate_dim_date()
     sql_commands = {
-        "Populating dim_date...": """
-            INSERT IGNORE INTO dim_date (date_key, full_date, year, quarter, month, month_name, day, day_of_week, is_weekend)
-            SELECT 
-                date_key, STR_TO_DATE(date_key, '%Y%m%d') AS full_date,
-                YEAR(STR_TO_DATE(date_key, '%Y%m%d')) AS year, QUARTER(STR_TO_DATE(date_key, '%Y%m%d')) AS quarter,
-                MONTH(STR_TO_DATE(date_key, '%Y%m%d')) AS month, DATE_FORMAT(STR_TO_DATE(date_key, '%Y%m%d'), '%M') AS month_name,
-                DAY(STR_TO_DATE(date_key, '%Y%m%d')) AS day, DAYOFWEEK(STR_TO_DATE(date_key, '%Y%m%d')) AS day_of_week,
-                IF(DAYOFWEEK(STR_TO_DATE(date_key, '%Y%m%d')) IN (1, 7), 1, 0) AS is_weekend
-            FROM stg_caa_movements WHERE date_key IS NOT NULL
-            UNION
-            SELECT
-                year * 10000 + 101 AS date_key, STR_TO_DATE(CONCAT(year, '-01-01'), '%Y-%m-%d') AS full_date,
-                year, 1, 1, 'January', 1, DAYOFWEEK(STR_TO_DATE(CONCAT(year, '-01-01'), '%Y-%m-%d')) AS day_of_week,
-                IF(DAYOFWEEK(STR_TO_DATE(CONCAT(year, '-01-01'), '%Y-%m-%d')) IN (1, 7), 1, 0) AS is_weekend
-            FROM stg_srilankan_financials WHERE year IS NOT NULL
-            UNION
-            SELECT
-                year * 10000 + 101 AS date_key, STR_TO_DATE(CONCAT(year, '-01-01'), '%Y-%m-%d') AS full_date,
-                year, 1, 1, 'January', 1, DAYOFWEEK(STR_TO_DATE(CONCAT(year, '-01-01'), '%Y-%m-%d')) AS day_of_week,
-                IF(DAYOFWEEK(STR_TO_DATE(CONCAT(year, '-01-01'), '%Y-%m-%d')) IN (1, 7), 1, 0) AS is_weekend
-            FROM stg_worldbank_transport WHERE year IS NOT NULL
-        """,
-        "Populating dim_airport...": """
+        "dim_airport": """
             INSERT IGNORE INTO dim_airport (iata_code, airport_name, city, country)
             SELECT DISTINCT
                 s.airport_iata, r.airport_name, r.city, s.country
@@ -346,219 +1040,617 @@ def run_warehouse_transforms():
             LEFT JOIN stg_airport_reference r ON s.airport_iata = r.iata_code
             WHERE s.airport_iata IS NOT NULL AND s.airport_iata != ''
         """,
-        "Populating dim_country...": """
+        "dim_country": """
             INSERT IGNORE INTO dim_country (country_code, country_name)
             SELECT DISTINCT country_code, country_name
             FROM stg_worldbank_transport
             WHERE country_code IS NOT NULL AND country_code != ''
         """,
-        "Populating dim_metric...": """
+        "dim_metric": """
             INSERT IGNORE INTO dim_metric (metric_name, metric_category)
             SELECT DISTINCT 
                 metric,
-                CASE 
-                    WHEN metric IN ('Revenue', 'Operating Loss', 'Cargo Revenue') THEN 'Financial'
-                    WHEN metric IN ('Passengers', 'Aircraft Fleet', 'Employee Count', 'Passenger Load Factor') THEN 'Operational'
-                    ELSE 'Other'
-                END AS metric_category
+                """ + _metric_category_sql('metric') + """ AS metric_category
             FROM stg_srilankan_financials
             WHERE metric IS NOT NULL AND metric != ''
         """,
-        "Populating dim_aircraft...": """
+        "dim_aircraft": """
             INSERT IGNORE INTO dim_aircraft (aircraft_model, manufacturer, seat_capacity, engine_type)
             SELECT DISTINCT aircraft_model, manufacturer, seat_capacity, engine_type
             FROM stg_aircraft_details
             WHERE aircraft_model IS NOT NULL AND aircraft_model != ''
-        """,
-        "Populating fact_passenger_movements...": """
-            TRUNCATE TABLE fact_passenger_movements
-        """,
-        "Populating fact_passenger_movements (Insert)...": """
-            INSERT INTO fact_passenger_movements (date_key, airport_key, passengers, aircraft_movements)
-            SELECT
-                s.date_key, a.airport_key, s.passengers, s.aircraft_movements
-            FROM stg_caa_movements s
-            LEFT JOIN dim_airport a ON s.airport_iata = a.iata_code
-            WHERE s.date_key IS NOT NULL
-        """,
-        "Populating fact_airline_financials...": """
-            TRUNCATE TABLE fact_airline_financials
-        """,
-        "Populating fact_airline_financials (Insert)...": """
-            INSERT INTO fact_airline_financials (date_key, metric_key, value, currency)
-            SELECT
-                s.year * 10000 + 101 AS date_key, m.metric_key, s.value, s.currency
-            FROM stg_srilankan_financials s
-            LEFT JOIN dim_metric m ON s.metric = m.metric_name
-            WHERE s.year IS NOT NULL
-        """,
-        "Populating fact_world_transport_stats...": """
-            TRUNCATE TABLE fact_world_transport_stats
-        """,
-        "Populating fact_world_transport_stats (Insert)...": """
-            INSERT INTO fact_world_transport_stats (date_key, country_key, passengers)
-            SELECT
-                s.year * 10000 + 101 AS date_key, c.country_key, s.passengers
-            FROM stg_worldbank_transport s
-            LEFT JOIN dim_country c ON s.country_code = c.country_code
-            WHERE s.year IS NOT NULL
         """
     }
 
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
+        # Staging rows loaded from this moment on belong to the next run
+        run_started = _get_pool().run(_database_now)
         print("✅ Database connection successful. Running warehouse transforms...")
+        previous_watermark = read_state(STATE_FOLDER, WAREHOUSE_STATE_FILE).get('fact_watermark')
 
-        for message, sql in sql_commands.items():
-            print(f"   -> {message}")
-            cursor.execute(sql)
-            conn.commit()
-            if "INSERT" in sql or "TRUNCATE" in sql:
-                print(f"      ... {cursor.rowcount} rows affected.")
+        mode = WAREHOUSE_OPTIONS['fact_refresh']
+        if mode == 'merge' and previous_watermark is None:
+            print("   (No previous fact watermark found, doing a full fact refresh)")
+            mode = 'full'
 
+        steps = {table: {'depends_on': [], 'run': _dimension_step(table, sql)}
+                 for table, sql in sql_commands.items()}
+        steps['dim_date'] = {'depends_on': [], 'run': _populate_dim_date}
+        touched = {}
+        if WAREHOUSE_OPTIONS['fact_source'] == 'direct':
+            if transformed_data is None:
+                raise ValueError("fact_source='direct' needs the transformed data")
+            key_cache = DimensionKeyCache({spec['dimension']: spec['keys'] for spec in DIRECT_FACTS.values()})
+            fact_runs = {fact_table: lambda c, cur, fact_table=fact_table, spec=spec:
+                             _load_fact_direct(c, cur, fact_table, spec, transformed_data, key_cache)
+                         for fact_table, spec in DIRECT_FACTS.items()}
+        else:
+            fact_runs = {fact_table: lambda c, cur, fact_table=fact_table, spec=spec:
+                             _refresh_fact(c, cur, fact_table, spec, mode, previous_watermark, touched)
+                         for fact_table, spec in FACT_REFRESHES.items()}
+        for fact_table, run in fact_runs.items():
+            steps[fact_table] = {'depends_on': FACT_REFRESHES[fact_table]['depends_on'], 'run': run}
+        if WAREHOUSE_OPTIONS['aggregates']:
+            # Direct loads replace whole facts, so their aggregates are rebuilt (touched -> None)
+            for table, spec in AGGREGATES.items():
+                steps[table] = {'depends_on': spec['depends_on'],
+                                'run': lambda c, cur, table=table, spec=spec:
+                                    refresh_aggregate(c, cur, table, spec, touched.get(spec['fact']))}
+        for name, step in steps.items():
+            step['run'] = _measured_step(name, step['run'])
+        results = run_dag(steps, _get_pool(), WAREHOUSE_OPTIONS['workers'])
+        print_step_timings(results)
+        if any(r['status'] != 'done' for r in results.values()):
+            print("❌ Warehouse transforms stopped after a failed step; the fact watermark was not advanced.")
+            return False
+
+        write_state(STATE_FOLDER, WAREHOUSE_STATE_FILE, fact_watermark=run_started, fact_refresh=mode,
+                    load_version=load_version() + 1)
         print("\n✅ Data Warehouse transformations complete.")
         return True
     except Exception as e:
         print(f"❌ An unexpected error occurred during the WAREHOUSE TRANSFORM phase.")
         traceback.print_exc()
-        if conn: conn.rollback()
         return False
-    finally:
-        if cursor: cursor.close()
-        if conn:
-            conn.close()
-            print("\n🔌 Database connection closed.")
+
+
+def export_snapshot():
+    """Writes the changed partitions of the star schema to Parquet (EXPORT_OPTIONS)."""
+    print("\n--- 5. EXPORT (Parquet snapshot) ---")
+    try:
+        results = export_star_schema(_get_pool(), EXPORT_OPTIONS['folder'], chunk_size=EXPORT_OPTIONS['chunk_size'],
+                                     compression=EXPORT_OPTIONS['compression'], load_version=load_version())
+        exported = sum(len(r['exported']) for r in results.values())
+        print(f"✅ Snapshot in {EXPORT_OPTIONS['folder']}: {exported} partition(s) written.")
+        return True
+    except Exception as e:
+        print(f"❌ Could not export the snapshot: {e}")
+        traceback.print_exc()
+        return False
 
 
 # --- Database Helper Functions ---
 
+_POOLS = {}
+
+def _get_pool(name='warehouse'):
+    """Returns the shared connection pool for the warehouse (DB_CONFIG) or legacy (DB_CONFIG_LEGACY) database."""
+    if name not in _POOLS:
+        config = DB_CONFIG if name == 'warehouse' else DB_CONFIG_LEGACY
+        _POOLS[name] = ConnectionPool(mysql.connector.connect, config, **POOL_OPTIONS)
+    return _POOLS[name]
+
+def _database_now(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT NOW()")
+        return cursor.fetchone()[0]
+
+def close_pools():
+    """Closes every pooled connection (end of run)."""
+    while _POOLS:
+        _POOLS.popitem()[1].close()
+
 def _clean_df_for_db(df):
     """Converts a DataFrame into a list of tuples for database insertion."""
-    df_clean = df.replace({pd.NaT: None, pd.NA: None, '': None, 'nan': None})
-    return [tuple(x) for x in df_clean.to_numpy()]
+    return rows_for_db(df)
+
+def _load_staging_table(conn, cursor, table, columns, df, truncate=True, key_columns=None, dedup=False):
+    """
+    Shared staging loader. Bulk-loads df with the strategy in BULK_LOAD_OPTIONS and keeps the
+    table's fingerprint store (see staging_state.py) up to date.
+
+    Full mode truncates the table first (pass truncate=False to append another chunk).
+    Incremental mode only writes rows whose business key (key_columns) is new or whose content
+    changed since the last load; unchanged keys cause no database writes at all.
+    dedup=True drops rows repeating a business key first, see _deduplicate().
+    """
+    print(f"🔄 Loading {table}...")
+    with instrumentation.stage('load', table, rows_in=len(df), strategy=BULK_LOAD_OPTIONS['strategy']) as stage:
+        try:
+            if df.empty:
+                df = df.reindex(columns=columns)
+            replaced = df.iloc[:0]
+            if dedup:
+                df, replaced = _deduplicate(table, df, key_columns, truncate, stage)
+            row_keys, keys, fingerprints = compute_fingerprints(df[columns], key_columns)
+            state = load_state(STATE_FOLDER, table)
+
+            if BULK_LOAD_OPTIONS['incremental'] and truncate and state is not None:
+                rows, keys, fingerprints = _load_staging_delta(cursor, table, columns, key_columns, df,
+                                                               row_keys, keys, fingerprints, state)
+                stage['rows_out'] = rows
+                if rows == 0:
+                    print(f"   -> No new or changed rows for {table}, nothing written.")
+                    return
+            else:
+                if truncate:
+                    cursor.execute(f"TRUNCATE TABLE {table}")
+                    print("   -> Staging table truncated.")
+                elif state is not None:
+                    # keys an earlier chunk loaded with other values: delete its rows, take over the fingerprint
+                    replacing = np.isin(keys, row_key_hashes(replaced, key_columns))
+                    if replacing.any():
+                        where = ' AND '.join(f"{col} <=> %s" for col in key_columns)
+                        cursor.executemany(f"DELETE FROM {table} WHERE {where}", rows_for_db(replaced[key_columns]))
+                        state = merge_fingerprints(state[0], state[1], keys[replacing], fingerprints[replacing])
+                    keys, fingerprints = merge_fingerprints(state[0], state[1], keys[~replacing],
+                                                            fingerprints[~replacing], replace=False)
+                rows = bulk_insert(cursor, table, columns, df,
+                                   strategy=BULK_LOAD_OPTIONS['strategy'], batch_size=BULK_LOAD_OPTIONS['batch_size'])
+                print(f"   -> {rows} rows processed for {table} ({BULK_LOAD_OPTIONS['strategy']}).")
+                stage['rows_out'] = rows
+
+            cursor.execute("SELECT NOW()")
+            watermark = cursor.fetchone()[0]
+            conn.commit()
+            save_state(STATE_FOLDER, table, keys, fingerprints, watermark=watermark,
+                       mode='incremental' if BULK_LOAD_OPTIONS['incremental'] else 'full')
+            if dedup:
+                _DEDUP_INDEXES[table].save()
+        except Exception as e:
+            _DEDUP_INDEXES.pop(table, None)  # reread the saved index next time
+            print(f"❌ Error loading {table}: {e}"); conn.rollback(); raise
+
+# Per staging table: business keys loaded so far (dedup.py), saved next to the fingerprints
+_DEDUP_INDEXES = {}
+
+def _deduplicate(table, df, key_columns, new_run, stage):
+    """
+    Drops rows whose business key repeats within the batch or an earlier batch of this load
+    (e.g. overlapping monthly files or stream chunks). Rows of a key with other values fail the
+    load or the last one wins, per BULK_LOAD_OPTIONS['key_conflicts']; keys loaded by an earlier
+    run are kept, as the load replaces them. The counts go into the run report.
+    Returns (rows to load, rows replacing the ones an earlier batch loaded for their key).
+    """
+    index = _DEDUP_INDEXES.get(table)
+    if index is None:
+        index = _DEDUP_INDEXES[table] = DedupIndex(os.path.join(STATE_FOLDER, f'{table}.dedup.npz'))
+    if new_run:
+        index.begin_run()
+    df, report, conflicts, replaced = deduplicate(df, key_columns, index, BULK_LOAD_OPTIONS['key_conflicts'])
+    stage.update(duplicates_within_batch=report['within_batch'], duplicates_earlier_batches=report['earlier_batches'],
+                 duplicates_conflicting=report['conflicting'], earlier_batch_rows_replaced=report['replaced'],
+                 earlier_run_keys_kept=report['earlier_runs_kept'])
+    if report['within_batch'] or report['earlier_batches']:
+        print(f"   -> Dropped {report['within_batch']} row(s) repeating a key within the batch and "
+              f"{report['earlier_batches']} already loaded from an earlier batch.")
+    _warn_conflicting_duplicates(table, conflicts, key_columns)
+    if report['replaced']:
+        print(f"   -> Replacing the rows of {report['replaced']} key(s) an earlier batch loaded with other values.")
+    if report['earlier_runs_kept']:
+        print(f"   -> Kept {report['earlier_runs_kept']} row(s) whose key an earlier run loaded (they replace those rows).")
+    return df, replaced
+
+def _warn_conflicting_duplicates(table, conflicts, key_columns):
+    """Warns about business keys whose rows had other values, where the last row won."""
+    if conflicts.empty:
+        return
+    sample = conflicts[key_columns].drop_duplicates().head(3)
+    keys = '; '.join(', '.join(f"{col}={row[col]}" for col in key_columns) for _, row in sample.iterrows())
+    print(f"   ⚠️  WARNING [{table}]: {len(conflicts)} key(s) had rows with other values, the last row won, "
+          f"e.g. {keys}")
+
+def _load_staging_delta(cursor, table, columns, key_columns, df, row_keys, keys, fingerprints, state):
+    """
+    Writes only new/changed business keys: rows of changed keys are deleted and re-inserted
+    (fresh load_timestamp), rows of new keys are inserted. Keys missing from df are kept.
+    Returns (rows_written, keys, fingerprints) with the merged fingerprint store.
+    """
+    stored_keys, stored_fingerprints, _ = state
+    new_keys, changed_keys = diff_fingerprints(keys, fingerprints, stored_keys, stored_fingerprints)
+    if len(new_keys) == 0 and len(changed_keys) == 0:
+        return 0, stored_keys, stored_fingerprints
 
-def _load_stg_caa_movements(conn, cursor, df):
+    if len(changed_keys):
+        changed_key_rows = df.loc[np.isin(row_keys, changed_keys), key_columns].drop_duplicates()
+        where = ' AND '.join(f"{col} <=> %s" for col in key_columns)
+        cursor.executemany(f"DELETE FROM {table} WHERE {where}", rows_for_db(changed_key_rows))
+
+    write_keys = np.concatenate([new_keys, changed_keys])
+    rows = bulk_insert(cursor, table, columns, df[np.isin(row_keys, write_keys)],
+                       strategy=BULK_LOAD_OPTIONS['strategy'], batch_size=BULK_LOAD_OPTIONS['batch_size'])
+    print(f"   -> {len(new_keys)} new / {len(changed_keys)} changed keys: {rows} rows upserted for {table}.")
+
+    written = np.isin(keys, write_keys)
+    keys, fingerprints = merge_fingerprints(stored_keys, stored_fingerprints,
+                                            keys[written], fingerprints[written], replace=True)
+    return rows, keys, fingerprints
+
+def _load_stg_caa_movements(conn, cursor, df, truncate=True):
     """Loads cleaned CAA data into its staging table."""
-    print("🔄 Loading stg_caa_movements...")
-    try:
-        data_to_load = _clean_df_for_db(df)
-        cursor.execute("TRUNCATE TABLE stg_caa_movements") 
-        print("   -> Staging table truncated.")
-        sql = "INSERT INTO stg_caa_movements (date_key, airport_iata, passengers, aircraft_movements, country) VALUES (%s,%s,%s,%s,%s)"
-        cursor.executemany(sql, data_to_load)
-        conn.commit()
-        print(f"   -> {cursor.rowcount} rows processed for stg_caa_movements.")
-    except Exception as e:
-        print(f"❌ Error loading stg_caa_movements: {e}"); conn.rollback(); raise
+    _load_staging_table(conn, cursor, 'stg_caa_movements',
+                        ['date_key', 'airport_iata', 'passengers', 'aircraft_movements', 'country'], df, truncate,
+                        key_columns=['date_key', 'airport_iata'], dedup=True)
 
-def _load_stg_srilankan_financials(conn, cursor, df):
+def _load_stg_srilankan_financials(conn, cursor, df, truncate=True):
     """Loads cleaned financial data into its staging table."""
-    print("🔄 Loading stg_srilankan_financials...")
-    try:
-        data_to_load = _clean_df_for_db(df)
-        cursor.execute("TRUNCATE TABLE stg_srilankan_financials")
-        print("   -> Staging table truncated.")
-        sql = "INSERT INTO stg_srilankan_financials (year, metric, value, currency, notes) VALUES (%s,%s,%s,%s,%s)"
-        cursor.executemany(sql, data_to_load)
-        conn.commit()
-        print(f"   -> {cursor.rowcount} rows processed for stg_srilankan_financials.")
-    except Exception as e:
-        print(f"❌ Error loading stg_srilankan_financials: {e}"); conn.rollback(); raise
+    _load_staging_table(conn, cursor, 'stg_srilankan_financials',
+                        ['year', 'metric', 'value', 'currency', 'notes'], df, truncate,
+                        key_columns=['year', 'metric'], dedup=True)
 
-def _load_stg_worldbank_transport(conn, cursor, df):
+def _load_stg_worldbank_transport(conn, cursor, df, truncate=True):
     """Loads cleaned World Bank data into its staging table."""
-    print("🔄 Loading stg_worldbank_transport...")
-    try:
-        data_to_load = _clean_df_for_db(df)
-        cursor.execute("TRUNCATE TABLE stg_worldbank_transport")
-        print("   -> Staging table truncated.")
-        sql = "INSERT INTO stg_worldbank_transport (year, country_name, country_code, passengers) VALUES (%s,%s,%s,%s)"
-        cursor.executemany(sql, data_to_load)
-        conn.commit()
-        print(f"   -> {cursor.rowcount} rows processed for stg_worldbank_transport.")
-    except Exception as e:
-        print(f"❌ Error loading stg_worldbank_transport: {e}"); conn.rollback(); raise
+    _load_staging_table(conn, cursor, 'stg_worldbank_transport',
+                        ['year', 'country_name', 'country_code', 'passengers'], df, truncate,
+                        key_columns=['year', 'country_code'], dedup=True)
 
 # --- NEW: Database helper functions for new sources ---
 
-def _load_stg_aircraft_details(conn, cursor, df):
+def _load_stg_aircraft_details(conn, cursor, df, truncate=True):
     """Loads cleaned aircraft data into its staging table."""
-    print("🔄 Loading stg_aircraft_details...")
-    try:
-        data_to_load = _clean_df_for_db(df)
-        cursor.execute("TRUNCATE TABLE stg_aircraft_details")
-        print("   -> Staging table truncated.")
-        sql = "INSERT INTO stg_aircraft_details (aircraft_model, manufacturer, seat_capacity, engine_type) VALUES (%s,%s,%s,%s)"
-        cursor.executemany(sql, data_to_load)
-        conn.commit()
-        print(f"   -> {cursor.rowcount} rows processed for stg_aircraft_details.")
-    except Exception as e:
-        print(f"❌ Error loading stg_aircraft_details: {e}"); conn.rollback(); raise
+    _load_staging_table(conn, cursor, 'stg_aircraft_details',
+                        ['aircraft_model', 'manufacturer', 'seat_capacity', 'engine_type'], df, truncate,
+                        key_columns=['aircraft_model'], dedup=True)
 
-def _load_stg_flight_routes(conn, cursor, df):
+def _load_stg_flight_routes(conn, cursor, df, truncate=True):
     """Loads cleaned flight route data into its staging table."""
-    print("🔄 Loading stg_flight_routes...")
-    try:
-        data_to_load = _clean_df_for_db(df)
-        cursor.execute("TRUNCATE TABLE stg_flight_routes")
-        print("   -> Staging table truncated.")
-        sql = "INSERT INTO stg_flight_routes (route_id, origin_iata, destination_iata, distance_km) VALUES (%s,%s,%s,%s)"
-        cursor.executemany(sql, data_to_load)
-        conn.commit()
-        print(f"   -> {cursor.rowcount} rows processed for stg_flight_routes.")
-    except Exception as e:
-        print(f"❌ Error loading stg_flight_routes: {e}"); conn.rollback(); raise
+    _load_staging_table(conn, cursor, 'stg_flight_routes',
+                        ['route_id', 'origin_iata', 'destination_iata', 'distance_km'], df, truncate,
+                        key_columns=['route_id'])
 
-def _load_stg_airport_reference(conn, cursor, df):
+def _load_stg_airport_reference(conn, cursor, df, truncate=True):
     """Loads cleaned airport reference data into its staging table."""
-    print("🔄 Loading stg_airport_reference...")
+    _load_staging_table(conn, cursor, 'stg_airport_reference',
+                        ['iata_code', 'airport_name', 'city'], df, truncate,
+                        key_columns=['iata_code'], dedup=True)
+
+# --- Streaming Extraction (Excel -> Staging in chunks) ---
+
+# Workbooks that can be streamed chunk by chunk: source name -> (transform, staging loader)
+STREAMABLE_SOURCES = {
+    'caa_movements': (_transform_caa_movements, _load_stg_caa_movements),
+    'worldbank_transport': (_transform_worldbank_transport, _load_stg_worldbank_transport),
+}
+# Everything stream_load() handles: the workbooks above plus the legacy flight_routes table
+STREAMED_SOURCES = [*STREAMABLE_SOURCES, 'flight_routes']
+
+def stream_load(chunk_size=EXCEL_CHUNK_SIZE):
+    """
+    Streaming Extract/Transform/Load for the large workbooks: rows are read in chunks with
+    openpyxl's read-only iterator, cleaned, and appended to staging, so memory stays flat
+    regardless of sheet size. The legacy flight_routes table is streamed the same way.
+    """
+    print(f"\n--- 1b. STREAM (Excel -> Staging, {chunk_size} rows per chunk) ---")
+    conn = None
+    cursor = None
     try:
-        data_to_load = _clean_df_for_db(df)
-        cursor.execute("TRUNCATE TABLE stg_airport_reference")
-        print("   -> Staging table truncated.")
-        sql = "INSERT INTO stg_airport_reference (iata_code, airport_name, city) VALUES (%s,%s,%s)"
-        cursor.executemany(sql, data_to_load)
-        conn.commit()
-        print(f"   -> {cursor.rowcount} rows processed for stg_airport_reference.")
+        conn = _get_pool().acquire(session=LOAD_SESSION)
+        cursor = conn.cursor()
+
+        for name, (transform_func, load_func) in STREAMABLE_SOURCES.items():
+            paths = _resolve_source_paths(name)
+            if not paths:
+                print(f"❌ ERROR: File not found: {os.path.join(DATA_SOURCE_FOLDER, SOURCE_FILES[name])}"); return False
+
+            # Files matched by a glob are streamed one after another as if concatenated
+            # (keys repeated across chunks or files are dropped by the staging loader's dedup)
+            total_rows = 0
+            chunk_no = 0
+            with instrumentation.stage('stream', name, chunk_size=chunk_size) as stage:
+                for path in paths:
+                    for chunk in _iter_excel_chunks(path, chunk_size):
+                        chunk_no += 1
+                        total_rows += len(chunk)
+                        clean_df = transform_func(chunk)
+                        load_func(conn, cursor, clean_df, truncate=(chunk_no == 1))
+                if chunk_no == 0:
+                    load_func(conn, cursor, pd.DataFrame(), truncate=True)  # empty sheets: just clear staging
+                stage.update(rows_in=total_rows, chunks=chunk_no)
+            print(f"✅ Streamed {total_rows} rows from {SOURCE_FILES[name]} in {chunk_no} chunk(s)")
+
+        # The legacy table is read in keyset chunks (partitions in parallel) as they arrive
+        total_rows = 0
+        chunk_no = 0
+        with instrumentation.stage('stream', 'flight_routes', chunk_size=LEGACY_EXTRACT_OPTIONS['chunk_size'],
+                                   partitions=LEGACY_EXTRACT_OPTIONS['partitions']) as stage:
+            for chunk in _iter_flight_routes():
+                chunk_no += 1
+                total_rows += len(chunk)
+                _load_stg_flight_routes(conn, cursor, _transform_flight_routes(chunk), truncate=(chunk_no == 1))
+            if chunk_no == 0:
+                _load_stg_flight_routes(conn, cursor, pd.DataFrame(columns=FLIGHT_ROUTE_COLUMNS), truncate=True)
+            stage.update(rows_in=total_rows, chunks=chunk_no)
+        print(f"✅ Streamed {total_rows} rows from database '{DB_CONFIG_LEGACY['database']}', "
+              f"table 'flight_routes' in {chunk_no} chunk(s)")
+
+        return True
     except Exception as e:
-        print(f"❌ Error loading stg_airport_reference: {e}"); conn.rollback(); raise
+        print(f"❌ An unexpected error occurred during the STREAM phase.")
+        traceback.print_exc()
+        if conn: conn.rollback()
+        return False
+    finally:
+        if cursor: cursor.close()
+        if conn:
+            _get_pool().release(conn)
+            print("\n🔌 Database connection returned to the pool.")
+
+# --- Pipelined Extract -> Transform -> Load ---
+
+# Source -> (transform helper, staging loader)
+SOURCE_STEPS = {
+    'caa_movements': (_transform_caa_movements, _load_stg_caa_movements),
+    'srilankan_financials': (_transform_srilankan_financials, _load_stg_srilankan_financials),
+    'worldbank_transport': (_transform_worldbank_transport, _load_stg_worldbank_transport),
+    'aircraft_details': (_transform_aircraft_details, _load_stg_aircraft_details),
+    'flight_routes': (_transform_flight_routes, _load_stg_flight_routes),
+    'airport_reference': (_transform_airport_reference, _load_stg_airport_reference),
+}
+
+def _pipeline_extract(name, paths, executor, cache):
+    """
+    Pipeline stage: returns (frame, already_clean) for one source. Files are parsed in the
+    process pool (executor; None = in this thread) unless the cache has them.
+    """
+    if name == 'flight_routes':
+        df, metrics = measure_call(_read_flight_routes)
+        instrumentation.record('extract', 'flight_routes', source=name, rows_out=len(df), **metrics)
+        print(f"✅ Read {len(df)} rows from database '{DB_CONFIG_LEGACY['database']}', table 'flight_routes'")
+        return df, False
+    if not paths:
+        raise FileNotFoundError(f"File not found: {os.path.join(DATA_SOURCE_FOLDER, SOURCE_FILES[name])}")
+    if cache and SOURCE_CACHE_OPTIONS['transformed']:
+        clean_df = cache.get_transformed(_cache_name(name), paths)
+        if clean_df is not None:
+            print(f"⚡ Loaded cleaned {name} from cache ({len(clean_df)} rows)")
+            return clean_df, True
+
+    frames = []
+    for path in paths:
+        df = cache.get_raw(path) if cache else None
+        if df is None:
+            if executor:
+                df, metrics = executor.submit(measure_call, _read_source_file, path).result()
+            else:
+                df, metrics = measure_call(_read_source_file, path)
+            instrumentation.record('extract', os.path.basename(path), source=name, rows_out=len(df), **metrics)
+            if cache:
+                cache.put_raw(path, df)
+        frames.append(df)
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    print(f"✅ Read {len(df)} rows from {', '.join(os.path.basename(p) for p in paths)}")
+    return df, False
+
+def _pipeline_transform(name, extracted, cache):
+    """Pipeline stage: the source's transform helper (skipped for cleaned frames from the cache)."""
+    df, already_clean = extracted
+    if already_clean:
+        return df
+    clean_df = _measured_transform(name, SOURCE_STEPS[name][0], df)
+    if cache and SOURCE_CACHE_OPTIONS['transformed'] and name in SOURCE_FILES:
+        cache.put_transformed(_cache_name(name), clean_df)
+    print(f"✅ Transformed {name}.")
+    return clean_df
+
+def _pipeline_load(name, clean_df):
+    """Pipeline stage: loads one source into its staging table on its own pooled connection."""
+    pool = _get_pool()
+    conn = pool.acquire(session=LOAD_SESSION)
+    try:
+        cursor = conn.cursor()
+        try:
+            SOURCE_STEPS[name][1](conn, cursor, clean_df)
+        finally:
+            cursor.close()
+    finally:
+        pool.release(conn)
+    return clean_df
+
+def pipelined_etl(workers=EXTRACT_WORKERS, cache=None):
+    """
+    Extract, transform and load with every source flowing through the three stages on its
+    own (see pipeline.py), so e.g. the CAA staging load runs while the annual report is still
+    being parsed. Each source gets exactly the same transform and loader as in the phased
+    mode, so staging ends up identical. A source that fails doesn't stop the others.
+    Returns the cleaned frames ({'<source>_clean': df}, like transform()), or None if any
+    source failed.
+    """
+    print(f"\n--- 1-3. PIPELINED EXTRACT -> TRANSFORM -> LOAD ({workers} extract worker(s)) ---")
+    sources = {'flight_routes': None}  # the legacy DB read is the longest wait, so it starts first
+    sources.update({name: _resolve_source_paths(name) for name in SOURCE_FILES})
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        if executor:
+            executor.submit(int).result()  # start the worker processes before any pipeline thread runs
+        results = run_pipeline(sources, [
+            ('extract', partial(_pipeline_extract, executor=executor, cache=cache), max(1, workers) + 1),
+            ('transform', partial(_pipeline_transform, cache=cache), PIPELINE_OPTIONS['transform_workers']),
+            ('load', _pipeline_load, PIPELINE_OPTIONS['load_workers']),
+        ], PIPELINE_OPTIONS['queue_size'])
+    finally:
+        if executor:
+            executor.shutdown()
+        if cache:
+            cache.save()
+
+    print("\nPipeline results per source:")
+    print_pipeline_results(results)
+    failed = [name for name, result in results.items() if result['status'] != 'done']
+    if failed:
+        print(f"❌ {len(failed)} source(s) failed: {', '.join(failed)} (the others were loaded into staging)")
+        return None
+    return {f'{name}_clean': result['value'] for name, result in results.items()}
 
 # --- Main Execution Block ---
 
-def main():
-    """Controls the full ELT process."""
+def _run_phase(name, func, *args, **kwargs):
+    """Runs one pipeline phase as a top-level run report stage."""
+    with instrumentation.stage('run', name):
+        return func(*args, **kwargs)
+
+def main(stream=False, chunk_size=EXCEL_CHUNK_SIZE, workers=EXTRACT_WORKERS, clear_cache=False,
+         report_path=None, profile=False, pipeline=False):
+    """
+    Controls the full ELT process.
+    With stream=True the large workbooks go through stream_load() instead of being read whole.
+    With pipeline=True extract/transform/load run per source as a pipeline (pipelined_etl()).
+    workers sets the number of processes used to parse source files during extract.
+    Staging load strategy and batch size come from BULK_LOAD_OPTIONS, the parsed-source cache
+    from SOURCE_CACHE_OPTIONS (clear_cache=True empties it first). All phases share the
+    connection pools from _get_pool(), which are closed at the end of the run.
+    Timings, row counts and memory of every stage are written to a JSON run report
+    (report_path, default REPORT_FOLDER/run_<timestamp>.json); profile=True adds cProfile
+    and tracemalloc results.
+    """
     print("=" * 60)
     print("SriLankan Airlines Data Warehouse ELT Process")
     print(" (Reading from Excel)")
     print("=" * 60)
-    
-    # --- Step 1: EXTRACT ---
-    raw_datasets = extract()
-    if not raw_datasets: 
-        return False
-        
-    # --- Step 2: TRANSFORM (for Staging) ---
-    transformed_datasets = transform(raw_datasets)
-    if not transformed_datasets: 
-        return False
-        
-    # --- Step 3: LOAD (to Staging) ---
-    load_success = load(transformed_datasets)
-    if not load_success:
-        return False
+
+    report_path = report_path or os.path.join(REPORT_FOLDER, f"run_{pd.Timestamp.now():%Y%m%d_%H%M%S}.json")
+    instrumentation.start_run(profile=profile, stream=stream, pipeline=pipeline, workers=workers,
+                              bulk_load=dict(BULK_LOAD_OPTIONS),
+                              warehouse=dict(WAREHOUSE_OPTIONS), transform=dict(TRANSFORM_OPTIONS),
+                              cache=SOURCE_CACHE_OPTIONS['enabled'])
+    success = False
+    cache = _open_source_cache(clear=clear_cache) if SOURCE_CACHE_OPTIONS['enabled'] else None
+    try:
+        if pipeline:
+            # --- Steps 1-3 per source: EXTRACT -> TRANSFORM -> LOAD ---
+            transformed_datasets = _run_phase('pipeline', pipelined_etl, workers=workers, cache=cache)
+            if not transformed_datasets:
+                return False
+        else:
+            # --- Step 1: EXTRACT ---
+            raw_datasets = _run_phase('extract', extract, skip_sources=STREAMED_SOURCES if stream else (),
+                                      workers=workers, cache=cache)
+            if not raw_datasets: 
+                return False
+            
+            # --- Step 2: TRANSFORM (for Staging) ---
+            transformed_datasets = _run_phase('transform', transform, raw_datasets)
+            if not transformed_datasets: 
+                return False
+            if cache:
+                _cache_transformed(cache, transformed_datasets)
+            
+            # --- Step 3: LOAD (to Staging) ---
+            load_success = _run_phase('load', load, transformed_datasets)
+            if not load_success:
+                return False
+
+        if stream and not _run_phase('stream', stream_load, chunk_size):
+            return False
         
-    # --- Step 4: TRANSFORM (Staging to Warehouse) ---
-    # <-- MODIFIED: Call the new warehouse transform step
-    transform_success = run_warehouse_transforms()
-    if not transform_success:
-        return False
+        # --- Step 4: TRANSFORM (Staging to Warehouse) ---
+        # <-- MODIFIED: Call the new warehouse transform step
+        transform_success = _run_phase('warehouse', run_warehouse_transforms, transformed_datasets)
+        if not transform_success:
+            return False
+
+        # --- Step 5: EXPORT (columnar snapshot for BI) ---
+        if EXPORT_OPTIONS['enabled'] and not _run_phase('export', export_snapshot):
+            return False
         
-    return True # Return True only if all steps succeed
+        success = True
+        return True # Return True only if all steps succeed
+    finally:
+        close_pools()
+        instrumentation.finish_run(report_path, success)
+        print(f"\n📊 Run report written to {report_path}")
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="SriLankan Airlines Data Warehouse ELT Process")
+    parser.add_argument('--stream', action='store_true',
+                        help="stream the large Excel sources into staging in chunks (bounded memory)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="run extract -> transform -> load per source as a pipeline instead of phase by phase")
+    parser.add_argument('--chunk-size', type=int, default=EXCEL_CHUNK_SIZE,
+                        help=f"rows per chunk in --stream mode (default: {EXCEL_CHUNK_SIZE})")
+    parser.add_argument('--legacy-chunk-size', type=int, default=LEGACY_EXTRACT_OPTIONS['chunk_size'],
+                        help=f"rows per keyset chunk read from the legacy database (default: {LEGACY_EXTRACT_OPTIONS['chunk_size']})")
+    parser.add_argument('--legacy-partitions', type=int, default=LEGACY_EXTRACT_OPTIONS['partitions'],
+                        help="route_id ranges of flight_routes read in parallel connections (default: 1)")
+    parser.add_argument('--workers', type=int, default=EXTRACT_WORKERS,
+                        help=f"processes used to parse source files, 1 = serial (default: {EXTRACT_WORKERS})")
+    parser.add_argument('--load-strategy', choices=sorted(BULK_STRATEGIES), default=BULK_LOAD_OPTIONS['strategy'],
+                        help=f"how staging tables are bulk loaded (default: {BULK_LOAD_OPTIONS['strategy']})")
+    parser.add_argument('--batch-size', type=int, default=BULK_LOAD_OPTIONS['batch_size'],
+                        help=f"rows per INSERT batch (default: {BULK_LOAD_OPTIONS['batch_size']})")
+    parser.add_argument('--key-conflicts', choices=list(CONFLICT_RULES), default=BULK_LOAD_OPTIONS['key_conflicts'],
+                        help="rows sharing a business key with other values: fail the load, or the last row wins "
+                             f"(default: {BULK_LOAD_OPTIONS['key_conflicts']})")
+    load_mode = parser.add_mutually_exclusive_group()
+    load_mode.add_argument('--incremental', action='store_true',
+                           help="only write new or changed staging rows (compared with the last run's fingerprints)")
+    load_mode.add_argument('--full-reload', action='store_true',
+                           help="truncate and reload every staging table (default)")
+    parser.add_argument('--compact', action='store_true',
+                        help="clean distinct values once and keep categoricals / downcast numbers (less memory)")
+    parser.add_argument('--fact-refresh', choices=['full', 'merge'], default=WAREHOUSE_OPTIONS['fact_refresh'],
+                        help="rebuild all fact rows, or merge only the date_key slices changed since the last run")
+    parser.add_argument('--fact-source', choices=['staging', 'direct'], default=WAREHOUSE_OPTIONS['fact_source'],
+                        help="build facts from staging with SQL, or load them directly from the transformed data")
+    parser.add_argument('--sql-workers', type=int, default=WAREHOUSE_OPTIONS['workers'],
+                        help=f"warehouse SQL steps run concurrently, 1 = serial (default: {WAREHOUSE_OPTIONS['workers']})")
+    parser.add_argument('--no-aggregates', action='store_true',
+                        help="don't refresh the aggregate tables (ddl/04_create_aggregate_tables.sql) after the facts")
+    parser.add_argument('--seed-calendar', metavar='START:END',
+                        help="only pre-seed dim_date with every day of years START to END (e.g. 1990:2050), then exit")
+    parser.add_argument('--export', action='store_true',
+                        help=f"after the warehouse step, write changed tables to Parquet in {EXPORT_OPTIONS['folder']}")
+    parser.add_argument('--drop-years-before', type=int, metavar='YEAR',
+                        help="only drop fact rows dated before YEAR (whole partitions), then exit")
+    parser.add_argument('--report', metavar='PATH',
+                        help=f"where to write the JSON run report (default: {REPORT_FOLDER}/run_<timestamp>.json)")
+    parser.add_argument('--profile', action='store_true',
+                        help="also profile the run with cProfile and tracemalloc (slower; results go into the report)")
+    parser.add_argument('--no-cache', action='store_true', help="bypass the parsed-source cache for this run")
+    parser.add_argument('--clear-cache', action='store_true', help="empty the parsed-source cache before running")
+    args = parser.parse_args()
+    if args.incremental and args.stream:
+        parser.error("--incremental cannot be combined with --stream")
+    if args.pipeline and args.stream:
+        parser.error("--pipeline cannot be combined with --stream")
+    if args.fact_source == 'direct' and (args.stream or args.fact_refresh == 'merge'):
+        parser.error("--fact-source direct replaces whole fact tables from memory: "
+                     "it cannot be combined with --stream or --fact-refresh merge")
+    if args.seed_calendar:
+        try:
+            start_year, end_year = (int(y) for y in args.seed_calendar.split(':'))
+        except ValueError:
+            parser.error("--seed-calendar expects START:END years, e.g. 1990:2050")
+        args.seed_calendar = (start_year, end_year)
+    return args
 
 if __name__ == "__main__":
+    args = _parse_args()
+    BULK_LOAD_OPTIONS.update(strategy=args.load_strategy, batch_size=args.batch_size, incremental=args.incremental,
+                             key_conflicts=args.key_conflicts)
+    WAREHOUSE_OPTIONS.update(fact_refresh=args.fact_refresh, workers=args.sql_workers, fact_source=args.fact_source,
+                             aggregates=not args.no_aggregates)
+    SOURCE_CACHE_OPTIONS.update(enabled=not args.no_cache)
+    TRANSFORM_OPTIONS.update(compact=args.compact)
+    LEGACY_EXTRACT_OPTIONS.update(chunk_size=args.legacy_chunk_size, partitions=args.legacy_partitions)
+    EXPORT_OPTIONS.update(enabled=args.export)
     try:
-        if main():
+        if args.seed_calendar:
+            seed_dim_date(*args.seed_calendar)
+        elif args.drop_years_before:
+            drop_fact_years_before(args.drop_years_before)
+        elif main(stream=args.stream, chunk_size=args.chunk_size, workers=args.workers, clear_cache=args.clear_cache,
+                  report_path=args.report, profile=args.profile, pipeline=args.pipeline):
             print("\n🎉 Full ELT process completed successfully!")
         else:
             print("\n❌ ELT process failed! Please check the error messages above.")
@@ -0,0 +1,200 @@
+"""
+Per-stage performance instrumentation and the JSON run report.
+
+Every stage (a source file read, a transform helper, a staging table load, a warehouse SQL
+step, ...) records wall time, CPU time, rows in/out, rows per second and peak memory:
+
+- cpu_seconds is the CPU time of the thread that ran the stage (for files parsed in the
+  extract process pool: of the worker process's thread).
+- peak_rss_mb is the process's resident-memory high-water mark when the stage finished, so
+  the stage where it jumps is the one that grew it (not available on Windows).
+- With profiling on, peak_traced_mb is the tracemalloc peak of Python allocations while the
+  stage ran (including anything concurrent stages allocated meanwhile), and the report also
+  gets the top cProfile functions and allocation sites. cProfile only sees the main thread.
+
+Stages are collected by the run started with start_run(); stage()/record() are no-ops for
+the report (but still usable) when no run is active, e.g. when the ETL functions are called
+from benchmarks.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILE_TOP_N = 25
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux (bytes on macOS)
+    scale = 1024 * 1024 if os.uname().sysname == 'Darwin' else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+def _rows_per_second(rows, seconds):
+    return round(rows / seconds, 1) if rows is not None and seconds > 0 else None
+
+def measure_call(func, *args):
+    """
+    Runs func(*args) and returns (result, metrics). Picklable when func is, so it can wrap
+    work sent to a process or thread pool.
+    """
+    wall, cpu = time.perf_counter(), time.thread_time()
+    result = func(*args)
+    return result, {
+        'wall_seconds': round(time.perf_counter() - wall, 4),
+        'cpu_seconds': round(time.thread_time() - cpu, 4),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+class RunReport:
+    """Stages of one ETL run, written out as JSON by finish()."""
+
+    def __init__(self, profile=False, **context):
+        self.started_at = datetime.now()
+        self.context = context
+        self.stages = []
+        self.profile = profile
+        self._lock = threading.Lock()
+        self._open = []            # stage dicts currently running (for tracemalloc peaks)
+        self._profiler = None
+        if profile:
+            tracemalloc.start()
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    # --- tracemalloc peak bookkeeping ---
+
+    def _update_traced_peaks(self, reset):
+        """Folds the current tracemalloc peak into every open stage, then optionally resets it."""
+        peak = tracemalloc.get_traced_memory()[1]
+        for entry in self._open:
+            entry['_traced_peak'] = max(entry['_traced_peak'], peak)
+        if reset:
+            tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, phase, name, rows_in=None, **labels):
+        """
+        with report.stage('load', 'stg_caa_movements', rows_in=len(df)) as stage:
+            ...
+            stage['rows_out'] = written
+        """
+        entry = {'phase': phase, 'name': name, **labels, 'rows_in': rows_in, 'rows_out': None}
+        if self.profile:
+            with self._lock:
+                self._update_traced_peaks(reset=True)
+                entry['_traced_peak'] = 0
+                self._open.append(entry)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        entry['status'] = 'error'
+        try:
+            yield entry
+            entry['status'] = 'ok'
+        finally:
+            entry['wall_seconds'] = round(time.perf_counter() - wall, 4)
+            entry['cpu_seconds'] = round(time.thread_time() - cpu, 4)
+            entry['rows_per_second'] = _rows_per_second(entry['rows_out'], entry['wall_seconds'])
+            entry['peak_rss_mb'] = peak_rss_mb()
+            with self._lock:
+                if self.profile:
+                    self._update_traced_peaks(reset=False)
+                    self._open.remove(entry)
+                    entry['peak_traced_mb'] = round(entry.pop('_traced_peak') / 1024 ** 2, 1)
+                self.stages.append(entry)
+
+    def record(self, phase, name, rows_in=None, rows_out=None, **metrics):
+        """Adds a stage measured elsewhere (e.g. by measure_call() in a worker process)."""
+        entry = {'phase': phase, 'name': name, 'rows_in': rows_in, 'rows_out': rows_out, 'status': 'ok', **metrics}
+        entry.setdefault('wall_seconds', 0.0)
+        entry['rows_per_second'] = _rows_per_second(rows_out, entry['wall_seconds'])
+        with self._lock:
+            self.stages.append(entry)
+
+    # --- Output ---
+
+    def _profile_summary(self):
+        self._profiler.disable()
+        stats = pstats.Stats(self._profiler, stream=io.StringIO()).sort_stats('cumulative')
+        functions = []
+        for (filename, line, func), (_, calls, own, cumulative, _) in list(stats.stats.items()):
+            functions.append({'function': f"{os.path.basename(filename)}:{line}({func})", 'calls': calls,
+                              'own_seconds': round(own, 4), 'cumulative_seconds': round(cumulative, 4)})
+        functions.sort(key=lambda f: f['cumulative_seconds'], reverse=True)
+
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        allocations = [{'site': str(stat.traceback), 'size_mb': round(stat.size / 1024 ** 2, 2), 'count': stat.count}
+                       for stat in snapshot.statistics('lineno')[:PROFILE_TOP_N]]
+        return {'top_functions': functions[:PROFILE_TOP_N], 'top_allocations': allocations}
+
+    def summary(self):
+        """Per phase: stage count and summed stage times (concurrent stages overlap, so the sum can exceed wall time)."""
+        phases = {}
+        for entry in self.stages:
+            totals = phases.setdefault(entry['phase'], {'stages': 0, 'wall_seconds_sum': 0.0, 'cpu_seconds': 0.0})
+            totals['stages'] += 1
+            totals['wall_seconds_sum'] = round(totals['wall_seconds_sum'] + entry.get('wall_seconds', 0.0), 4)
+            totals['cpu_seconds'] = round(totals['cpu_seconds'] + (entry.get('cpu_seconds') or 0.0), 4)
+        return phases
+
+    def finish(self, path, success):
+        """Writes the report (and, when profiling, a .prof file next to it); returns the report dict."""
+        report = {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'success': success,
+            'context': self.context,
+            'peak_rss_mb': peak_rss_mb(),
+            'phases': self.summary(),
+            'stages': self.stages,
+        }
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if self._profiler:
+            self._profiler.dump_stats(os.path.splitext(path)[0] + '.prof')
+            report['profile'] = self._profile_summary()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+        return report
+
+
+# --- Active run ---
+
+_active = None
+
+def start_run(profile=False, **context):
+    global _active
+    _active = RunReport(profile=profile, **context)
+    return _active
+
+def finish_run(path, success):
+    global _active
+    report, _active = _active, None
+    return report.finish(path, success) if report else None
+
+@contextmanager
+def stage(phase, name, rows_in=None, **labels):
+    """RunReport.stage() on the active run; just yields a scratch dict when there is none."""
+    if _active is None:
+        yield {'rows_in': rows_in, 'rows_out': None}
+    else:
+        with _active.stage(phase, name, rows_in, **labels) as entry:
+            yield entry
+
+def record(phase, name, rows_in=None, rows_out=None, **metrics):
+    if _active is not None:
+        _active.record(phase, name, rows_in, rows_out, **metrics)
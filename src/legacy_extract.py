@@ -0,0 +1,133 @@
+"""
+Chunked, partitioned reads from the legacy source database.
+
+Tables are read with keyset pagination on a key column (WHERE key > last ORDER BY key LIMIT n)
+through unbuffered server-side cursors (pymysql's SSCursor), so the client never holds more
+than one chunk per reader, and every chunk query is an index range scan however deep into the
+table it is (unlike LIMIT ... OFFSET).
+
+The key doesn't have to be unique: when a chunk ends inside a run of equal keys, the rest of
+that run is fetched with it, so one key value never spans two chunks. (Keys are compared with
+the server's collation; the end of a chunk is matched case-insensitively on the client.)
+
+With partitions > 1 the key range is split at evenly spaced key values and the partitions are
+read at the same time, each on its own pooled connection. Chunks reach the caller through a
+bounded queue, so memory stays at a few chunks whatever the size of the table.
+"""
+import queue
+import threading
+import pandas as pd
+import pymysql
+
+
+def _fetch(conn, sql, params=()):
+    """Runs one query on an unbuffered cursor and returns its rows."""
+    cursor = conn.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+def key_partitions(conn, table, key, partitions):
+    """
+    Splits the non-NULL key range into `partitions` (lower, upper] ranges of about equal row
+    counts; None means unbounded.
+    """
+    count = _fetch(conn, f"SELECT COUNT(*) FROM {table} WHERE {key} IS NOT NULL")[0][0]
+    bounds = []
+    for i in range(1, partitions):
+        rows = _fetch(conn, f"SELECT {key} FROM {table} WHERE {key} IS NOT NULL ORDER BY {key} LIMIT 1 OFFSET %s",
+                      (count * i // partitions,))
+        if rows and (not bounds or rows[0][0] != bounds[-1]):
+            bounds.append(rows[0][0])
+    edges = [None] + bounds + [None]
+    return list(zip(edges[:-1], edges[1:]))
+
+def iter_keyset_chunks(conn, table, columns, key, chunk_size, lower=None, upper=None, include_null=False):
+    """
+    Yields DataFrames of about chunk_size rows with lower < key <= upper, in key order.
+    include_null=True also yields the rows whose key is NULL (at the end).
+    """
+    select = f"SELECT {', '.join(columns)} FROM {table}"
+    key_pos = columns.index(key)
+    last = lower
+    while True:
+        where, params = [f"{key} IS NOT NULL"], []
+        if last is not None:
+            where.append(f"{key} > %s")
+            params.append(last)
+        if upper is not None:
+            where.append(f"{key} <= %s")
+            params.append(upper)
+        rows = _fetch(conn, f"{select} WHERE {' AND '.join(where)} ORDER BY {key} LIMIT %s", params + [chunk_size])
+        if not rows:
+            break
+        full = len(rows) == chunk_size
+        if full:
+            # Take the whole run of the last key, so the next chunk can start after it
+            last = rows[-1][key_pos]
+            rows = [row for row in rows if str(row[key_pos]).lower() != str(last).lower()]
+            rows += _fetch(conn, f"{select} WHERE {key} = %s", (last,))
+        yield pd.DataFrame(rows, columns=columns)
+        if not full:
+            break
+    if include_null:
+        rows = _fetch(conn, f"{select} WHERE {key} IS NULL")
+        if rows:
+            yield pd.DataFrame(rows, columns=columns)
+
+def stream_table(pool, table, columns, key, chunk_size, partitions=1, queue_size=None):
+    """
+    Yields the whole table as DataFrame chunks, reading `partitions` key ranges in parallel on
+    connections from `pool` (a db_pool.ConnectionPool). Chunks of different partitions arrive
+    interleaved. Closing the generator early stops the readers.
+    """
+    if partitions > 1:
+        with pool.connection() as conn:
+            ranges = key_partitions(conn, table, key, partitions)
+    else:
+        ranges = [(None, None)]
+
+    chunks = queue.Queue(maxsize=queue_size or 2 * len(ranges))
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read(lower, upper, include_null):
+        try:
+            with pool.connection() as conn:
+                for chunk in iter_keyset_chunks(conn, table, columns, key, chunk_size, lower, upper, include_null):
+                    if not put(chunk):
+                        return
+        except Exception as e:
+            put(e)
+        finally:
+            put(done)
+
+    readers = [threading.Thread(target=read, args=(lower, upper, i == 0), daemon=True)
+               for i, (lower, upper) in enumerate(ranges)]
+    for reader in readers:
+        reader.start()
+    try:
+        finished = 0
+        while finished < len(readers):
+            item = chunks.get()
+            if item is done:
+                finished += 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+        for reader in readers:
+            reader.join()
@@ -0,0 +1,129 @@
+"""
+Year partitions of the fact tables (see ddl/03_create_fact_tables.sql).
+
+The facts are RANGE-partitioned on date_key with one partition per year: pYYYY holds
+YYYY0101 <= date_key < (YYYY+1)0101, earlier years go to the first partition and later ones
+to a MAXVALUE partition. That lets the ETL work a year at a time without row-by-row DELETEs:
+
+- swap_partition() fills an empty, unpartitioned copy of the table and exchanges it with the
+  year's partition (ALTER TABLE ... EXCHANGE PARTITION only swaps the two tablespaces). The
+  copy's AUTO_INCREMENT starts past the table's highest id, so surrogate ids (movement_id,
+  ...) stay unique across partitions;
+- truncate_partition() empties a year;
+- add_year_partitions() splits the MAXVALUE partition when a new year arrives;
+- drop_years_before() removes old years and folds their partitions into the first one.
+
+Tables that aren't partitioned this way report no year partitions, and callers fall back to
+DELETE + INSERT.
+"""
+import re
+
+_PARTITIONS_SQL = """
+    SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+    ORDER BY PARTITION_ORDINAL_POSITION
+"""
+
+_AUTO_INCREMENT_SQL = """
+    SELECT COLUMN_NAME FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND EXTRA LIKE '%%auto_increment%%'
+"""
+
+
+def year_start(year):
+    return year * 10000 + 101
+
+def _partitions(cursor, table):
+    """[(name, upper bound date_key or None for MAXVALUE)] in range order; [] if not partitioned."""
+    cursor.execute(_PARTITIONS_SQL, (table,))
+    return [(name, None if description == 'MAXVALUE' else int(description))
+            for name, description in cursor.fetchall()]
+
+def year_partitions(cursor, table):
+    """{year: partition name} for the partitions that hold exactly one year."""
+    years = {}
+    lower = None
+    for name, upper in _partitions(cursor, table):
+        match = re.fullmatch(r'p(\d{4})', name)
+        if match and lower is not None and upper is not None:
+            year = int(match.group(1))
+            if lower == year_start(year) and upper == year_start(year + 1):
+                years[year] = name
+        lower = upper
+    return years
+
+def add_year_partitions(cursor, table, years):
+    """
+    Splits the MAXVALUE partition so every year in `years` past the last bounded partition
+    gets a pYYYY of its own (years in between too, to keep one year per partition).
+    Returns the years added.
+    """
+    partitions = _partitions(cursor, table)
+    if len(partitions) < 2 or partitions[-1][1] is not None:
+        return []
+    last_upper = partitions[-2][1]
+    new = [y for y in years if year_start(y) >= last_upper]
+    if not new or last_upper % 10000 != 101:
+        return []
+    added = list(range(last_upper // 10000, max(new) + 1))
+    maxvalue = partitions[-1][0]
+    ranges = ', '.join(f"PARTITION p{y} VALUES LESS THAN ({year_start(y + 1)})" for y in added)
+    cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION {maxvalue} INTO "
+                   f"({ranges}, PARTITION {maxvalue} VALUES LESS THAN MAXVALUE)")
+    return added
+
+def swap_partition(conn, cursor, table, partition, fill):
+    """
+    Replaces the rows of one partition: fill(cursor, swap_table) inserts the new rows into an
+    empty, unpartitioned copy of the table (and returns their count), which is then exchanged
+    with the partition. Readers see either all the old rows of the partition or all the new ones.
+    CREATE TABLE ... LIKE starts the copy's AUTO_INCREMENT at 1, so it is moved past the table's
+    highest id first, and the table's own counter past the new rows afterwards.
+    """
+    swap = f"{table}_swap_{partition}"
+    cursor.execute(f"DROP TABLE IF EXISTS {swap}")
+    cursor.execute(f"CREATE TABLE {swap} LIKE {table}")
+    try:
+        cursor.execute(f"ALTER TABLE {swap} REMOVE PARTITIONING")
+        _continue_ids(cursor, table, swap)
+        inserted = fill(cursor, swap)
+        conn.commit()
+        cursor.execute(f"ALTER TABLE {table} EXCHANGE PARTITION {partition} WITH TABLE {swap}")
+        _continue_ids(cursor, table, table)
+    finally:
+        cursor.execute(f"DROP TABLE IF EXISTS {swap}")
+    return inserted
+
+def _continue_ids(cursor, table, target):
+    """Sets target's AUTO_INCREMENT past the highest id in table (no-op without an AUTO_INCREMENT column)."""
+    cursor.execute(_AUTO_INCREMENT_SQL, (table,))
+    columns = [row[0] for row in cursor.fetchall()]
+    if not columns:
+        return
+    cursor.execute(f"SELECT COALESCE(MAX({columns[0]}), 0) + 1 FROM {table}")
+    next_id = cursor.fetchall()[0][0]
+    cursor.execute(f"ALTER TABLE {target} AUTO_INCREMENT = {int(next_id)}")
+
+def truncate_partition(cursor, table, partition):
+    cursor.execute(f"ALTER TABLE {table} TRUNCATE PARTITION {partition}")
+
+def drop_years_before(cursor, table, year):
+    """
+    Removes every row dated before `year` by truncating the partitions below it, then merges
+    those (now empty) partitions into the first one, so the remaining years keep their own.
+    Needs a partition boundary at the start of `year`. Returns the date_keys removed.
+    """
+    cutoff = year_start(year)
+    partitions = _partitions(cursor, table)
+    old = [name for name, upper in partitions if upper is not None and upper <= cutoff]
+    if not old:
+        return []
+    if dict(partitions)[old[-1]] != cutoff:
+        raise ValueError(f"{table} has no partition boundary at {cutoff}")
+    cursor.execute(f"SELECT DISTINCT date_key FROM {table} WHERE date_key < %s", (cutoff,))
+    removed = [row[0] for row in cursor.fetchall()]
+    cursor.execute(f"ALTER TABLE {table} TRUNCATE PARTITION {', '.join(old)}")
+    if len(old) > 1:
+        cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION {', '.join(old)} INTO "
+                       f"(PARTITION {old[0]} VALUES LESS THAN ({cutoff}))")
+    return removed
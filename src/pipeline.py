@@ -0,0 +1,77 @@
+"""
+Pipelined execution: each item (e.g. a source) flows through a chain of stages on its own.
+
+Every stage has its own worker threads and passes finished items on to the next stage through
+a bounded queue, so an item can be loaded while others are still being parsed. A worker whose
+output queue is full blocks until the next stage catches up (backpressure): at most
+queue_size items wait between two stages however many items there are. An item that fails in
+a stage is dropped from the pipeline and reported; the other items carry on.
+"""
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+def run_pipeline(items, stages, queue_size=1):
+    """
+    items: {name: input of the first stage}.
+    stages: [(stage_name, func(name, value) -> value for the next stage, workers)].
+    Returns {name: {'status': 'done' or 'failed', 'value': output of the last stage,
+                    'stage': stage that failed, 'error': message, 'seconds': {stage_name: seconds}}}.
+    """
+    queues = [queue.Queue()] + [queue.Queue(maxsize=queue_size) for _ in stages[1:]]
+    results = {name: {'status': 'pending', 'seconds': {}} for name in items}
+    lock = threading.Lock()
+    finished = threading.Semaphore(0)
+
+    def worker(index):
+        stage_name, func, _ = stages[index]
+        while True:
+            item = queues[index].get()
+            if item is _STOP:
+                return
+            name, value = item
+            started = time.perf_counter()
+            try:
+                value = func(name, value)
+            except Exception as e:
+                with lock:
+                    results[name].update(status='failed', stage=stage_name, error=f"{type(e).__name__}: {e}")
+                finished.release()
+                continue
+            finally:
+                with lock:
+                    results[name]['seconds'][stage_name] = round(time.perf_counter() - started, 4)
+            if index + 1 < len(stages):
+                queues[index + 1].put((name, value))
+            else:
+                with lock:
+                    results[name].update(status='done', value=value)
+                finished.release()
+
+    threads = [threading.Thread(target=worker, args=(index,), name=f"{stage_name}-{n}", daemon=True)
+               for index, (stage_name, _, workers) in enumerate(stages) for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    for name, value in items.items():
+        queues[0].put((name, value))
+
+    for _ in items:
+        finished.acquire()
+    for index, (_, _, workers) in enumerate(stages):
+        for _ in range(workers):
+            queues[index].put(_STOP)
+    for thread in threads:
+        thread.join()
+    return results
+
+def print_pipeline_results(results):
+    """Per item: seconds spent in each stage, and where it failed."""
+    for name, result in results.items():
+        stages = ', '.join(f"{stage} {secs:.2f}s" for stage, secs in result['seconds'].items())
+        if result['status'] == 'done':
+            print(f"   ✅ {name:<22} {stages}")
+        else:
+            print(f"   ❌ {name:<22} {stages}  (failed in {result['stage']}: {result['error']})")
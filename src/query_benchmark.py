@@ -0,0 +1,225 @@
+"""
+EXPLAIN-based benchmark of the shipped analysis queries against the fact table physical design.
+
+Run from the src folder (needs the MySQL server of etl.DB_CONFIG):
+    python query_benchmark.py [--rows 100000,1000000] [--repeat 3] [--match CMB] [--keep]
+
+For every size in --rows, two scratch databases are created from ddl/02 and ddl/03:
+'after' is the current design (covering indexes, year partitions), 'before' the same tables
+stripped back to the old layout (id primary keys and one index per foreign key column, no
+partitions). Both get the same synthetic dimensions and facts. Every query in analysis/*.sql
+is then EXPLAINed and timed (fastest of --repeat runs) on both, and the results are printed
+and written to --out as JSON. Queries MySQL can't run (e.g. FULL OUTER JOIN) are reported
+with their error.
+"""
+import argparse
+import json
+import os
+import re
+import time
+import numpy as np
+import pandas as pd
+
+import etl
+from bulk_load import bulk_insert
+from calendar_dim import DIM_DATE_COLUMNS, missing_calendar_rows
+from query_service import load_analysis_queries
+
+DEFAULT_ROWS = [100_000, 1_000_000]
+DDL_FILES = ['../ddl/02_create_dimension_tables.sql', '../ddl/03_create_fact_tables.sql']
+OUT_FILE = '../data/benchmarks/query_benchmark.json'
+YEARS = (2015, 2024)
+
+# Foreign key columns of the old fact tables; each had an index of its own
+FACT_FOREIGN_KEYS = {
+    'fact_passenger_movements': ('movement_id', ['date_key', 'airport_key']),
+    'fact_airline_financials': ('financial_id', ['date_key', 'metric_key']),
+    'fact_world_transport_stats': ('stat_id', ['date_key', 'country_key']),
+}
+
+AIRPORTS = ['CMB', 'HRI', 'JAF', 'BTC', 'TRR', 'RML', 'GIU', 'ADP', 'KCT', 'WRZ']
+NEIGHBOURS = ['Sri Lanka', 'India', 'Maldives', 'Bangladesh']
+
+
+# --- Scratch databases ---
+
+def _ddl_statements(path):
+    with open(path, encoding='utf-8') as f:
+        text = re.sub(r'/\*.*?\*/', '', f.read(), flags=re.S)
+    text = re.sub(r'--[^\n]*', '', text)
+    return [s.strip() for s in text.split(';') if s.strip() and not s.strip().upper().startswith('USE ')]
+
+def _connect(database=None):
+    config = dict(etl.DB_CONFIG)
+    config.pop('database', None)
+    if database:
+        config['database'] = database
+    return etl.mysql.connector.connect(**config)
+
+def _strip_physical_design(cursor):
+    """Takes the facts back to the pre-partitioning layout: id primary key, one index per foreign key."""
+    cursor.execute("ALTER TABLE dim_date DROP KEY idx_date_year")
+    for table, (id_column, foreign_keys) in FACT_FOREIGN_KEYS.items():
+        cursor.execute(f"ALTER TABLE {table} REMOVE PARTITIONING")
+        cursor.execute("""
+            SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME != 'PRIMARY'
+        """, (table,))
+        changes = [f"DROP KEY {row[0]}" for row in cursor.fetchall()]
+        changes += ["DROP PRIMARY KEY", f"ADD PRIMARY KEY ({id_column})"]
+        changes += [f"ADD KEY idx_{column} ({column})" for column in foreign_keys]
+        cursor.execute(f"ALTER TABLE {table} {', '.join(changes)}")
+
+def synthetic_warehouse(rows, seed=42):
+    """{table: DataFrame} of dimensions and facts; `rows` passenger movement rows."""
+    rng = np.random.default_rng(seed)
+    start, end = pd.Timestamp(YEARS[0], 1, 1), pd.Timestamp(YEARS[1], 12, 31)
+    dim_date = missing_calendar_rows(start, end, [])
+    countries = NEIGHBOURS + [f"Country {i:03d}" for i in range(len(NEIGHBOURS), 200)]
+    metrics = [m for names in etl.METRIC_CATEGORIES.values() for m in names]
+    years = np.arange(YEARS[0], YEARS[1] + 1)
+    world = pd.MultiIndex.from_product([years, range(1, len(countries) + 1)]).to_frame(index=False)
+    world = world.sample(frac=0.95, random_state=seed).sort_values([0, 1])  # some countries miss a year
+    financials = pd.MultiIndex.from_product([years, range(1, len(metrics) + 1)]).to_frame(index=False)
+    return {
+        'dim_date': dim_date,
+        'dim_airport': pd.DataFrame({'iata_code': AIRPORTS, 'airport_name': [f"{c} Airport" for c in AIRPORTS],
+                                     'city': AIRPORTS, 'country': 'Sri Lanka'}),
+        'dim_country': pd.DataFrame({'country_code': [f"C{i:02X}" for i in range(len(countries))],
+                                     'country_name': countries}),
+        'dim_metric': pd.DataFrame({'metric_name': metrics, 'metric_category': etl._metric_category(pd.Series(metrics))}),
+        'fact_passenger_movements': pd.DataFrame({
+            'date_key': rng.choice(dim_date['date_key'].to_numpy(), size=rows),
+            'airport_key': rng.integers(1, len(AIRPORTS) + 1, size=rows),
+            'passengers': rng.integers(0, 5_000, size=rows),
+            'aircraft_movements': rng.integers(0, 40, size=rows),
+        }),
+        'fact_world_transport_stats': pd.DataFrame({
+            'date_key': world[0].to_numpy() * 10000 + 101, 'country_key': world[1].to_numpy(),
+            'passengers': rng.integers(10_000, 100_000_000, size=len(world)),
+        }),
+        'fact_airline_financials': pd.DataFrame({
+            'date_key': financials[0].to_numpy() * 10000 + 101, 'metric_key': financials[1].to_numpy(),
+            'value': rng.integers(1, 10_000_000, size=len(financials)).astype(float), 'currency': 'USD',
+        }),
+    }
+
+def build_database(name, data, design):
+    """(Re)creates scratch database `name` with the 'before' or 'after' design and loads `data`."""
+    conn = _connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS {name}")
+        cursor.execute(f"CREATE DATABASE {name}")
+    finally:
+        conn.close()
+    conn = _connect(name)
+    cursor = conn.cursor()
+    for path in DDL_FILES:
+        for statement in _ddl_statements(path):
+            cursor.execute(statement)
+    if design == 'before':
+        _strip_physical_design(cursor)
+    for table, df in data.items():
+        columns = DIM_DATE_COLUMNS if table == 'dim_date' else list(df.columns)
+        bulk_insert(cursor, table, columns, df[columns])
+    conn.commit()
+    for table in data:
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+    return conn
+
+
+# --- Measurements ---
+
+def explain(cursor, sql):
+    """Plan summary: estimated cost, and per table the access type, key, partitions and rows."""
+    cursor.execute(f"EXPLAIN FORMAT=JSON {sql}")
+    plan = json.loads(cursor.fetchone()[0])
+    cost = float(plan['query_block'].get('cost_info', {}).get('query_cost', 'nan'))
+    cursor.execute(f"EXPLAIN {sql}")
+    columns = [c[0] for c in cursor.description]
+    tables = []
+    for row in cursor.fetchall():
+        row = dict(zip(columns, row))
+        if row.get('table'):
+            tables.append({k: row.get(k) for k in ('table', 'partitions', 'type', 'key', 'rows', 'Extra')})
+    return {'cost': cost, 'tables': tables}
+
+def time_query(cursor, sql, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(sql)
+        cursor.fetchall()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def _plan_summary(plan):
+    """'alias:type(key)' for every table the plan reads."""
+    return ' '.join(f"{t['table']}:{t['type']}({t['key'] or '-'})" for t in plan['tables'])
+
+def bench_queries(rows, queries, repeat, keep=False):
+    data = synthetic_warehouse(rows)
+    results = {}
+    connections = {}
+    try:
+        for design in ('before', 'after'):
+            name = f"{etl.DB_CONFIG['database']}_bench_{design}"
+            print(f"   -> Building {name} ({rows:,} movement rows)...")
+            connections[design] = (name, build_database(name, data, design))
+        for label, sql in queries:
+            result = {}
+            for design, (_, conn) in connections.items():
+                cursor = conn.cursor()
+                try:
+                    plan = explain(cursor, sql)
+                    result[design] = {'seconds': round(time_query(cursor, sql, repeat), 6), **plan}
+                except Exception as e:
+                    result[design] = {'error': f"{type(e).__name__}: {e}"}
+            results[label] = result
+            _print_result(label, result)
+    finally:
+        for name, conn in connections.values():
+            if not keep:
+                conn.cursor().execute(f"DROP DATABASE IF EXISTS {name}")
+            conn.close()
+    return results
+
+def _print_result(label, result):
+    before, after = result['before'], result['after']
+    if 'error' in before or 'error' in after:
+        print(f"   ⚠️  {label:<28} {before.get('error') or after.get('error')}")
+        return
+    speedup = before['seconds'] / after['seconds'] if after['seconds'] else float('inf')
+    print(f"   {label:<28} {before['seconds'] * 1000:9.1f} ms -> {after['seconds'] * 1000:9.1f} ms "
+          f"({speedup:5.1f}x)  cost {before['cost']:,.0f} -> {after['cost']:,.0f}")
+    print(f"      before: {_plan_summary(before)}")
+    print(f"      after:  {_plan_summary(after)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN and time analysis/*.sql before and after the fact physical design")
+    parser.add_argument('--rows', default=','.join(map(str, DEFAULT_ROWS)),
+                        help="comma-separated fact_passenger_movements sizes (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per query, the fastest is kept (default: 3)")
+    parser.add_argument('--match', help="only queries whose SQL contains this text")
+    parser.add_argument('--keep', action='store_true', help="keep the scratch databases afterwards")
+    parser.add_argument('--out', default=OUT_FILE, help="JSON results file (default: %(default)s)")
+    args = parser.parse_args()
+
+    queries = [(label, sql) for label, sql in load_analysis_queries() if not args.match or args.match in sql]
+    results = {}
+    for n in (int(r) for r in args.rows.split(',')):
+        print(f"\n--- {len(queries)} analysis queries @ {n:,} rows ---")
+        for label, result in bench_queries(n, queries, args.repeat, args.keep).items():
+            results[f"{label}@{n}"] = result
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"\n💾 Results saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Named analysis queries with a result cache that lives until the next warehouse load.
+
+The dashboards run the same few queries over and over between loads, and their results only
+change when run_warehouse_transforms() succeeds. That bumps the warehouse load version
+(etl.load_version(), kept in the warehouse state file). Results are cached under
+query + parameters + load version, so a repeated query is answered without touching MySQL,
+and the first query after a load misses and fetches fresh rows.
+
+Query names are those of aggregates.BUSINESS_QUERIES (answered from the aggregate tables,
+with parameters) and every statement of analysis/*.sql as '<file>#<n>' (e.g.
+'business_queries#3'), see --list.
+
+The cache keeps pickled result sets in memory, least recently used first out past
+max_bytes, with an optional on-disk tier (folder) shared by every process on the machine.
+Entries of older load versions are dropped as soon as a newer version is seen.
+
+    python query_service.py --list | [--no-disk] name ...
+"""
+import argparse
+import glob
+import hashlib
+import os
+import pickle
+import re
+import shutil
+import threading
+from collections import OrderedDict
+
+import etl
+from aggregates import BUSINESS_QUERIES
+
+ANALYSIS_FOLDER = '../analysis'
+
+QUERY_CACHE_OPTIONS = {
+    'max_bytes': 256 * 1024 ** 2,       # memory tier
+    'folder': '../data/query_cache',    # disk tier (None: memory only)
+    'max_disk_bytes': 1024 ** 3
+}
+
+
+def load_analysis_queries(folder=ANALYSIS_FOLDER):
+    """[(label, sql)] for every statement in folder/*.sql; the label is the file and query number."""
+    queries = []
+    for path in sorted(glob.glob(os.path.join(folder, '*.sql'))):
+        with open(path, encoding='utf-8') as f:
+            statements = f.read().split(';')
+        number = 0
+        for statement in statements:
+            lines = statement.splitlines()
+            start = next((i for i, line in enumerate(lines) if re.match(r'\s*(SELECT|WITH)\b', line, re.I)), None)
+            if start is None:
+                continue
+            number += 1
+            sql = '\n'.join(line for line in lines[start:] if not line.strip().startswith('--'))
+            queries.append((f"{os.path.splitext(os.path.basename(path))[0]}#{number}", sql.strip()))
+    return queries
+
+def named_queries(folder=ANALYSIS_FOLDER):
+    """{name: {'sql', 'params'}} for the business queries and the analysis files."""
+    queries = {name: {'sql': query['aggregate'], 'params': tuple(query.get('params', ()))}
+               for name, query in BUSINESS_QUERIES.items()}
+    for label, sql in load_analysis_queries(folder):
+        queries[label] = {'sql': sql, 'params': ()}
+    return queries
+
+def _key(*parts):
+    return hashlib.sha256('\0'.join(str(p) for p in parts).encode()).hexdigest()[:32]
+
+
+class QueryResultCache:
+    """Result sets of one load version: a size-bounded LRU in memory, optionally backed by disk."""
+
+    def __init__(self, max_bytes, folder=None, max_disk_bytes=None):
+        self.max_bytes = max_bytes
+        self.folder = folder
+        self.max_disk_bytes = max_disk_bytes
+        self.version = None
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        self._memory = OrderedDict()  # key -> pickled result
+        self._memory_bytes = 0
+        self._lock = threading.RLock()
+
+    def _version_folder(self):
+        return os.path.join(self.folder, f'v{self.version}')
+
+    def set_version(self, version):
+        """Switches to a load version, forgetting the results of any other."""
+        with self._lock:
+            if version == self.version:
+                return
+            self.version = version
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self.folder:
+                os.makedirs(self._version_folder(), exist_ok=True)
+                for old in glob.glob(os.path.join(self.folder, 'v*')):
+                    if os.path.basename(old) != f'v{version}':
+                        shutil.rmtree(old, ignore_errors=True)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return pickle.loads(self._memory[key])
+            payload = self._read_disk(key)
+            if payload is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['disk_hits'] += 1
+            self._remember(key, payload)
+            return pickle.loads(payload)
+
+    def put(self, key, result):
+        payload = pickle.dumps(result, protocol=5)
+        with self._lock:
+            self._remember(key, payload)
+            self._write_disk(key, payload)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self.folder:
+                shutil.rmtree(self.folder, ignore_errors=True)
+            self.version = None
+
+    # --- Memory tier ---
+
+    def _remember(self, key, payload):
+        if len(payload) > self.max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = payload
+        self._memory_bytes += len(payload)
+        while self._memory_bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    # --- Disk tier ---
+
+    def _read_disk(self, key):
+        if not self.folder:
+            return None
+        path = os.path.join(self._version_folder(), f'{key}.pkl')
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+        except OSError:
+            return None
+        os.utime(path)  # LRU order on disk is the file mtime
+        return payload
+
+    def _write_disk(self, key, payload):
+        if not self.folder:
+            return
+        folder = self._version_folder()
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f'{key}.pkl')
+        with open(path + '.tmp', 'wb') as f:
+            f.write(payload)
+        os.replace(path + '.tmp', path)
+        if self.max_disk_bytes:
+            files = [os.path.join(folder, name) for name in os.listdir(folder) if name.endswith('.pkl')]
+            files.sort(key=os.path.getmtime)
+            total = sum(os.path.getsize(p) for p in files)
+            for old in files:
+                if total <= self.max_disk_bytes:
+                    break
+                total -= os.path.getsize(old)
+                os.remove(old)
+
+
+class QueryService:
+    """Runs named queries on the warehouse through a QueryResultCache keyed by load version."""
+
+    def __init__(self, cache=None, pool=None, version=etl.load_version, folder=ANALYSIS_FOLDER):
+        self.queries = named_queries(folder)
+        self.cache = cache or QueryResultCache(**QUERY_CACHE_OPTIONS)
+        self._pool = pool
+        self._version = version
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = etl._get_pool()
+        return self._pool
+
+    def run(self, name, params=None):
+        """(columns, rows) of a named query; params default to the query's own."""
+        query = self.queries[name]
+        params = tuple(params) if params is not None else query['params']
+        self.cache.set_version(self._version())
+        key = _key(name, query['sql'], repr(params), self.cache.version)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.pool.run(lambda conn: _execute(conn, query['sql'], params))
+            self.cache.put(key, result)
+        return result
+
+def _execute(conn, sql, params):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params or None)
+        return [col[0] for col in cursor.description], [tuple(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Named analysis queries, cached until the next warehouse load")
+    parser.add_argument('queries', nargs='*', help="query names (see --list)")
+    parser.add_argument('--list', action='store_true', help="list the query names and exit")
+    parser.add_argument('--no-disk', action='store_true', help="keep results in memory only")
+    args = parser.parse_args()
+
+    if args.no_disk:
+        QUERY_CACHE_OPTIONS['folder'] = None
+    service = QueryService()
+    if args.list or not args.queries:
+        for name, query in service.queries.items():
+            print(f"{name:<32} {' '.join(query['sql'].split())[:80]}")
+        return
+    try:
+        for name in args.queries:
+            columns, rows = service.run(name)
+            print(f"\n{name} ({len(rows)} rows, load version {service.cache.version})")
+            print('   ' + ' | '.join(columns))
+            for row in rows:
+                print('   ' + ' | '.join(str(v) for v in row))
+        print(f"\nCache: {service.cache.stats}")
+    finally:
+        etl.close_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Columnar snapshot of the star schema for BI tools (Parquet files instead of row-by-row pulls).
+
+Every table in EXPORT_TABLES is written under the export folder as
+    <table>/year=YYYY/part-00000.parquet ...   facts, one folder per date_key year
+    <table>/all/part-00000.parquet ...         dimensions
+Rows are streamed from the server on an unbuffered cursor (pymysql's SSCursor) and written
+chunk_size rows per part file, so memory stays at one chunk whatever the table size. Every part
+file of a table has the same Parquet schema, built from the MySQL column types (see
+parquet_schema()), so a partition with only NULLs in a column still reads together with the rest.
+
+Only partitions that changed are exported again. For each partition the server computes a
+row count and a checksum (sum of the CRC32 of each exported row). A partition is re-exported
+only when these differ from the ones in the manifest, when the table's schema changed, or when
+its files are missing. Partitions that no longer exist are removed. manifest.json records,
+per table and partition, the rows, the checksum, the schema and every file with its row count
+and SHA-256. A partition is written to a temporary folder and renamed into place, so readers
+never see half of one.
+
+Writing Parquet needs pyarrow.
+"""
+import hashlib
+import json
+import os
+import shutil
+from decimal import Decimal
+import pandas as pd
+import pymysql
+
+MANIFEST_FILE = 'manifest.json'
+
+# table -> exported columns (None: all of them) and whether it is split by date_key year.
+# The facts' auto-increment ids change on every refresh and are left out.
+EXPORT_TABLES = {
+    'dim_date': {'columns': None, 'by_year': False},
+    'dim_airport': {'columns': None, 'by_year': False},
+    'dim_country': {'columns': None, 'by_year': False},
+    'dim_metric': {'columns': None, 'by_year': False},
+    'dim_aircraft': {'columns': None, 'by_year': False},
+    'fact_passenger_movements': {'columns': ['date_key', 'airport_key', 'passengers', 'aircraft_movements'],
+                                 'by_year': True},
+    'fact_airline_financials': {'columns': ['date_key', 'metric_key', 'value', 'currency'], 'by_year': True},
+    'fact_world_transport_stats': {'columns': ['date_key', 'country_key', 'passengers'], 'by_year': True},
+}
+
+
+# MySQL integer types -> bits of the Parquet integer type
+INTEGER_BITS = {'tinyint': 8, 'smallint': 16, 'mediumint': 32, 'int': 32, 'integer': 32, 'bigint': 64}
+
+
+def check_parquet_engine():
+    """Raises ImportError unless pyarrow, which writes the part files, is installed."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from None
+    return 'pyarrow'
+
+def _table_columns(cursor, table):
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION
+    """, (table,))
+    return [row[0] for row in cursor.fetchall()]
+
+def _arrow_type(data_type, column_type, precision, scale):
+    """Parquet (pyarrow) type for a MySQL column; types without a closer match are exported as text."""
+    import pyarrow as pa
+    data_type = data_type.lower()
+    if data_type in INTEGER_BITS:
+        unsigned = 'unsigned' in (column_type or '').lower()
+        return getattr(pa, f"{'u' if unsigned else ''}int{INTEGER_BITS[data_type]}")()
+    if data_type == 'decimal':
+        decimal = pa.decimal128 if int(precision) <= 38 else pa.decimal256
+        return decimal(int(precision), int(scale))
+    if data_type == 'float':
+        return pa.float32()
+    if data_type in ('double', 'real'):
+        return pa.float64()
+    if data_type == 'date':
+        return pa.date32()
+    if data_type in ('datetime', 'timestamp'):
+        return pa.timestamp('us')
+    return pa.string()
+
+def parquet_schema(cursor, table, columns):
+    """One pyarrow schema for every part file of a table, from the MySQL types of its columns."""
+    import pyarrow as pa
+    cursor.execute("""
+        SELECT COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, NUMERIC_PRECISION, NUMERIC_SCALE
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    types = {row[0]: _arrow_type(*row[1:]) for row in cursor.fetchall()}
+    return pa.schema([pa.field(column, types.get(column, pa.string())) for column in columns])
+
+def _chunk_table(rows, schema):
+    """A fetched chunk as a pyarrow Table cast to the table's schema (whatever the chunk holds)."""
+    import pyarrow as pa
+    arrays = []
+    for field, values in zip(schema, zip(*rows)):
+        if pa.types.is_string(field.type):
+            values = [None if v is None else str(v) for v in values]
+        elif pa.types.is_decimal(field.type):
+            values = [v if v is None or isinstance(v, Decimal) else Decimal(str(v)) for v in values]
+        arrays.append(pa.array(values).cast(field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def _partition_label(by_year, year=None):
+    return f"year={year}" if by_year else 'all'
+
+def partition_checksums(cursor, table, columns, by_year):
+    """{partition label: (rows, checksum)} computed on the server."""
+    row_text = ', '.join(f"IFNULL(CAST({c} AS CHAR), '\\\\N')" for c in columns)
+    part = "date_key DIV 10000" if by_year else "0"
+    cursor.execute(f"""
+        SELECT {part} AS part, COUNT(*), SUM(CRC32(CONCAT_WS('|', {row_text})))
+        FROM {table} GROUP BY part
+    """)
+    return {_partition_label(by_year, int(p)): (int(rows), str(checksum))
+            for p, rows, checksum in cursor.fetchall()}
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_partition(conn, target, table, schema, where, params, chunk_size, compression):
+    """Streams one partition into part files in `target`; returns [{'file', 'rows', 'sha256'}]."""
+    import pyarrow.parquet as pq
+    tmp = target + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    files = []
+    cursor = conn.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute(f"SELECT {', '.join(schema.names)} FROM {table} WHERE {where}", params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            name = f"part-{len(files):05d}.parquet"
+            pq.write_table(_chunk_table(rows, schema), os.path.join(tmp, name), compression=compression)
+            files.append({'file': name, 'rows': len(rows), 'sha256': _sha256(os.path.join(tmp, name))})
+    finally:
+        cursor.close()
+    old = target + '.old'
+    if os.path.exists(target):
+        os.replace(target, old)
+    os.replace(tmp, target)
+    shutil.rmtree(old, ignore_errors=True)
+    return files
+
+def read_manifest(folder):
+    path = os.path.join(folder, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {'tables': {}}
+    with open(path) as f:
+        return json.load(f)
+
+def _write_manifest(folder, manifest):
+    path = os.path.join(folder, MANIFEST_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.replace(path + '.tmp', path)
+
+def _is_current(entry, rows, checksum, schema, folder):
+    return (entry and entry['rows'] == rows and entry['checksum'] == checksum and entry.get('schema') == schema
+            and all(os.path.exists(os.path.join(folder, f['file'])) for f in entry['files']))
+
+def export_table(conn, folder, table, spec, manifest, chunk_size, compression):
+    """Re-exports the changed partitions of one table; returns (exported, unchanged, removed) labels."""
+    cursor = conn.cursor()
+    columns = spec['columns'] or _table_columns(cursor, table)
+    current = partition_checksums(cursor, table, columns, spec['by_year'])
+    schema = parquet_schema(cursor, table, columns)
+    schema_text = schema.to_string(show_schema_metadata=False)
+    known = manifest['tables'].setdefault(table, {})
+    exported, unchanged = [], []
+    for label, (rows, checksum) in sorted(current.items()):
+        target = os.path.join(folder, table, label)
+        if _is_current(known.get(label), rows, checksum, schema_text, target):
+            unchanged.append(label)
+            continue
+        if spec['by_year']:
+            year = int(label.split('=')[1])
+            where, params = "date_key BETWEEN %s AND %s", (year * 10000 + 101, year * 10000 + 1231)
+        else:
+            where, params = "1 = 1", ()
+        files = _write_partition(conn, target, table, schema, where, params, chunk_size, compression)
+        known[label] = {'rows': rows, 'checksum': checksum, 'columns': columns, 'schema': schema_text,
+                        'files': files, 'exported_at': pd.Timestamp.now().isoformat(timespec='seconds')}
+        exported.append(label)
+    removed = sorted(set(known) - set(current))
+    for label in removed:
+        shutil.rmtree(os.path.join(folder, table, label), ignore_errors=True)
+        del known[label]
+    return exported, unchanged, removed
+
+def export_star_schema(pool, folder, tables=EXPORT_TABLES, chunk_size=100_000, compression='snappy', **info):
+    """
+    Exports the changed partitions of every table on one pooled connection and updates the
+    manifest (extra keyword arguments, e.g. the load version, are stored in it too).
+    Returns {table: {'exported', 'unchanged', 'removed'}}.
+    """
+    check_parquet_engine()
+    os.makedirs(folder, exist_ok=True)
+    manifest = read_manifest(folder)
+
+    def export(conn):
+        results = {}
+        for table, spec in tables.items():
+            exported, unchanged, removed = export_table(conn, folder, table, spec, manifest, chunk_size, compression)
+            results[table] = {'exported': exported, 'unchanged': len(unchanged), 'removed': removed}
+            manifest.update(info, exported_at=pd.Timestamp.now().isoformat(timespec='seconds'))
+            _write_manifest(folder, manifest)
+            print(f"   -> {table}: {len(exported)} partition(s) exported, {len(unchanged)} unchanged"
+                  + (f", {len(removed)} removed" if removed else "") + ".")
+        return results
+    return pool.run(export)
@@ -0,0 +1,150 @@
+"""
+On-disk cache of parsed source DataFrames, so unchanged workbooks are not re-parsed.
+
+Entries are pickled DataFrames (fast binary round trip, no extra dependency). Raw entries are
+keyed by file path + content hash; transformed entries by source name + the content hashes of
+all its files + a hash of the code of every module that takes part in cleaning, so any
+change to an input or to the cleaning logic produces a different key. File hashes are only recomputed when size or mtime change.
+The cache is bounded by total size and evicts least recently used entries first.
+It can be shared between threads (e.g. the stages of the pipelined mode).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import pandas as pd
+
+INDEX_FILE = 'index.json'
+
+
+def _sha256_file(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _key(*parts):
+    return hashlib.sha256('\0'.join(str(p) for p in parts).encode()).hexdigest()[:32]
+
+
+class SourceCache:
+    """Size-bounded LRU cache of raw and transformed source DataFrames."""
+
+    def __init__(self, folder, max_bytes, code_paths=()):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.code_version = _key(*[_sha256_file(p) for p in code_paths])[:16] if code_paths else ''
+        os.makedirs(folder, exist_ok=True)
+        self._index = self._read_index()
+        self._clean_keys = {}  # source name -> key, remembered between lookup and store
+        self._lock = threading.RLock()
+
+    # --- Index ---
+
+    def _read_index(self):
+        path = os.path.join(self.folder, INDEX_FILE)
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    return json.load(f)
+            except ValueError:
+                pass  # corrupt index: start again
+        return {'files': {}, 'entries': {}}
+
+    def _write_index(self):
+        path = os.path.join(self.folder, INDEX_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self._index, f, indent=1)
+        os.replace(path + '.tmp', path)
+
+    def file_hash(self, path):
+        """Content hash of a source file; reuses the stored hash while size and mtime are unchanged."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        known = self._index['files'].get(path)
+        if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            return known['sha256']
+        sha = _sha256_file(path)
+        self._index['files'][path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha}
+        return sha
+
+    # --- Entries ---
+
+    def _get(self, key):
+        entry = self._index['entries'].get(key)
+        if not entry:
+            return None
+        path = os.path.join(self.folder, entry['file'])
+        try:
+            df = pd.read_pickle(path)
+        except (OSError, ValueError, EOFError):
+            self._drop(key)
+            return None
+        entry['last_used'] = time.time()
+        return df
+
+    def _put(self, key, label, df):
+        # Older entries for the same file/source can never match again
+        for old_key in [k for k, e in self._index['entries'].items() if e['label'] == label and k != key]:
+            self._drop(old_key)
+        filename = f'{key}.pkl'
+        df.to_pickle(os.path.join(self.folder, filename), protocol=5)
+        self._index['entries'][key] = {
+            'label': label, 'file': filename, 'last_used': time.time(),
+            'bytes': os.path.getsize(os.path.join(self.folder, filename)),
+        }
+        self._evict()
+
+    def _drop(self, key):
+        entry = self._index['entries'].pop(key, None)
+        if entry:
+            try:
+                os.remove(os.path.join(self.folder, entry['file']))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        entries = self._index['entries']
+        total = sum(e['bytes'] for e in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            total -= entries[key]['bytes']
+            self._drop(key)
+
+    # --- Public API ---
+
+    def get_raw(self, path):
+        with self._lock:
+            return self._get(_key('raw', os.path.abspath(path), self.file_hash(path)))
+
+    def put_raw(self, path, df):
+        with self._lock:
+            self._put(_key('raw', os.path.abspath(path), self.file_hash(path)), f'raw:{os.path.abspath(path)}', df)
+
+    def get_transformed(self, name, paths):
+        """Looks up the cleaned DataFrame of a source made of the given files."""
+        with self._lock:
+            key = _key('clean', name, self.code_version, *[self.file_hash(p) for p in paths])
+            self._clean_keys[name] = key
+            return self._get(key)
+
+    def put_transformed(self, name, df):
+        """Stores a cleaned DataFrame; get_transformed(name, ...) must have been called this run."""
+        with self._lock:
+            if name in self._clean_keys:
+                self._put(self._clean_keys[name], f'clean:{name}', df)
+
+    def save(self):
+        """Writes the index (file hashes, LRU timestamps) back to disk."""
+        with self._lock:
+            self._write_index()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index['entries']):
+                self._drop(key)
+            self._index = {'files': {}, 'entries': {}}
+            self._write_index()
@@ -0,0 +1,122 @@
+"""
+Run state kept between ETL runs: the fingerprint and watermark store for incremental staging
+loads, plus small JSON state files (e.g. the warehouse fact watermark).
+
+Each staging table keeps one 64-bit fingerprint per business key: the wrapping sum of the
+content hashes of all rows sharing that key. Sums are order independent and additive, so
+fingerprints of chunks loaded one after another can simply be merged. A key whose fingerprint
+is unchanged since the last load does not need to be written again.
+"""
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+MANIFEST_FILE = 'staging_manifest.json'
+
+# Serializes read-modify-write of the JSON state files (staging tables may load concurrently)
+_state_lock = threading.Lock()
+
+
+def _normalized(df):
+    """Gives every column a stable representation so hashes don't depend on dtype details."""
+    out = {}
+    for col in df.columns:
+        if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
+            out[col] = df[col].astype('float64')
+        else:
+            out[col] = df[col].astype(object).replace({'': None, 'nan': None})
+    return pd.DataFrame(out, index=df.index)
+
+def row_key_hashes(df, key_columns):
+    """64-bit hash of each row's business key."""
+    return pd.util.hash_pandas_object(_normalized(df[key_columns]), index=False).to_numpy()
+
+def row_content_hashes(df):
+    """64-bit hash of each row's full content."""
+    return pd.util.hash_pandas_object(_normalized(df), index=False).to_numpy()
+
+def compute_fingerprints(df, key_columns):
+    """
+    Returns (row_keys, keys, fingerprints): the per-row key hashes, plus the distinct key
+    hashes with the combined content fingerprint of their rows.
+    """
+    row_keys = row_key_hashes(df, key_columns)
+    sums = pd.Series(row_content_hashes(df)).groupby(row_keys, sort=True).sum()  # uint64, wraps on overflow
+    return row_keys, sums.index.to_numpy(dtype=np.uint64), sums.to_numpy(dtype=np.uint64)
+
+def diff_fingerprints(keys, fingerprints, stored_keys, stored_fingerprints):
+    """Returns (new_keys, changed_keys) relative to the stored fingerprints."""
+    known = np.isin(keys, stored_keys)
+    stored = pd.Series(stored_fingerprints, index=stored_keys)
+    changed = known.copy()
+    changed[known] = stored.reindex(keys[known]).to_numpy(dtype=np.uint64) != fingerprints[known]
+    return keys[~known], keys[changed]
+
+def merge_fingerprints(stored_keys, stored_fingerprints, keys, fingerprints, replace=True):
+    """
+    Combines stored fingerprints with new ones. replace=True overwrites the stored value of a
+    key (incremental upsert); replace=False adds to it (another chunk of the same load).
+    """
+    combined = pd.concat([pd.Series(stored_fingerprints, index=stored_keys),
+                          pd.Series(fingerprints, index=keys)])
+    if replace:
+        combined = combined[~combined.index.duplicated(keep='last')]
+    else:
+        combined = combined.groupby(level=0).sum()
+    combined = combined.sort_index()
+    return combined.index.to_numpy(dtype=np.uint64), combined.to_numpy(dtype=np.uint64)
+
+
+# --- Persistence ---
+
+def _fingerprint_path(state_folder, table):
+    return os.path.join(state_folder, f'{table}.fingerprints.npz')
+
+def load_state(state_folder, table):
+    """Returns (keys, fingerprints, manifest_entry) for a table, or None if nothing is stored yet."""
+    path = _fingerprint_path(state_folder, table)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        keys, fingerprints = data['keys'], data['fingerprints']
+    return keys, fingerprints, read_manifest(state_folder).get(table, {})
+
+def save_state(state_folder, table, keys, fingerprints, **manifest_entry):
+    """Persists a table's fingerprints and updates its manifest entry (watermark, counts, ...)."""
+    os.makedirs(state_folder, exist_ok=True)
+    path = _fingerprint_path(state_folder, table)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, keys=keys, fingerprints=fingerprints)
+    os.replace(tmp_path, path)
+
+    with _state_lock:
+        manifest = read_manifest(state_folder)
+        manifest[table] = dict(manifest.get(table, {}), keys=int(len(keys)), **manifest_entry)
+        _write_json(os.path.join(state_folder, MANIFEST_FILE), manifest)
+
+def read_manifest(state_folder):
+    return read_state(state_folder, MANIFEST_FILE)
+
+def read_state(state_folder, filename):
+    """Reads a JSON state file from the state folder ({} if it does not exist yet)."""
+    path = os.path.join(state_folder, filename)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def write_state(state_folder, filename, **values):
+    """Updates keys of a JSON state file in the state folder."""
+    os.makedirs(state_folder, exist_ok=True)
+    with _state_lock:
+        state = read_state(state_folder, filename)
+        state.update(values)
+        _write_json(os.path.join(state_folder, filename), state)
+
+def _write_json(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp_path, path)
@@ -0,0 +1,16 @@
+"""
+Shared setup for the tests: the ETL modules live in src/ and use paths relative to it
+(e.g. '../data/state'), the same as when etl.py is run from there.
+"""
+import os
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC)
+
+
+@pytest.fixture(autouse=True)
+def _run_from_src(monkeypatch):
+    monkeypatch.chdir(SRC)
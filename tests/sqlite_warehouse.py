@@ -0,0 +1,166 @@
+"""
+A small SQLite stand-in for the MySQL warehouse, for tests that run SQL without a server.
+
+The schema mirrors the columns and MySQL types of ddl/02 - ddl/04 and stg_caa_movements, and
+an attached information_schema.COLUMNS describes them. Connection and cursor wrap sqlite3 with
+the pymysql calls the ETL uses, and translate the few bits of MySQL syntax it relies on (%s
+placeholders, TRUNCATE TABLE, DIV, CRC32, CONCAT_WS, DATABASE(), NOW()).
+"""
+import random
+import re
+import sqlite3
+import zlib
+from datetime import datetime
+
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE stg_caa_movements (movement_id INTEGER PRIMARY KEY, date_key INT, airport_iata VARCHAR(10),
+                                passengers BIGINT, aircraft_movements INT, country VARCHAR(100),
+                                load_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE dim_date (date_key INT PRIMARY KEY, full_date DATE, year INT, quarter INT, month INT,
+                       month_name VARCHAR(20), day INT, day_of_week INT, is_weekend TINYINT(1));
+CREATE TABLE dim_airport (airport_key INTEGER PRIMARY KEY, iata_code VARCHAR(10) UNIQUE, airport_name VARCHAR(255),
+                          city VARCHAR(100), country VARCHAR(100));
+CREATE TABLE dim_country (country_key INTEGER PRIMARY KEY, country_code VARCHAR(10) UNIQUE,
+                          country_name VARCHAR(255) UNIQUE);
+CREATE TABLE dim_metric (metric_key INTEGER PRIMARY KEY, metric_name VARCHAR(255) UNIQUE, metric_category VARCHAR(100));
+CREATE TABLE dim_aircraft (aircraft_key INTEGER PRIMARY KEY, aircraft_model VARCHAR(100) UNIQUE,
+                           manufacturer VARCHAR(100), seat_capacity INT, engine_type VARCHAR(50));
+CREATE TABLE fact_passenger_movements (movement_id INTEGER PRIMARY KEY, date_key INT, airport_key INT,
+                                       passengers BIGINT, aircraft_movements INT);
+CREATE TABLE fact_world_transport_stats (stat_id INTEGER PRIMARY KEY, date_key INT, country_key INT, passengers BIGINT);
+CREATE TABLE fact_airline_financials (financial_id INTEGER PRIMARY KEY, date_key INT, metric_key INT,
+                                      value DECIMAL(20, 2), currency VARCHAR(10));
+CREATE TABLE agg_passengers_airport_month (agg_id INTEGER PRIMARY KEY, month_key INT, year INT, quarter INT,
+                                           month INT, month_name VARCHAR(20), airport_key INT, is_weekend TINYINT(1),
+                                           passengers BIGINT, aircraft_movements BIGINT, flown_passengers BIGINT,
+                                           flown_movements BIGINT, flown_rows INT, fact_rows INT);
+CREATE TABLE agg_passengers_year_quarter (year INT, quarter INT, passengers BIGINT, aircraft_movements BIGINT,
+                                          fact_rows INT, PRIMARY KEY (year, quarter));
+CREATE TABLE agg_world_passengers_country_year (year INT, country_key INT, passengers BIGINT, fact_rows INT,
+                                                PRIMARY KEY (year, country_key));
+"""
+
+AIRPORTS = ['CMB', 'HRI', 'JAF', 'BTC', 'RML']
+COUNTRIES = ['Sri Lanka', 'India', 'Maldives', 'Bangladesh', 'Nepal', 'Bhutan', 'Pakistan', 'Japan']
+METRICS = ['Revenue', 'Operating Loss', 'Passengers']
+
+
+def _mysql_to_sqlite(sql):
+    sql = re.sub(r'TRUNCATE TABLE (\w+)', r'DELETE FROM \1', sql)
+    sql = sql.replace(' DIV ', ' / ').replace('<=>', 'IS').replace('%s', '?')
+    return sql
+
+
+class Cursor:
+    def __init__(self, connection):
+        self._cursor = connection.cursor()
+
+    def execute(self, sql, params=None):
+        self._cursor.execute(_mysql_to_sqlite(sql), tuple(params or ()))
+        return self._cursor.rowcount
+
+    def executemany(self, sql, rows):
+        self._cursor.executemany(_mysql_to_sqlite(sql), [tuple(row) for row in rows])
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class Connection:
+    def __init__(self):
+        self.db = sqlite3.connect(':memory:')
+        self.db.create_function('CRC32', 1, lambda text: zlib.crc32(str(text).encode()))
+        self.db.create_function('CONCAT_WS', -1, lambda sep, *parts: sep.join(str(p) for p in parts if p is not None))
+        self.db.create_function('DATABASE', 0, lambda: 'main')
+        self.db.create_function('NOW', 0, lambda: datetime.now().isoformat(sep=' ', timespec='seconds'))
+        self.db.executescript(SCHEMA)
+        self._describe_columns()
+
+    def _describe_columns(self):
+        self.db.execute("ATTACH DATABASE ':memory:' AS information_schema")
+        self.db.execute("CREATE TABLE information_schema.COLUMNS (TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, "
+                        "ORDINAL_POSITION, DATA_TYPE, COLUMN_TYPE, NUMERIC_PRECISION, NUMERIC_SCALE)")
+        tables = [row[0] for row in self.db.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'")]
+        for table in tables:
+            for position, name, declared, *_ in self.db.execute(f"PRAGMA main.table_info({table})"):
+                match = re.fullmatch(r'(\w+)(?:\((\d+)(?:,\s*(\d+))?\))?', declared)
+                data_type, precision, scale = match.group(1).lower(), match.group(2), match.group(3)
+                self.db.execute("INSERT INTO information_schema.COLUMNS VALUES (?,?,?,?,?,?,?,?)",
+                                ('main', table, name, position + 1, data_type, declared.lower(), precision, scale))
+
+    def cursor(self, *args):
+        return Cursor(self.db)
+
+    def commit(self):
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+    def close(self):
+        self.db.close()
+
+    def rows(self, sql):
+        return self.db.execute(sql).fetchall()
+
+
+class Pool:
+    """db_pool.ConnectionPool.run() on the one SQLite connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def run(self, fn):
+        return fn(self.conn)
+
+
+def synthetic_warehouse(seed=1, movements=5000, years=(2017, 2024)):
+    """Connection to a warehouse with dimensions and facts (no aggregates yet) from a seeded RNG."""
+    rng = random.Random(seed)
+    conn = Connection()
+    db = conn.db
+    days = pd.date_range(f'{years[0]}-01-01', f'{years[1]}-12-31')
+    db.executemany("INSERT INTO dim_date VALUES (?,?,?,?,?,?,?,?,?)", [
+        (int(d.strftime('%Y%m%d')), d.strftime('%Y-%m-%d'), d.year, d.quarter, d.month, d.month_name(),
+         d.day, d.dayofweek + 1, int(d.dayofweek >= 5)) for d in days])
+    db.executemany("INSERT INTO dim_airport VALUES (?,?,?,?,?)",
+                   [(i + 1, code, f'{code} Airport', code, 'Sri Lanka') for i, code in enumerate(AIRPORTS)])
+    db.executemany("INSERT INTO dim_country VALUES (?,?,?)",
+                   [(i + 1, name[:3].upper(), name) for i, name in enumerate(COUNTRIES)])
+    db.executemany("INSERT INTO dim_metric VALUES (?,?,?)", [(i + 1, m, 'Financial') for i, m in enumerate(METRICS)])
+
+    date_keys = [int(d.strftime('%Y%m%d')) for d in days]
+    busy = list(range(1, len(AIRPORTS)))  # the last airport only gets a few rows: a low-traffic airport
+    rows = [(rng.choice(date_keys), rng.choice(busy), rng.randint(0, 5000), rng.choice([0, rng.randint(1, 60)]))
+            for _ in range(movements)]
+    rows += [(rng.choice(date_keys), len(AIRPORTS), rng.randint(0, 500), rng.randint(0, 5)) for _ in range(40)]
+    db.executemany("INSERT INTO fact_passenger_movements (date_key, airport_key, passengers, aircraft_movements) "
+                   "VALUES (?,?,?,?)", rows)
+    db.executemany("INSERT INTO fact_world_transport_stats (date_key, country_key, passengers) VALUES (?,?,?)", [
+        (year * 10000 + 101, key, rng.randint(1000, 10 ** 7))
+        for year in range(years[0], years[1] + 1) for key in range(1, len(COUNTRIES) + 1)
+        if not (year == 2019 and key == 5)])  # Nepal has 2018 but no 2019
+    db.executemany("INSERT INTO fact_airline_financials (date_key, metric_key, value, currency) VALUES (?,?,?,?)", [
+        (year * 10000 + 101, key, float(rng.randint(10, 10 ** 6)), 'LKR')
+        for year in range(years[0], years[1] + 1) for key in range(1, len(METRICS) + 1)])
+    db.commit()
+    return conn
@@ -0,0 +1,82 @@
+"""Business queries answered from the aggregate tables give the same results as from the facts."""
+import pytest
+
+import aggregates
+from aggregates import AGGREGATES, BUSINESS_QUERIES, _comparable, refresh_aggregate, run_query
+from sqlite_warehouse import synthetic_warehouse
+
+
+def _refresh_all(conn, date_keys=None):
+    cursor = conn.cursor()
+    for table, spec in AGGREGATES.items():
+        refresh_aggregate(conn, cursor, table, spec, date_keys)
+    return cursor
+
+
+def _both(cursor, name):
+    _, from_aggregates = run_query(cursor, name)
+    _, from_facts = run_query(cursor, name, source='facts')
+    return from_aggregates, from_facts
+
+
+def _aggregate_rows(conn):
+    """Sorted rows of every aggregate table, without agg_id (a rebuild renumbers it)."""
+    rows = {}
+    for table in AGGREGATES:
+        table_rows = conn.rows(f"SELECT * FROM {table}")
+        if table == 'agg_passengers_airport_month':
+            table_rows = [row[1:] for row in table_rows]
+        rows[table] = sorted(table_rows, key=repr)
+    return rows
+
+
+@pytest.fixture(scope='module')
+def warehouse():
+    conn = synthetic_warehouse()
+    _refresh_all(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize('name', list(BUSINESS_QUERIES))
+def test_aggregate_matches_facts(warehouse, name):
+    from_aggregates, from_facts = _both(warehouse.cursor(), name)
+    assert from_facts, f"{name} returns no rows on the test data"
+    assert _comparable(from_aggregates) == _comparable(from_facts)
+
+
+def test_verify_reports_every_query(warehouse):
+    assert aggregates.verify(warehouse.cursor()) == {name: True for name in BUSINESS_QUERIES}
+
+
+def test_merge_refresh_matches_full_rebuild():
+    conn = synthetic_warehouse(seed=2)
+    _refresh_all(conn)
+    conn.db.execute("UPDATE fact_passenger_movements SET passengers = passengers + 7 "
+                    "WHERE date_key BETWEEN 20210301 AND 20210331")
+    conn.db.execute("DELETE FROM fact_passenger_movements WHERE date_key BETWEEN 20230601 AND 20230630")
+    conn.db.execute("UPDATE fact_world_transport_stats SET passengers = 5 WHERE date_key = 20220101")
+    conn.commit()
+
+    cursor = _refresh_all(conn, [20210315, 20230601, 20220101])
+    assert all(aggregates.verify(cursor).values())
+    merged = _aggregate_rows(conn)
+    _refresh_all(conn)
+    rebuilt = _aggregate_rows(conn)
+    assert merged == rebuilt
+
+
+def test_top_n_ties_resolve_the_same_way():
+    conn = synthetic_warehouse(movements=0)
+    # Two quarters and several countries with exactly the same passenger totals
+    conn.db.execute("DELETE FROM fact_passenger_movements")
+    conn.db.executemany("INSERT INTO fact_passenger_movements (date_key, airport_key, passengers, aircraft_movements) "
+                        "VALUES (?, 1, 1000, 10)", [(20220815,), (20210210,), (20220105,), (20210720,)])
+    conn.db.execute("UPDATE fact_world_transport_stats SET passengers = 500 WHERE date_key = 20240101")
+    conn.commit()
+    cursor = _refresh_all(conn)
+
+    for name in ('busiest_quarter', 'busiest_months', 'world_top_countries_latest_year'):
+        from_aggregates, from_facts = _both(cursor, name)
+        assert from_aggregates == from_facts, name
+    assert _both(cursor, 'busiest_quarter')[0] == [(2021, 1, 1000)]
@@ -0,0 +1,55 @@
+"""The bulk load strategies send the same values, and the same NULLs, to the database."""
+import csv
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bulk_load import BULK_STRATEGIES, bulk_insert, rows_for_db
+
+COLUMNS = ['code', 'name', 'passengers']
+
+
+class RecordingCursor:
+    """Collects the rows each strategy would insert; LOAD DATA reads back the CSV it was given."""
+
+    def __init__(self):
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        if sql.startswith('LOAD DATA'):
+            with open(params[0], newline='', encoding='utf-8') as f:
+                for row in csv.reader(f):
+                    self.rows.append(tuple(None if v == '\\N' else v for v in row))
+        else:
+            width = len(COLUMNS)
+            self.rows += [tuple(params[i:i + width]) for i in range(0, len(params), width)]
+
+    def executemany(self, sql, rows):
+        self.rows += [tuple(row) for row in rows]
+
+
+def _frame(compact):
+    df = pd.DataFrame({
+        'code': ['CMB', '', 'nan', None, 'HRI'],
+        'name': ['Colombo', 'x', '', 'nan', np.nan],
+        'passengers': pd.array([1, 2, None, 4, 5], dtype='Int64'),
+    })
+    if compact:
+        df = df.astype({'code': 'category', 'name': 'category'})
+    return df
+
+
+def _nulls(rows):
+    return [tuple(v is None for v in row) for row in rows]
+
+
+@pytest.mark.parametrize('compact', [False, True], ids=['object', 'categorical'])
+@pytest.mark.parametrize('strategy', sorted(BULK_STRATEGIES))
+def test_strategies_agree_on_nulls(strategy, compact):
+    cursor = RecordingCursor()
+    sent = bulk_insert(cursor, 'stg_test', COLUMNS, _frame(compact), strategy, batch_size=2)
+
+    assert sent == 5
+    assert _nulls(cursor.rows) == _nulls(rows_for_db(_frame(False)))
+    assert [row[0] for row in cursor.rows] == ['CMB', None, None, None, 'HRI']
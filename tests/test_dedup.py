@@ -0,0 +1,131 @@
+"""Business-key deduplication of staging batches and its cross-run index."""
+import pandas as pd
+import pytest
+
+import etl
+from dedup import DedupIndex, deduplicate
+from sqlite_warehouse import Connection
+from staging_state import compute_fingerprints, load_state
+
+CAA_KEY = ['date_key', 'airport_iata']
+
+
+def _movements(passengers, airports=None):
+    return pd.DataFrame({'date_key': [20230101] * len(passengers),
+                         'airport_iata': airports or ['CMB'] * len(passengers),
+                         'passengers': passengers, 'aircraft_movements': [10] * len(passengers),
+                         'country': ['Sri Lanka'] * len(passengers)})
+
+
+def test_exact_copies_are_dropped_whatever_the_row_order():
+    df = pd.DataFrame({'date_key': [20230101, 20230101, 20230201, 20230101, 20230201],
+                       'airport': ['CMB', 'CMB', 'CMB', 'HRI', 'CMB'],
+                       'passengers': [100, 100, 300, 50, 300]})
+    for seed in range(5):
+        shuffled = df.sample(frac=1, random_state=seed)
+        kept, report, conflicts, _ = deduplicate(shuffled, ['date_key', 'airport'])
+
+        assert sorted(kept['passengers']) == [50, 100, 300]
+        assert report['within_batch'] == 2 and report['conflicting'] == 0 and conflicts.empty
+
+
+def test_conflicting_rows_fail_with_the_same_keys_whatever_the_row_order():
+    df = _movements([2345, 2845, 12345, 12345, 70], ['CMB', 'CMB', 'CMB', 'CMB', 'HRI'])
+    messages = set()
+    for seed in range(5):
+        with pytest.raises(ValueError, match='conflicting values') as error:
+            deduplicate(df.sample(frac=1, random_state=seed), CAA_KEY)
+        messages.add(str(error.value))
+
+    assert messages == {"1 business key(s) have rows with conflicting values: date_key=20230101, airport_iata=CMB"}
+
+
+def test_last_row_of_a_key_wins_a_conflict():
+    df = pd.DataFrame({'date_key': [20230101, 20230101, 20230101, 20230201],
+                       'airport': ['CMB', 'CMB', 'CMB', 'CMB'],
+                       'passengers': [250, 100, 100, 300]})
+    kept, report, conflicts, _ = deduplicate(df, ['date_key', 'airport'], on_conflict='last')
+
+    assert kept['passengers'].tolist() == [100, 300]
+    assert report == {'within_batch': 2, 'earlier_batches': 0, 'conflicting': 1, 'replaced': 0,
+                      'earlier_runs_kept': 0}
+    assert conflicts['passengers'].tolist() == [100]  # the row that won
+
+
+def test_rows_without_a_full_key_only_lose_exact_copies():
+    df = pd.DataFrame({'code': [None, None, None, ''], 'value': [1, 1, 2, 1]})
+    kept, report, conflicts, _ = deduplicate(df, ['code'])
+
+    assert kept['value'].tolist() == [1, 2]  # '' is stored as NULL too, so ('', 1) copies (None, 1)
+    assert report['within_batch'] == 2 and report['conflicting'] == 0 and conflicts.empty
+
+
+def test_index_drops_copies_from_earlier_batches_and_keeps_keys_of_earlier_runs(tmp_path):
+    path = str(tmp_path / 'stg_test.dedup.npz')
+    index = DedupIndex(path)
+    index.begin_run()
+    deduplicate(pd.DataFrame({'k': ['a', 'b'], 'v': [1, 2]}), ['k'], index)
+    with pytest.raises(ValueError, match='k=b'):
+        deduplicate(pd.DataFrame({'k': ['b', 'c'], 'v': [9, 3]}), ['k'], index)
+    assert len(index.keys) == 2  # a failed batch records nothing
+
+    kept, report, _, replaced = deduplicate(pd.DataFrame({'k': ['b', 'c'], 'v': [9, 3]}), ['k'], index,
+                                            on_conflict='last')
+    assert kept['k'].tolist() == ['b', 'c'] and replaced['k'].tolist() == ['b']
+    assert report == {'within_batch': 0, 'earlier_batches': 0, 'conflicting': 1, 'replaced': 1,
+                      'earlier_runs_kept': 0}
+    kept, report, _, _ = deduplicate(pd.DataFrame({'k': ['b', 'c'], 'v': [9, 3]}), ['k'], index)
+    assert kept.empty and report['earlier_batches'] == 2
+    index.save()
+
+    index = DedupIndex(path)
+    index.begin_run()
+    kept, report, _, _ = deduplicate(pd.DataFrame({'k': ['a', 'd', 'd'], 'v': [5, 4, 4]}), ['k'], index)
+    assert kept['k'].tolist() == ['a', 'd']
+    assert report == {'within_batch': 1, 'earlier_batches': 0, 'conflicting': 0, 'replaced': 0,
+                      'earlier_runs_kept': 1}
+    assert index.run == 2 and len(index.keys) == 4
+
+
+@pytest.fixture
+def staging(tmp_path, monkeypatch):
+    """An empty stg_caa_movements on the SQLite stand-in, with its own state folder."""
+    monkeypatch.setattr(etl, 'STATE_FOLDER', str(tmp_path / 'state'))
+    monkeypatch.setattr(etl, '_DEDUP_INDEXES', {})
+    conn = Connection()
+    yield conn
+    conn.close()
+
+
+def _load_batches(conn, batches):
+    cursor = conn.cursor()
+    for i, batch in enumerate(batches):
+        etl._load_stg_caa_movements(conn, cursor, batch, truncate=(i == 0))
+    return sorted(conn.rows("SELECT airport_iata, passengers FROM stg_caa_movements"))
+
+
+@pytest.mark.parametrize('incremental', [False, True], ids=['full', 'incremental'])
+def test_staged_rows_do_not_depend_on_the_order_of_the_rows(staging, monkeypatch, incremental):
+    monkeypatch.setitem(etl.BULK_LOAD_OPTIONS, 'incremental', incremental)
+    rows = _movements([1, 1, 2, 5], ['CMB', 'CMB', 'HRI', 'JAF'])
+    _load_batches(staging, [rows])
+
+    assert _load_batches(staging, [rows.iloc[::-1]]) == [('CMB', 1), ('HRI', 2), ('JAF', 5)]
+    with pytest.raises(ValueError, match='airport_iata=CMB'):
+        _load_batches(staging, [_movements([2, 1], ['CMB', 'CMB'])])
+    with pytest.raises(ValueError, match='airport_iata=CMB'):
+        _load_batches(staging, [_movements([1, 2], ['CMB', 'CMB'])])
+    assert _load_batches(staging, [rows.sample(frac=1, random_state=1)]) == [('CMB', 1), ('HRI', 2), ('JAF', 5)]
+
+
+def test_a_later_batch_replaces_an_earlier_one_when_the_last_row_wins(staging, monkeypatch):
+    monkeypatch.setitem(etl.BULK_LOAD_OPTIONS, 'key_conflicts', 'last')
+    january = _movements([100, 7], ['CMB', 'HRI'])
+    correction = _movements([120, 7], ['CMB', 'HRI'])
+
+    assert _load_batches(staging, [january, correction]) == [('CMB', 120), ('HRI', 7)]
+    stored_keys, stored_fingerprints, _ = load_state(etl.STATE_FOLDER, 'stg_caa_movements')
+    _, keys, fingerprints = compute_fingerprints(correction, CAA_KEY)
+    assert stored_keys.tolist() == keys.tolist() and stored_fingerprints.tolist() == fingerprints.tolist()
+
+    assert _load_batches(staging, [correction, january]) == [('CMB', 100), ('HRI', 7)]
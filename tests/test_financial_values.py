@@ -0,0 +1,50 @@
+"""The vectorized financial value parser against the row-wise reference version."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import etl
+
+EDGE_CASES = [
+    '', ' ', 'nan', 'NaN', 'None', 'N/A', '—', '-', '()',
+    '1,234', '1,234,567.89', ' 42 ', '0', '0.0', '1e6', '1_000',
+    'USD 1,200', 'USD1200.50', 'Rs. 5,000', 'Rs.5000', 'LKR 3,400', 'usd 99', 'Rs. USD 10',
+    '-250', '(250)', '(1,234.5)', 'USD (75)', '(USD 75)', '(Rs. 1,000)', '-(5)',
+    'abc', '12abc', '1.2.3', '--5', np.nan, None, 3.5, 7,
+]
+
+
+def _rowwise(values):
+    parsed = [etl._clean_financial_value(v) for v in values]
+    return (pd.Series([p[0] for p in parsed], index=values.index, dtype='Float64'),
+            pd.Series([p[1] for p in parsed], index=values.index, dtype=object))
+
+
+@pytest.mark.parametrize('value', EDGE_CASES, ids=repr)
+def test_matches_rowwise_parser(value):
+    values = pd.Series([value], dtype=object)
+    expected_value, expected_currency = _rowwise(values)
+    value_out, currency_out = etl._parse_financial_values(values)
+
+    pd.testing.assert_series_equal(value_out.astype('Float64'), expected_value)
+    assert currency_out.astype(object).where(currency_out.notna(), None).tolist() == \
+        expected_currency.where(expected_currency.notna(), None).tolist()
+
+
+def test_matches_rowwise_parser_on_a_mixed_column():
+    values = pd.Series(EDGE_CASES * 3, index=range(100, 100 + 3 * len(EDGE_CASES)), dtype=object)
+    expected_value, expected_currency = _rowwise(values)
+    value_out, currency_out = etl._parse_financial_values(values)
+
+    assert value_out.index.equals(values.index)
+    pd.testing.assert_series_equal(value_out.astype('Float64'), expected_value)
+    pd.testing.assert_series_equal(currency_out.astype(object).where(currency_out.notna(), None),
+                                   expected_currency.where(expected_currency.notna(), None))
+
+
+def test_examples():
+    values = pd.Series(['USD 1,200', '(Rs. 1,000)', 'nan', ''])
+    value_out, currency_out = etl._parse_financial_values(values)
+    assert value_out.tolist()[:2] == [1200.0, -1000.0]
+    assert value_out[2:].isna().all()
+    assert currency_out.tolist()[:2] == ['USD', 'LKR']
@@ -0,0 +1,138 @@
+"""
+Year-partition maintenance against a recorded cursor that plays information_schema.PARTITIONS.
+These check the statements sent, not MySQL's handling of them (no server in the tests).
+"""
+import re
+
+import pytest
+
+import etl
+from partitions import add_year_partitions, drop_years_before, swap_partition, year_partitions
+
+
+class PartitionedTableCursor:
+    """
+    Answers partition and AUTO_INCREMENT column lookups from a list of (name, bound) and the
+    table's `id` column (highest id: max_id), and records every other statement.
+    """
+
+    def __init__(self, first_year=2015, last_year=2025, staged_years=(), fact_years=(), max_id=1000):
+        self.partitions = [('p_history', str(first_year * 10000 + 101))]
+        self.partitions += [(f'p{y}', str((y + 1) * 10000 + 101)) for y in range(first_year, last_year + 1)]
+        self.partitions += [('pmax', 'MAXVALUE')]
+        self.staged_years, self.fact_years, self.max_id = staged_years, fact_years, max_id
+        self.statements = []
+        self.rowcount = 0
+        self._result = []
+
+    def execute(self, sql, params=()):
+        sql = ' '.join(sql.split())
+        self._result = []
+        if 'information_schema.PARTITIONS' in sql:
+            self._result = list(self.partitions)
+            return
+        if 'information_schema.COLUMNS' in sql:
+            self._result = [('id',)]
+            return
+        self.statements.append(sql)
+        self.rowcount = 3
+        if 'REORGANIZE PARTITION pmax' in sql:
+            years = [int(y) for y in re.findall(r'PARTITION p(\d{4}) ', sql)]
+            self.partitions[-1:] = [(f'p{y}', str((y + 1) * 10000 + 101)) for y in years] + [('pmax', 'MAXVALUE')]
+        elif 'SELECT DISTINCT' in sql and ' FROM stg_' in sql:
+            self._result = [(y,) for y in self.staged_years]
+        elif 'SELECT DISTINCT date_key DIV 10000' in sql:
+            self._result = [(y,) for y in self.fact_years]
+        elif 'SELECT DISTINCT date_key FROM' in sql:
+            self._result = [(20130505,), (20140101,)]
+        elif 'SELECT COALESCE(MAX(id), 0) + 1' in sql:
+            self._result = [(self.max_id + 1,)]
+
+    def fetchall(self):
+        return self._result
+
+
+class Conn:
+    def __init__(self):
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_year_partitions_only_lists_single_year_partitions():
+    cursor = PartitionedTableCursor(2015, 2017)
+    assert year_partitions(cursor, 'fact_passenger_movements') == {2015: 'p2015', 2016: 'p2016', 2017: 'p2017'}
+
+
+def test_add_year_partitions_splits_pmax_up_to_the_new_year():
+    cursor = PartitionedTableCursor(2015, 2025)
+    assert add_year_partitions(cursor, 'fact_passenger_movements', [2019, 2027]) == [2026, 2027]
+    assert cursor.statements == [
+        "ALTER TABLE fact_passenger_movements REORGANIZE PARTITION pmax INTO "
+        "(PARTITION p2026 VALUES LESS THAN (20270101), PARTITION p2027 VALUES LESS THAN (20280101), "
+        "PARTITION pmax VALUES LESS THAN MAXVALUE)"]
+    assert add_year_partitions(cursor, 'fact_passenger_movements', [2027]) == []
+
+
+def test_swap_partition_fills_a_copy_and_exchanges_it():
+    cursor, conn = PartitionedTableCursor(), Conn()
+    filled = []
+    def fill(cur, table):
+        filled.append(table)
+        cursor.max_id += 42
+        return 42
+    inserted = swap_partition(conn, cursor, 'fact_world_transport_stats', 'p2020', fill)
+    swap = 'fact_world_transport_stats_swap_p2020'
+    assert inserted == 42 and filled == [swap] and conn.commits == 1
+    assert cursor.statements == [
+        f"DROP TABLE IF EXISTS {swap}",
+        f"CREATE TABLE {swap} LIKE fact_world_transport_stats",
+        f"ALTER TABLE {swap} REMOVE PARTITIONING",
+        "SELECT COALESCE(MAX(id), 0) + 1 FROM fact_world_transport_stats",
+        f"ALTER TABLE {swap} AUTO_INCREMENT = 1001",   # ids continue after the other partitions' rows
+        f"ALTER TABLE fact_world_transport_stats EXCHANGE PARTITION p2020 WITH TABLE {swap}",
+        "SELECT COALESCE(MAX(id), 0) + 1 FROM fact_world_transport_stats",
+        "ALTER TABLE fact_world_transport_stats AUTO_INCREMENT = 1043",
+        f"DROP TABLE IF EXISTS {swap}",
+    ]
+
+
+def test_swap_partition_drops_the_copy_when_the_fill_fails():
+    cursor = PartitionedTableCursor()
+
+    def fail(cur, table):
+        raise RuntimeError('insert failed')
+    with pytest.raises(RuntimeError):
+        swap_partition(Conn(), cursor, 'fact_world_transport_stats', 'p2020', fail)
+    assert not any('EXCHANGE' in s for s in cursor.statements)
+    assert cursor.statements[-1] == "DROP TABLE IF EXISTS fact_world_transport_stats_swap_p2020"
+
+
+def test_drop_years_before_truncates_and_folds_old_partitions():
+    cursor = PartitionedTableCursor(2015, 2025)
+    removed = drop_years_before(cursor, 'fact_passenger_movements', 2017)
+    assert removed == [20130505, 20140101]
+    assert cursor.statements[1:] == [
+        "ALTER TABLE fact_passenger_movements TRUNCATE PARTITION p_history, p2015, p2016",
+        "ALTER TABLE fact_passenger_movements REORGANIZE PARTITION p_history, p2015, p2016 INTO "
+        "(PARTITION p_history VALUES LESS THAN (20170101))",
+    ]
+
+
+def test_full_refresh_swaps_staged_years_and_truncates_the_rest():
+    cursor, conn = PartitionedTableCursor(2015, 2025, staged_years=[2019, 2026], fact_years=[2014, 2019, 2020]), Conn()
+    spec = etl.FACT_REFRESHES['fact_passenger_movements']
+    etl._swap_fact_years(conn, cursor, 'fact_passenger_movements', spec, 'full', None)
+
+    changes = [s for s in cursor.statements if not s.startswith(('SELECT', 'INSERT', 'DROP', 'CREATE'))]
+    assert changes[0].startswith("ALTER TABLE fact_passenger_movements REORGANIZE PARTITION pmax INTO "
+                                 "(PARTITION p2026 VALUES LESS THAN (20270101)")
+    assert [s for s in changes if 'EXCHANGE' in s or 'TRUNCATE' in s or 'DELETE' in s] == [
+        "DELETE FROM fact_passenger_movements WHERE date_key BETWEEN %s AND %s",      # 2014: p_history
+        "ALTER TABLE fact_passenger_movements EXCHANGE PARTITION p2019 WITH TABLE fact_passenger_movements_swap_p2019",
+        "ALTER TABLE fact_passenger_movements TRUNCATE PARTITION p2020",
+        "ALTER TABLE fact_passenger_movements EXCHANGE PARTITION p2026 WITH TABLE fact_passenger_movements_swap_p2026",
+    ]
+    swap_inserts = [s for s in cursor.statements if s.startswith('INSERT INTO fact_passenger_movements_swap_p2019')]
+    assert len(swap_inserts) == 1 and 'BETWEEN 20190101 AND 20200100' in swap_inserts[0]
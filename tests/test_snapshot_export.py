@@ -0,0 +1,78 @@
+"""Smoke test of the Parquet snapshot export on the SQLite stand-in (needs pyarrow)."""
+import json
+import os
+from decimal import Decimal
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+from snapshot_export import EXPORT_TABLES, export_star_schema
+from sqlite_warehouse import Pool, synthetic_warehouse
+
+TABLES = {table: spec for table, spec in EXPORT_TABLES.items()}
+
+
+@pytest.fixture
+def warehouse():
+    conn = synthetic_warehouse(movements=300, years=(2017, 2020))
+    # A part file whose value column is all NULL, and one with NULL passengers
+    conn.db.execute("UPDATE fact_airline_financials SET value = NULL WHERE date_key = 20180101 AND metric_key = 3")
+    conn.db.execute("UPDATE fact_world_transport_stats SET passengers = NULL WHERE date_key = 20190101")
+    conn.db.execute("INSERT INTO dim_aircraft VALUES (1, 'A330-300', 'Airbus', 297, NULL)")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def _files(folder, table):
+    root = os.path.join(folder, table)
+    return sorted(os.path.join(dirpath, name) for dirpath, _, names in os.walk(root)
+                  for name in names if name.endswith('.parquet'))
+
+
+def test_every_part_file_has_the_table_schema(warehouse, tmp_path):
+    folder = str(tmp_path / 'export')
+    export_star_schema(Pool(warehouse), folder, TABLES, chunk_size=2)
+
+    for table, spec in TABLES.items():
+        schemas = {pq.read_schema(path).remove_metadata() for path in _files(folder, table)}
+        assert len(schemas) == 1, table
+    financials = pq.read_schema(_files(folder, 'fact_airline_financials')[0])
+    assert financials.field('value').type == pa.decimal128(20, 2)
+    assert financials.field('date_key').type == pa.int32()
+    assert pq.read_schema(_files(folder, 'dim_date')[0]).field('full_date').type == pa.date32()
+
+    # The whole table reads back as one dataset, with the database's rows
+    table = pq.read_table(os.path.join(folder, 'fact_airline_financials'))
+    exported = sorted(zip(table['date_key'].to_pylist(), table['metric_key'].to_pylist(), table['value'].to_pylist()))
+    stored = sorted((d, m, None if v is None else Decimal(v).quantize(Decimal('0.01')))
+                    for d, m, v in warehouse.rows("SELECT date_key, metric_key, value FROM fact_airline_financials"))
+    assert exported == stored
+    movements = pq.read_table(os.path.join(folder, 'fact_passenger_movements'))
+    assert movements.num_rows == warehouse.rows("SELECT COUNT(*) FROM fact_passenger_movements")[0][0]
+
+
+def test_only_changed_partitions_are_exported_again(warehouse, tmp_path):
+    folder = str(tmp_path / 'export')
+    first = export_star_schema(Pool(warehouse), folder, TABLES, chunk_size=50, load_version=7)
+    assert first['fact_passenger_movements']['exported'] == ['year=2017', 'year=2018', 'year=2019', 'year=2020']
+
+    again = export_star_schema(Pool(warehouse), folder, TABLES, chunk_size=50)
+    assert all(not result['exported'] and not result['removed'] for result in again.values())
+
+    warehouse.db.execute("UPDATE fact_passenger_movements SET passengers = passengers + 1 "
+                         "WHERE date_key BETWEEN 20190101 AND 20191231")
+    warehouse.db.execute("DELETE FROM fact_world_transport_stats WHERE date_key = 20170101")
+    warehouse.commit()
+    changed = export_star_schema(Pool(warehouse), folder, TABLES, chunk_size=50)
+    assert changed['fact_passenger_movements']['exported'] == ['year=2019']
+    assert changed['fact_world_transport_stats']['removed'] == ['year=2017']
+    assert not os.path.exists(os.path.join(folder, 'fact_world_transport_stats', 'year=2017'))
+
+    with open(os.path.join(folder, 'manifest.json')) as f:
+        manifest = json.load(f)
+    assert manifest['load_version'] == 7
+    entry = manifest['tables']['fact_passenger_movements']['year=2019']
+    assert sum(part['rows'] for part in entry['files']) == entry['rows']
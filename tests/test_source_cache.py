@@ -0,0 +1,46 @@
+"""Cleaned frames in the source cache are invalidated by changes to any cleaning module."""
+import pandas as pd
+
+import etl
+from source_cache import SourceCache
+
+
+def _cache(tmp_path, code_paths):
+    return SourceCache(str(tmp_path / 'cache'), 10 * 1024 ** 2, code_paths=code_paths)
+
+
+def test_cleaned_frame_is_reused_while_the_code_is_unchanged(tmp_path):
+    source = tmp_path / 'source.json'
+    source.write_text('[]')
+    modules = [tmp_path / 'etl.py', tmp_path / 'calendar_dim.py']
+    for module in modules:
+        module.write_text('# v1\n')
+
+    cache = _cache(tmp_path, modules)
+    assert cache.get_transformed('caa_movements', [str(source)]) is None
+    cache.put_transformed('caa_movements', pd.DataFrame({'a': [1]}))
+    cache.save()
+
+    assert _cache(tmp_path, modules).get_transformed('caa_movements', [str(source)]) is not None
+
+
+def test_any_cleaning_module_change_misses(tmp_path):
+    source = tmp_path / 'source.json'
+    source.write_text('[]')
+    modules = [tmp_path / 'etl.py', tmp_path / 'calendar_dim.py']
+    for module in modules:
+        module.write_text('# v1\n')
+    cache = _cache(tmp_path, modules)
+    cache.get_transformed('caa_movements', [str(source)])
+    cache.put_transformed('caa_movements', pd.DataFrame({'a': [1]}))
+    cache.save()
+
+    modules[1].write_text('# v2\n')
+    assert _cache(tmp_path, modules).get_transformed('caa_movements', [str(source)]) is None
+
+
+def test_etl_hashes_every_cleaning_module(tmp_path, monkeypatch):
+    monkeypatch.setitem(etl.SOURCE_CACHE_OPTIONS, 'folder', str(tmp_path / 'cache'))
+    version = etl._open_source_cache().code_version
+    monkeypatch.setattr(etl, 'CLEANING_MODULES', ['etl.py'])
+    assert etl._open_source_cache().code_version != version